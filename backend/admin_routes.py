@@ -1,17 +1,24 @@
+import datetime
 from flask import Blueprint, request, jsonify
 from bson.objectid import ObjectId
 from auth import validate_session
-from pymongo import MongoClient
-import os
+from db import products, deleted_products, pool_stats
+from embeddings import embedding_cache
+from indexer import indexer
+from utils.matching import catalog_index, product_key
+from utils.snapshot import catalog_snapshots
+from utils.pagination import list_response
+from catalog_import import import_products, parse_feed
 from dotenv import load_dotenv
 
 load_dotenv()
 
 admin_routes = Blueprint("admin_routes", __name__)
 
-mongo = MongoClient(os.getenv("MONGODB_URI"))
-db = mongo[os.getenv("MONGODB_DB")]
-products = db[os.getenv("MONGODB_PRODUCTS_COLLECTION")]
+def tombstone(prod):
+    """Record of a deleted product, so every worker drops it from its catalog index."""
+    return {"key": product_key(prod), "productRef": prod["_id"], "deletedAt": datetime.datetime.utcnow()}
+
 
 # ---- AUTH CHECK ----
 def require_admin(req):
@@ -26,11 +33,7 @@ def get_products():
     if not require_admin(request):
         return jsonify({"error": "Unauthorized"}), 403
 
-    items = list(products.find({}))
-    for item in items:
-        item["_id"] = str(item["_id"])
-
-    return jsonify(items)
+    return list_response(products, {}, request, projection={"embedding": False})
 
 
 
@@ -40,14 +43,118 @@ def add_product():
         return jsonify({"error": "Unauthorized"}), 403
 
     data = request.json
-    products.insert_one(data)
+    data.pop("embedding", None)
+    pid = products.insert_one(data).inserted_id
+    indexer.enqueue(pid)
     return jsonify({"msg": "Added"})
 
 
+@admin_routes.route("/import-products", methods=["POST"])
+def import_products_route():
+    """
+    Upsert a CSV or JSONL supplier feed by productId, streamed in chunks.
+    Body is the feed itself or a multipart `file`; the format comes from
+    ?format=, the file name or the Content-Type. Only new products and those
+    whose text changed are re-embedded.
+    """
+    if not require_admin(request):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    upload = request.files.get("file")
+    stream = upload.stream if upload else request.stream
+    fmt = feed_format(request, upload)
+    if fmt not in ("csv", "jsonl"):
+        return jsonify({"error": "format must be csv or jsonl"}), 400
+
+    report = import_feed(stream, fmt)
+    return jsonify(report), 200 if not report["errors"] else 207
+
+
+def feed_format(req, upload):
+    name = (upload.filename or "") if upload else ""
+    return req.args.get("format") or (
+        "csv" if name.lower().endswith(".csv") or req.mimetype == "text/csv" else "jsonl"
+    )
+
+
+def import_feed(stream, fmt):
+    report = import_products(parse_feed(stream, fmt))
+
+    if report["inserted"] or report["updated"]:
+        catalog_index.invalidate()
+        indexer.request_sweep()
+    return report
+
+
 @admin_routes.route("/delete-product/<id>", methods=["DELETE"])
 def delete_product(id):
     if not require_admin(request):
         return jsonify({"error": "Unauthorized"}), 403
 
-    products.delete_one({"_id": ObjectId(id)})
+    prod = products.find_one_and_delete({"_id": ObjectId(id)})
+    if prod:
+        deleted_products.insert_one(tombstone(prod))
+        catalog_index.remove(product_key(prod))
     return jsonify({"msg": "Deleted"})
+
+
+@admin_routes.route("/match-stats", methods=["GET"])
+def match_stats():
+    if not require_admin(request):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify(match_stats_report())
+
+
+def match_stats_report():
+    stats = catalog_index.recall_stats
+    prefilter = catalog_index.prefilter_stats
+    return {
+        "index": catalog_index.kind,
+        "dtype": catalog_index.dtype.name,
+        "products": len(catalog_index),
+        "recallQueries": stats["queries"],
+        "recall": stats["agree"] / stats["queries"] if stats["queries"] else None,
+        "prefilter": dict(
+            prefilter,
+            avgCandidates=prefilter["candidates"] / prefilter["narrowed"] if prefilter["narrowed"] else None
+        )
+    }
+
+
+@admin_routes.route("/catalog-snapshot", methods=["GET"])
+def catalog_snapshot_status():
+    if not require_admin(request):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify(snapshot_report())
+
+
+def snapshot_report():
+    if not catalog_snapshots:
+        return {"enabled": False}
+    return dict(catalog_snapshots.status(catalog_index), enabled=True)
+
+
+@admin_routes.route("/embedding-cache-stats", methods=["GET"])
+def embedding_cache_stats():
+    if not require_admin(request):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify(embedding_cache.stats())
+
+
+@admin_routes.route("/indexing-status", methods=["GET"])
+def indexing_status():
+    if not require_admin(request):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify(indexer.status())
+
+
+@admin_routes.route("/db-pool-stats", methods=["GET"])
+def db_pool_stats():
+    if not require_admin(request):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify(pool_stats.snapshot())
@@ -0,0 +1,6 @@
+# backend/aio/
+#
+# Async versions of the request-path modules, served by asgi.py on Quart
+# with motor. Module names mirror the Flask ones; pricing maths, matching,
+# caches and validation are imported from those modules, only the I/O
+# differs.
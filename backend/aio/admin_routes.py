@@ -0,0 +1,84 @@
+# backend/aio/admin_routes.py
+
+import io
+import asyncio
+from quart import Blueprint, request, jsonify
+from bson.objectid import ObjectId
+from aio.auth import require_role
+from aio.db import products, deleted_products
+from aio.pagination import list_response
+from admin_routes import match_stats_report, snapshot_report, feed_format, import_feed, tombstone
+from db import pool_stats
+from embeddings import embedding_cache
+from indexer import indexer
+from utils.matching import catalog_index, product_key
+
+admin_routes = Blueprint("admin_routes", __name__)
+
+
+@admin_routes.before_request
+async def require_admin():
+    # every route here is admin-only; CORS preflights carry no session
+    if request.method != "OPTIONS" and not await require_role(request, "admin"):
+        return jsonify({"error": "Unauthorized"}), 403
+
+
+@admin_routes.route("/products", methods=["GET"])
+async def get_products():
+    return await list_response(products, {}, request, projection={"embedding": False})
+
+
+@admin_routes.route("/add-product", methods=["POST"])
+async def add_product():
+    data = await request.get_json()
+    data.pop("embedding", None)
+    pid = (await products.insert_one(data)).inserted_id
+    indexer.enqueue(pid)
+    return jsonify({"msg": "Added"})
+
+
+@admin_routes.route("/import-products", methods=["POST"])
+async def import_products_route():
+    """Same contract as the Flask route; the chunked pymongo import runs on a thread."""
+    upload = (await request.files).get("file")
+    stream = upload.stream if upload else io.BytesIO(await request.get_data())
+    fmt = feed_format(request, upload)
+    if fmt not in ("csv", "jsonl"):
+        return jsonify({"error": "format must be csv or jsonl"}), 400
+
+    report = await asyncio.to_thread(import_feed, stream, fmt)
+    return jsonify(report), 200 if not report["errors"] else 207
+
+
+@admin_routes.route("/delete-product/<id>", methods=["DELETE"])
+async def delete_product(id):
+    prod = await products.find_one_and_delete({"_id": ObjectId(id)})
+    if prod:
+        await deleted_products.insert_one(tombstone(prod))
+        catalog_index.remove(product_key(prod))
+    return jsonify({"msg": "Deleted"})
+
+
+@admin_routes.route("/match-stats", methods=["GET"])
+async def match_stats():
+    return jsonify(match_stats_report())
+
+
+@admin_routes.route("/catalog-snapshot", methods=["GET"])
+async def catalog_snapshot_status():
+    return jsonify(snapshot_report())
+
+
+@admin_routes.route("/embedding-cache-stats", methods=["GET"])
+async def embedding_cache_stats():
+    return jsonify(embedding_cache.stats())
+
+
+@admin_routes.route("/indexing-status", methods=["GET"])
+async def indexing_status():
+    return jsonify(indexer.status())
+
+
+@admin_routes.route("/db-pool-stats", methods=["GET"])
+async def db_pool_stats():
+    return jsonify(pool_stats.snapshot())
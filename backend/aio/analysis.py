@@ -0,0 +1,128 @@
+# backend/aio/analysis.py
+#
+# /analyze-image for the async app. Model calls and Mongo reads are awaited
+# on the event loop; image preparation, fingerprinting and vector scoring
+# are CPU work and run on threads (asyncio.to_thread carries the request's
+# profile along). Detection parsing, matching rules and the result cache
+# are the ones app.py uses.
+
+import os
+import asyncio
+from quart import Blueprint, Response, request, jsonify
+from app import (
+    VISION_MODEL, IMAGE_MAX_SIDE, IMAGE_QUALITY, ANALYZE_CACHE_MATCHES, METRICS_ENABLED,
+    prompt, analysis_cache, ensure_catalog, catalog_deletes_due, parse_detections, detection_texts,
+    match_detections, merge_identical_items,
+)
+from aio.pricing import lookup_prices
+from embeddings import get_embeddings_async
+from pricing import generate_quotation, line_product_ids
+from utils.images import prepare_image
+from utils.jobs import AsyncSlots, JobQueueFull
+from utils.matching import catalog_index
+from utils import metrics, gemini_client
+from utils.metrics import span
+
+analysis_routes = Blueprint("analysis", __name__)
+
+analysis_slots = AsyncSlots(
+    workers=int(os.getenv("ANALYZE_ASYNC_WORKERS", "64")),
+    queue_depth=int(os.getenv("ANALYZE_QUEUE_DEPTH", "32")),
+)
+
+metrics.registry.gauge("analysis_async_running", "Analyses in progress on the async app", lambda: analysis_slots.stats()["running"])
+
+
+async def detect_items(bytes_data):
+    with span("image_prep"):
+        image_data, mime_type = await asyncio.to_thread(prepare_image, bytes_data, IMAGE_MAX_SIDE, IMAGE_QUALITY)
+
+    with span("vision"):
+        response = await gemini_client.generate_content_async(VISION_MODEL, [
+            prompt,
+            {"mime_type": mime_type, "data": image_data}
+        ])
+        text = response.text.strip()
+
+    return parse_detections(text), text
+
+
+async def match_items(detected_raw):
+    with span("catalog_load"):
+        if catalog_index.stale or catalog_deletes_due():
+            await asyncio.to_thread(ensure_catalog)
+
+    query_texts = detection_texts(detected_raw)
+
+    with span("embed"):
+        query_embs = await get_embeddings_async(query_texts)
+
+    return await asyncio.to_thread(match_detections, detected_raw, query_texts, query_embs)
+
+
+async def analyze_photo(bytes_data):
+    """app.analyze_photo, awaiting the model calls."""
+    with span("result_cache"):
+        fingerprint = await asyncio.to_thread(analysis_cache.fingerprint, bytes_data)
+        cached = analysis_cache.get(fingerprint)
+
+    if cached:
+        detected_raw = cached["detected"]
+    else:
+        try:
+            detected_raw, text = await detect_items(bytes_data)
+        except gemini_client.ModelUnavailable as e:
+            return None, {"error": str(e), "retryAfter": e.retry_after}
+        if detected_raw is None:
+            return None, {"error": "Gemini JSON parsing failed", "raw": text}
+
+    if cached and cached["matched"] is not None and cached["catalogVersion"] == catalog_index.version:
+        matched_items = cached["matched"]
+    else:
+        matched_items = await match_items(detected_raw)
+        analysis_cache.put(
+            fingerprint, detected_raw,
+            matched_items if ANALYZE_CACHE_MATCHES else None,
+            catalog_index.version
+        )
+
+    return matched_items, None
+
+
+# ---------------- API ROUTES ---------------- #
+
+@analysis_routes.route("/health", methods=["GET"])
+async def health():
+    return {"status": "ok"}
+
+
+@analysis_routes.route("/metrics", methods=["GET"])
+async def metrics_endpoint():
+    if not METRICS_ENABLED:
+        return jsonify({"error": "not found"}), 404
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@analysis_routes.route("/analyze-image", methods=["POST"])
+async def analyze_image():
+    file = (await request.files).get("file")
+    if file is None:
+        return jsonify({"error": "No file"}), 400
+
+    bytes_data = file.read()
+
+    try:
+        async with analysis_slots.slot():
+            matched_items, error = await analyze_photo(bytes_data)
+            if error:
+                return jsonify(error), 503 if "retryAfter" in error else 500
+
+            merged_items = merge_identical_items(matched_items)
+            catalog = await lookup_prices(line_product_ids(merged_items))
+            with span("pricing"):
+                quotation = generate_quotation(merged_items, catalog=catalog)
+    except JobQueueFull:
+        return jsonify({"error": "Analysis queue is full, try again shortly"}), 503
+
+    with span("serialize"):
+        return jsonify(quotation)
@@ -0,0 +1,96 @@
+# backend/aio/auth.py
+
+from quart import Blueprint, request, jsonify
+from werkzeug.security import generate_password_hash, check_password_hash
+from auth import (
+    SESSION_MODE, SIGNED_PREFIX, session_cache, build_session, check_expiry, _load_signed,
+)
+from aio.db import users, sessions
+from utils.metrics import span
+
+auth = Blueprint("auth", __name__)
+
+
+async def create_session(user):
+    session_id, doc = build_session(user)
+    if doc:
+        await sessions.insert_one(doc)
+    return session_id
+
+
+async def validate_session(req):
+    session_id = req.headers.get("x-session-id")
+    if not session_id:
+        return None
+
+    session = session_cache.get(session_id)
+    if session is None:
+        if session_id.startswith(SIGNED_PREFIX):
+            if SESSION_MODE != "signed":
+                return None
+            session = _load_signed(session_id)
+        else:
+            with span("session_lookup"):
+                session = await sessions.find_one({"_id": session_id})
+        if not session:
+            return None
+        session_cache.set(session_id, session)
+
+    return check_expiry(session_id, session)
+
+
+async def invalidate_session(session_id):
+    session_cache.pop(session_id)
+    if not session_id.startswith(SIGNED_PREFIX):
+        await sessions.delete_one({"_id": session_id})
+
+
+async def require_role(req, *roles):
+    """The session if its role is one of `roles` (any role when none are given), else None."""
+    session = await validate_session(req)
+    if not session or (roles and session["role"] not in roles):
+        return None
+    return session
+
+
+@auth.route("/register", methods=["POST"])
+async def register():
+    data = await request.get_json()
+    hashed = generate_password_hash(data["password"])
+
+    doc = {
+        "name": data["name"],
+        "email": data["email"],
+        "password": hashed,
+        "role": data["role"]
+    }
+
+    await users.insert_one(doc)
+    return jsonify({"msg": "User registered"})
+
+
+@auth.route("/login", methods=["POST"])
+async def login():
+    data = await request.get_json()
+    user = await users.find_one({"email": data["email"]})
+
+    if not user or not check_password_hash(user["password"], data["password"]):
+        return jsonify({"error": "Invalid credentials"}), 401
+
+    session_id = await create_session(user)
+
+    return jsonify({
+        "sessionId": session_id,
+        "userId": str(user["_id"]),
+        "role": user["role"],
+        "email": user["email"],
+        "name": user["name"]
+    })
+
+
+@auth.route("/logout", methods=["POST"])
+async def logout():
+    session_id = request.headers.get("x-session-id")
+    if session_id:
+        await invalidate_session(session_id)
+    return jsonify({"msg": "Logged out"})
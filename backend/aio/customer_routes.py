@@ -0,0 +1,62 @@
+# backend/aio/customer_routes.py
+
+import datetime
+from quart import Blueprint, request, jsonify
+from aio.auth import validate_session, require_role
+from aio.db import customers
+from aio.pagination import list_response
+
+customer_routes = Blueprint("customers", __name__)
+
+# ---------------- CREATE CUSTOMER ---------------- #
+
+@customer_routes.route("/create", methods=["POST"])
+async def create_customer():
+    session = await require_role(request, "sales")
+    if not session:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    data = await request.get_json()
+
+    doc = {
+        "name": data["name"],
+        "email": data.get("email", ""),
+        "phone": data.get("phone", ""),
+        "address": data.get("address", ""),
+        "salesExecutiveId": session["userId"],
+        "quotations": [],
+        "createdAt": datetime.datetime.utcnow()
+    }
+
+    cid = (await customers.insert_one(doc)).inserted_id
+    return jsonify({"msg": "Customer created", "id": str(cid)})
+
+
+# ---------------- LIST CUSTOMERS ---------------- #
+
+@customer_routes.route("/sales/<sales_id>", methods=["GET"])
+async def list_customers_for_sales(sales_id):
+    return await list_response(customers, {"salesExecutiveId": sales_id}, request)
+
+
+@customer_routes.route("/list", methods=["GET"])
+async def list_all_customers():
+    if not await require_role(request, "sales", "admin"):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return await list_response(customers, {}, request)
+
+
+# ---------------- GET CUSTOMER BY EMAIL ---------------- #
+
+@customer_routes.route("/by-email/<email>", methods=["GET"])
+async def get_customer_by_email(email):
+    if not await validate_session(request):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    customer = await customers.find_one({"email": email})
+
+    if not customer:
+        return jsonify({"error": "Customer not found"}), 404
+
+    return jsonify(customer)
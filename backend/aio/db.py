@@ -0,0 +1,42 @@
+# backend/aio/db.py
+#
+# db.py for the async app: one motor client, created on first use from the
+# same MONGODB_* settings and pool options, with the same lazy handles.
+
+import os
+import time
+from motor import motor_asyncio
+from dotenv import load_dotenv
+from db import Lazy, POOL_OPTIONS, pool_stats, timings
+
+load_dotenv()
+
+_client = None
+
+
+def get_client():
+    # only ever called from the event loop thread, so no lock
+    global _client
+    if _client is None:
+        started = time.perf_counter()
+        _client = motor_asyncio.AsyncIOMotorClient(
+            os.getenv("MONGODB_URI"), event_listeners=[pool_stats], **POOL_OPTIONS
+        )
+        timings["asyncClientMs"] = round((time.perf_counter() - started) * 1000, 1)
+    return _client
+
+
+def _collection(name_fn):
+    return Lazy(lambda: db[name_fn()], "collection")
+
+
+mongo = Lazy(get_client, "AsyncIOMotorClient")
+db = Lazy(lambda: get_client()[os.getenv("MONGODB_DB")], "database")
+
+products = _collection(lambda: os.getenv("MONGODB_PRODUCTS_COLLECTION"))
+users = _collection(lambda: "users")
+sessions = _collection(lambda: "sessions")
+customers = _collection(lambda: "customers")
+quotations = _collection(lambda: "quotations")
+rollups = _collection(lambda: "analytics_rollups")
+deleted_products = _collection(lambda: "deleted_products")
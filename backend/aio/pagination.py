@@ -0,0 +1,54 @@
+# backend/aio/pagination.py
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from quart import Response, jsonify
+from utils.pagination import PAGE_SIZE, MAX_PAGE_SIZE, CURSOR_HEADER
+from utils.serialization import dumps_bytes
+from utils.metrics import span
+
+
+async def _ndjson(cursor):
+    async for doc in cursor:
+        yield dumps_bytes(doc) + b"\n"
+
+
+async def list_response(collection, filt, req, projection=None):
+    """utils.pagination.list_response over a motor collection: same parameters and headers."""
+    args = req.args
+
+    try:
+        after = ObjectId(args["after"]) if args.get("after") else None
+        limit = int(args.get("limit", PAGE_SIZE))
+    except (InvalidId, ValueError):
+        return jsonify({"error": "Invalid after/limit"}), 400
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    paged = "limit" in args or "after" in args
+
+    if after:
+        filt = {**filt, "_id": {"$gt": after}}
+
+    cursor = collection.find(filt, projection).sort("_id", 1)
+
+    if args.get("format") == "ndjson":
+        if "limit" in args:
+            cursor = cursor.limit(limit)
+        return Response(_ndjson(cursor), mimetype="application/x-ndjson")
+
+    if not paged:
+        with span("list_query"):
+            docs = await cursor.to_list(None)
+        with span("serialize"):
+            return jsonify(docs)
+
+    with span("list_query"):
+        docs = await cursor.limit(limit + 1).to_list(None)
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    with span("serialize"):
+        res = jsonify(docs)
+    if has_more:
+        res.headers[CURSOR_HEADER] = str(docs[-1]["_id"])
+    return res
@@ -0,0 +1,23 @@
+# backend/aio/pricing.py
+
+from aio.db import products
+from pricing import PRICE_FIELDS, price_cache
+from utils.metrics import span
+
+
+async def lookup_prices(product_ids):
+    """pricing.lookup_prices over motor: the same cache and one $in query for the rest."""
+    wanted = set(product_ids)
+    found = price_cache.get_many(wanted)
+    missing = list(wanted - found.keys())
+
+    if missing:
+        with span("price_lookup"):
+            fetched = {
+                doc["productId"]: doc
+                async for doc in products.find({"productId": {"$in": missing}}, PRICE_FIELDS)
+            }
+        price_cache.set_many(fetched)
+        found.update(fetched)
+
+    return found
@@ -0,0 +1,123 @@
+# backend/aio/quotation_routes.py
+
+import io
+import asyncio
+from quart import Blueprint, request, jsonify
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from aio.auth import validate_session, require_role
+from aio.db import quotations, customers, rollups
+from aio.pagination import list_response
+from aio.pricing import lookup_prices
+from quotation_import import build_quotation, import_quotations, parse_jsonl
+from analytics import rollup_ops
+from pricing import price_quotation, parse_price_request, line_product_ids
+from utils.metrics import span
+
+quotation_routes = Blueprint("quotations", __name__)
+
+
+# ---------------------------------------------------
+# SAVE QUOTATION  (Sales Executive Only)
+# ---------------------------------------------------
+@quotation_routes.route("/save", methods=["POST"])
+async def save_quotation():
+    session = await require_role(request, "sales")
+    if not session:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    data = await request.get_json()
+
+    if "customerId" not in data:
+        return jsonify({"error": "customerId required"}), 400
+
+    quotation = build_quotation(data, session["userId"])
+
+    with span("quotation_write"):
+        try:
+            qid = (await quotations.insert_one(quotation)).inserted_id
+        except DuplicateKeyError:
+            return jsonify({"error": f"Quotation {quotation['quotationId']} already saved"}), 409
+        await customers.update_one(
+            {"_id": ObjectId(data["customerId"])},
+            {"$push": {"quotations": str(qid)}}
+        )
+
+    with span("rollup_update"):
+        await rollups.bulk_write(rollup_ops([quotation]), ordered=False)
+
+    return jsonify({"msg": "Quotation saved", "id": str(qid)})
+
+
+# ---------------------------------------------------
+# PRICE A BILL OF MATERIALS  (Sales / Admin)
+# ---------------------------------------------------
+@quotation_routes.route("/price", methods=["POST"])
+async def price_bill_of_materials():
+    if not await require_role(request, "sales", "admin"):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    args, error = parse_price_request(await request.get_json() or {})
+    if error:
+        return jsonify({"error": error}), 400
+
+    quotation, errors = price_quotation(*args, catalog=await lookup_prices(line_product_ids(args[0])))
+    if errors:
+        return jsonify({"error": "Some lines could not be priced", "lines": errors}), 400
+
+    return jsonify(quotation)
+
+
+# ---------------------------------------------------
+# BULK IMPORT  (Sales: own quotations, Admin: migration)
+# ---------------------------------------------------
+@quotation_routes.route("/import", methods=["POST"])
+async def import_quotations_route():
+    """
+    Same contract as the Flask route. The body is read whole and the chunked
+    pymongo import runs on a thread: a batch job, not worth a motor port.
+    """
+    session = await require_role(request, "sales", "admin")
+    if not session:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    sales_exec_id = session["userId"] if session["role"] == "sales" else None
+
+    if request.is_json:
+        data = await request.get_json()
+        if not isinstance(data, list):
+            return jsonify({"error": "Expected a JSON array or JSONL"}), 400
+        rows = ((i, row, None) for i, row in enumerate(data, 1))
+    else:
+        rows = parse_jsonl(io.BytesIO(await request.get_data()))
+
+    report = await asyncio.to_thread(import_quotations, rows, sales_exec_id)
+    return jsonify(report), 200 if not report["errors"] else 207
+
+
+# ---------------------------------------------------
+# VIEW / LIST
+# ---------------------------------------------------
+@quotation_routes.route("/view/<qid>", methods=["GET"])
+async def view_quotation(qid):
+    q = await quotations.find_one({"_id": ObjectId(qid)})
+    if not q:
+        return jsonify({"error": "not found"}), 404
+
+    return jsonify(q)
+
+
+@quotation_routes.route("/customer/<customer_id>", methods=["GET"])
+async def get_customer_quotations(customer_id):
+    if not await validate_session(request):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return await list_response(quotations, {"customerId": customer_id}, request)
+
+
+@quotation_routes.route("/sales/<sales_id>", methods=["GET"])
+async def get_sales_quotations(sales_id):
+    if not await require_role(request, "sales"):
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return await list_response(quotations, {"salesExecutiveId": sales_id}, request)
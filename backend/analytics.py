@@ -0,0 +1,205 @@
+# backend/analytics.py
+#
+# Pre-aggregated dashboard numbers. Every saved quotation $inc's a handful of
+# rollup documents, so dashboards read O(buckets) documents instead of
+# summing every quotation. rebuild() recomputes everything from the
+# quotations collection with aggregation pipelines. Days are UTC days.
+#
+#   python analytics.py rebuild
+
+import os
+import sys
+import math
+import time
+import datetime
+from collections import defaultdict
+from bson import ObjectId
+from pymongo import UpdateOne
+from db import db, quotations, rollups
+from indexes import ROLLUP_INDEXES
+
+# quotations newer than this before a rebuild starts are folded in after the swap
+REBUILD_MARGIN_SECONDS = float(os.getenv("ANALYTICS_REBUILD_MARGIN_SECONDS", "300"))
+REPLAY_CHUNK = 1000
+
+# dim -> quotation field the bucket is keyed by (None: the day alone)
+QUOTATION_DIMS = {
+    "salesExecutive": "salesExecutiveId",
+    "customer": "customerId",
+    "day": None,
+    "salesExecutiveDay": "salesExecutiveId",
+}
+DAY_DIMS = {"day", "salesExecutiveDay"}
+DIMS = set(QUOTATION_DIMS) | {"productGroup"}
+
+
+def _day(quotation):
+    """UTC day of createdAt: Mongo stores datetimes as UTC, and $dateToString formats them so."""
+    created = quotation["createdAt"]
+    if created.tzinfo is not None:
+        created = created.astimezone(datetime.timezone.utc)
+    return created.strftime("%Y-%m-%d")
+
+
+def _bucket_id(dim, key, day=None):
+    return f"{dim}:{key}" if day is None or dim == "day" else f"{dim}:{key}:{day}"
+
+
+def _bucket(dim, key, day=None):
+    doc = {"_id": _bucket_id(dim, key, day), "dim": dim, "key": key}
+    if dim in DAY_DIMS:
+        doc["day"] = day
+    return doc
+
+
+def _increments(quotation):
+    """(bucket, counters) pairs one quotation contributes to."""
+    total = quotation.get("pricing", {}).get("grandTotal", 0) or 0
+    pipeline = total if quotation.get("status") == "pending" else 0
+    counters = {"count": 1, "grandTotal": total, "pipelineValue": pipeline}
+    day = _day(quotation)
+
+    for dim, field in QUOTATION_DIMS.items():
+        key = day if field is None else quotation.get(field)
+        yield _bucket(dim, key, day if dim in DAY_DIMS else None), counters
+
+    for item in quotation.get("items", []):
+        yield _bucket("productGroup", item.get("productGroup", "N/A")), {
+            "lines": 1,
+            "quantity": item.get("quantity", 0) or 0,
+            "value": item.get("line_total", 0) or 0,
+        }
+
+
+def rollup_ops(docs):
+    """Upserts that fold quotations into their rollup buckets."""
+    buckets, incs = {}, defaultdict(lambda: defaultdict(int))
+    for q in docs:
+        for bucket, counters in _increments(q):
+            buckets[bucket["_id"]] = bucket
+            for name, value in counters.items():
+                incs[bucket["_id"]][name] += value
+
+    return [
+        UpdateOne(
+            {"_id": bid},
+            {"$inc": dict(incs[bid]), "$setOnInsert": {k: v for k, v in buckets[bid].items() if k != "_id"}},
+            upsert=True
+        )
+        for bid in incs
+    ]
+
+
+def record_quotations(docs):
+    """Fold newly inserted quotations into the rollups with one bulk_write."""
+    ops = rollup_ops(docs)
+    if ops:
+        rollups.bulk_write(ops, ordered=False)
+
+
+def record_quotation(doc):
+    record_quotations([doc])
+
+
+# ---------------- REBUILD ---------------- #
+
+def _quotation_pipeline(dim, field):
+    day = {"$dateToString": {"format": "%Y-%m-%d", "date": "$createdAt"}}
+    key = day if field is None else f"${field}"
+    group_id = {"key": key, "day": day} if dim in DAY_DIMS else {"key": key}
+    return [
+        {"$group": {
+            "_id": group_id,
+            "count": {"$sum": 1},
+            "grandTotal": {"$sum": {"$ifNull": ["$pricing.grandTotal", 0]}},
+            "pipelineValue": {"$sum": {"$cond": [
+                {"$eq": ["$status", "pending"]}, {"$ifNull": ["$pricing.grandTotal", 0]}, 0
+            ]}},
+        }}
+    ]
+
+
+PRODUCT_GROUP_PIPELINE = [
+    {"$unwind": "$items"},
+    {"$group": {
+        "_id": {"key": {"$ifNull": ["$items.productGroup", "N/A"]}},
+        "lines": {"$sum": 1},
+        "quantity": {"$sum": {"$ifNull": ["$items.quantity", 0]}},
+        "value": {"$sum": {"$ifNull": ["$items.line_total", 0]}},
+    }},
+]
+
+
+def _replay(since, until):
+    """Fold quotations with since <= _id < until into the (new) rollups."""
+    chunk = []
+    for q in quotations.find({"_id": {"$gte": since, "$lt": until}}):
+        chunk.append(q)
+        if len(chunk) >= REPLAY_CHUNK:
+            record_quotations(chunk)
+            chunk = []
+    record_quotations(chunk)
+
+
+def rebuild():
+    """
+    Recompute every rollup from quotations into a scratch collection, then swap it in.
+
+    Saves keep $inc'ing the live collection meanwhile, and the swap throws
+    those increments away. So the pipelines only read quotations older than a
+    cutoff taken REBUILD_MARGIN_SECONDS before the start, and the ones saved
+    between the cutoff and a bound taken at the swap are replayed into the new
+    collection; saves after the bound already $inc'd it. Each is counted once,
+    except a save in flight at the swap itself (quotation inserted on one side
+    of the bound, its rollup $inc landing on the other), which can be counted
+    twice or not at all. That window is the few milliseconds between a save's
+    two writes; run rebuilds when saves are quiet if it matters.
+    """
+    started = datetime.datetime.now(datetime.timezone.utc)
+    cutoff = ObjectId.from_datetime(started - datetime.timedelta(seconds=REBUILD_MARGIN_SECONDS))
+    older = {"$match": {"_id": {"$lt": cutoff}}}
+
+    scratch = db[rollups.name + "_rebuild"]
+    scratch.drop()
+    for keys, options in ROLLUP_INDEXES:
+        scratch.create_index(keys, **options)
+
+    pipelines = [(dim, _quotation_pipeline(dim, field)) for dim, field in QUOTATION_DIMS.items()]
+    pipelines.append(("productGroup", PRODUCT_GROUP_PIPELINE))
+
+    for dim, pipeline in pipelines:
+        docs = []
+        for row in quotations.aggregate([older] + pipeline, allowDiskUse=True):
+            group = row.pop("_id")
+            docs.append(dict(_bucket(dim, group["key"], group.get("day")), **row))
+        if docs:
+            scratch.insert_many(docs, ordered=False)
+
+    # ObjectIds carry whole seconds only: swap just after one starts, so the
+    # bound falls at the rename rather than up to a second before it
+    now = time.time()
+    time.sleep(math.ceil(now) - now)
+    bound = ObjectId.from_datetime(datetime.datetime.now(datetime.timezone.utc))
+    scratch.rename(rollups.name, dropTarget=True)
+    _replay(cutoff, bound)
+    return rollups.count_documents({})
+
+
+def query(dim, key=None, day_from=None, day_to=None):
+    filt = {"dim": dim}
+    if key is not None:
+        filt["key"] = key
+    if dim in DAY_DIMS and (day_from or day_to):
+        filt["day"] = {}
+        if day_from:
+            filt["day"]["$gte"] = day_from
+        if day_to:
+            filt["day"]["$lte"] = day_to
+    return list(rollups.find(filt, {"_id": False}).sort([("key", 1), ("day", 1)]))
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["rebuild"]:
+        print(f"{rebuild()} rollup buckets rebuilt")
+    else:
+        print("usage: python analytics.py rebuild")
@@ -0,0 +1,44 @@
+# backend/analytics_routes.py
+
+from flask import Blueprint, request, jsonify
+from dotenv import load_dotenv
+from auth import validate_session
+import analytics
+
+load_dotenv()
+
+analytics_routes = Blueprint("analytics", __name__)
+
+SALES_DIMS = {"salesExecutive", "salesExecutiveDay"}
+
+
+# ---------------------------------------------------
+# ROLLUPS  (Admin: any dimension, Sales: own numbers)
+# ---------------------------------------------------
+@analytics_routes.route("/rollups", methods=["GET"])
+def get_rollups():
+    """?dim=salesExecutive|customer|productGroup|day|salesExecutiveDay&key=&from=YYYY-MM-DD&to=YYYY-MM-DD"""
+    session = validate_session(request)
+    if not session or session["role"] not in ["sales", "admin"]:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    dim = request.args.get("dim", "salesExecutive")
+    if dim not in analytics.DIMS:
+        return jsonify({"error": f"dim must be one of {sorted(analytics.DIMS)}"}), 400
+
+    key = request.args.get("key")
+    if session["role"] == "sales":
+        if dim not in SALES_DIMS:
+            return jsonify({"error": "Unauthorized"}), 403
+        key = session["userId"]
+
+    return jsonify(analytics.query(dim, key, request.args.get("from"), request.args.get("to")))
+
+
+@analytics_routes.route("/rebuild", methods=["POST"])
+def rebuild_rollups():
+    session = validate_session(request)
+    if not session or session["role"] != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify({"msg": "Rebuilt", "buckets": analytics.rebuild()})
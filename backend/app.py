@@ -1,77 +1,175 @@
 # backend/app.py
+#
+# create_app() builds the Flask app without touching Mongo or Gemini; clients
+# are created on first use and APP_WARMUP connects them in the background, so
+# a new worker answers /health as soon as it has imported.
+#
+#   gunicorn "app:create_app()"     (or app:app, built on first access)
+#   uvicorn "asgi:create_asgi_app" --factory     (async mode, see asgi.py)
+
+import time
+
+IMPORT_STARTED = time.perf_counter()
 
 import os
-import math
 import json
-from flask import Flask, request, jsonify
+import datetime
+import threading
+from flask import Blueprint, Flask, Response, request, jsonify, g
 from flask_cors import CORS
 from dotenv import load_dotenv
-from pymongo import MongoClient
-import google.generativeai as genai
-from datetime import datetime
-import uuid
-from auth import auth
+from auth import auth, validate_session
 from customer_routes import customer_routes
 from quotation_routes import quotation_routes
 from admin_routes import admin_routes
+from analytics_routes import analytics_routes
+from db import mongo, products, deleted_products, jobs, timings as db_timings
+from indexes import ensure_indexes
+from pricing import generate_quotation
+from embeddings import get_embeddings
+from indexer import indexer
+from utils.matching import catalog_index
+from utils.snapshot import catalog_snapshots
+from utils.result_cache import AnalysisCache
+from utils.jobs import JobRunner, JobQueueFull
+from utils.images import prepare_image
+from utils.serialization import BSONJSONProvider
+from utils import metrics, gemini_client
+from utils.metrics import span
 
 load_dotenv()
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-MONGO_URI = os.getenv("MONGODB_URI")
-DB_NAME = os.getenv("MONGODB_DB")
-COLLECTION = os.getenv("MONGODB_PRODUCTS_COLLECTION")
-
-genai.configure(api_key=GEMINI_API_KEY)
-
-VISION = genai.GenerativeModel("models/gemini-2.5-flash")
-EMBED_MODEL = "models/text-embedding-004"
-
-mongo = MongoClient(MONGO_URI)
-db = mongo[DB_NAME]
-products = db[COLLECTION]
-
-app = Flask(__name__)
-CORS(app)
-
-# REGISTER BLUEPRINTS
-app.register_blueprint(auth, url_prefix="/auth")
-app.register_blueprint(customer_routes, url_prefix="/customer")
-app.register_blueprint(quotation_routes, url_prefix="/quotation")
-app.register_blueprint(admin_routes, url_prefix="/admin")
-
+VISION_MODEL = "models/gemini-2.5-flash"
+MATCH_RECALL_CHECK = os.getenv("MATCH_RECALL_CHECK") == "1"
+EMBED_INDEXER = os.getenv("EMBED_INDEXER", "1") == "1"
+ANALYZE_CACHE_MATCHES = os.getenv("ANALYZE_CACHE_MATCHES", "1") == "1"
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1600"))
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+ANALYZE_BATCH_MAX = int(os.getenv("ANALYZE_BATCH_MAX", "10"))
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+PROFILE_HEADER = os.getenv("PROFILE_HEADER", "1") == "1"
+# background (default): connect and load after boot; sync: before create_app returns; off
+APP_WARMUP = os.getenv("APP_WARMUP", "background")
+# how often a worker without snapshots looks for products other workers deleted
+CATALOG_SYNC_SECONDS = float(os.getenv("CATALOG_SYNC_SECONDS", "5"))
+
+analysis_routes = Blueprint("analysis", __name__)
+
+# exact (sha256) hits only by default; ANALYZE_CACHE_PHASH=1 also reuses the
+# result of a perceptually near-identical photo, which can be a different scene
+analysis_cache = AnalysisCache(
+    max_items=int(os.getenv("ANALYZE_CACHE_SIZE", "500")),
+    ttl=int(os.getenv("ANALYZE_CACHE_TTL", "3600")),
+    phash_distance=int(os.getenv("ANALYZE_CACHE_PHASH_DISTANCE", "4")) if os.getenv("ANALYZE_CACHE_PHASH", "0") == "1" else None,
+)
+
+# detection + matching run here, for both the sync endpoint and submitted jobs;
+# submitted jobs are also kept in Mongo so a poll can land on any worker
+analysis_jobs = JobRunner(
+    workers=int(os.getenv("ANALYZE_WORKERS", "4")),
+    queue_depth=int(os.getenv("ANALYZE_QUEUE_DEPTH", "32")),
+    result_ttl=int(os.getenv("ANALYZE_JOB_TTL", "600")),
+    store=jobs,
+)
+
+
+metrics.registry.gauge("catalog_index_products", "Products in the in-memory catalog index", lambda: len(catalog_index))
+metrics.registry.gauge("analysis_jobs_queued", "Analysis jobs waiting for a worker", lambda: analysis_jobs.stats()["queued"])
+metrics.registry.gauge("analysis_jobs_running", "Analysis jobs being processed", lambda: analysis_jobs.stats()["running"])
+metrics.registry.gauge("analysis_cache_items", "Entries in the analysis result cache", lambda: analysis_cache.stats()["size"])
+metrics.registry.gauge("gemini_breaker_open", "1 while the Gemini circuit breaker rejects calls", lambda: int(gemini_client.breaker.state == "open"))
+metrics.registry.gauge("gemini_retries", "Gemini attempts retried since start", lambda: gemini_client.stats["retries"])
+metrics.registry.gauge("gemini_coalesced", "Gemini calls answered by an identical in-flight call", lambda: gemini_client.stats["coalesced"])
+metrics.registry.gauge("gemini_hedges", "Hedged second Gemini attempts sent", lambda: gemini_client.stats["hedges"])
+
+
+# ---------------- REQUEST METRICS ---------------- #
+
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    # "X-Profile: 1" returns this request's stage breakdown in Server-Timing
+    if PROFILE_HEADER and request.headers.get("X-Profile") == "1":
+        metrics.start_profile()
+
+
+def record_request_timer(response):
+    start = g.pop("request_start", None)
+    if start is None:
+        return response
+
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.request_seconds.observe(elapsed, request.method, route, str(response.status_code))
+
+    profile = metrics.end_profile()
+    if profile is not None:
+        profile.add("total", elapsed)
+        response.headers["Server-Timing"] = profile.server_timing()
+    return response
+
+
+def clear_request_profile(exc):
+    metrics.end_profile()
 
 
 # ---------------- EMBEDDING UTILS ---------------- #
 
-def get_embedding(text):
-    res = genai.embed_content(model=EMBED_MODEL, content=text)
-    return res["embedding"]
+def load_catalog():
+    """
+    Feed the in-memory catalog index with every product that already has an
+    embedding. Missing ones are produced by the background indexer, never here.
+    """
+    return [
+        (prod, prod["embedding"])
+        for prod in products.find({"embedding": {"$exists": True}})
+    ]
 
 
-def cosine(a, b):
-    dot = sum(x * y for x, y in zip(a, b))
-    na = math.sqrt(sum(x * x for x in a))
-    nb = math.sqrt(sum(x * x for x in b))
-    return dot / (na * nb + 1e-9)
+_deletes = {"lock": threading.Lock(), "checked": 0.0, "since": datetime.datetime.utcnow()}
 
 
-def ensure_embedding(prod):
-    """Generate and store embedding once."""
-    if "embedding" in prod:
-        return prod["embedding"]
+def catalog_deletes_due():
+    return not catalog_snapshots and time.monotonic() - _deletes["checked"] >= CATALOG_SYNC_SECONDS
 
-    combined = " ".join([
-        prod.get("product", ""),
-        prod.get("shortText", ""),
-        prod.get("description", ""),
-        prod.get("productGroup", ""),
-        " ".join(prod.get("tags", []))
-    ])
 
-    emb = get_embedding(combined)
-    products.update_one({"_id": prod["_id"]}, {"$set": {"embedding": emb}})
-    return emb
+def apply_catalog_deletes():
+    """
+    Drop products another worker deleted (deleted_products tombstones) from
+    this worker's index, at most every CATALOG_SYNC_SECONDS. Snapshots carry
+    deletes themselves, so this is only for workers without them.
+    """
+    if not catalog_deletes_due() or not _deletes["lock"].acquire(blocking=False):
+        return
+    try:
+        # a little overlap: a tombstone may land just after the clock is read
+        since = _deletes["since"] - datetime.timedelta(seconds=5)
+        _deletes["since"] = datetime.datetime.utcnow()
+        for t in deleted_products.find({"deletedAt": {"$gte": since}}):
+            current = catalog_index.get(t["key"])
+            # the same productId may have been imported again since
+            if current is not None and current.get("_id") == t["productRef"]:
+                catalog_index.remove(t["key"])
+    except Exception as e:
+        print("CATALOG SYNC ERROR:", e)
+    finally:
+        _deletes["checked"] = time.monotonic()
+        _deletes["lock"].release()
+
+
+def ensure_catalog():
+    """
+    With CATALOG_SNAPSHOT_DIR set, serve the shared memory-mapped snapshot
+    (publishing one if there is none yet). Otherwise, or when another worker
+    is mid-publish, build this worker's own copy from Mongo and keep it in
+    step with deletes made on other workers.
+    """
+    if catalog_snapshots and catalog_index.stale:
+        try:
+            catalog_snapshots.refresh(catalog_index, load_catalog)
+        except Exception as e:
+            print("SNAPSHOT ERROR:", e)
+    catalog_index.ensure_loaded(load_catalog)
+    apply_catalog_deletes()
 
 
 # ---------------- GEMINI PROMPT ---------------- #
@@ -111,105 +209,78 @@ def merge_identical_items(items):
 
     return list(merged.values())
 
-def generate_quotation(detected_items, customer_name="Walk-in Client", tax_rate=0.18, discount_rate=0.0):
-    quotation_id = f"QT-{uuid.uuid4().hex[:8].upper()}"
-    date_str = datetime.now().strftime("%Y-%m-%d")
-
-    # Transform items to include all product details
-    formatted_items = []
-    for item in detected_items:
-        formatted_items.append({
-            "itemNo": item.get("itemNo", "N/A"),
-            "product": item["product"],
-            "productId": item.get("productId", "N/A"),
-            "productGroup": item.get("productGroup", "N/A"),
-            "quantity": item["quantity"],
-            "unit_price": item["unit_price"],
-            "supplier": item.get("supplier", "N/A"),
-            "store": item.get("store", "N/A"),
-            "line_total": item["line_total"],
-            "match_confidence": item.get("match_confidence", 0)
-        })
-
-    subtotal = sum(item["line_total"] for item in formatted_items)
-    tax_amount = subtotal * tax_rate
-    discount_amount = subtotal * discount_rate
-    grand_total = subtotal + tax_amount - discount_amount
-
-    return {
-        "quotationId": quotation_id,
-        "date": date_str,
-        "customerName": customer_name,
-        "validity": "7 days",
-        "items": formatted_items,
-        "pricing": {
-            "subtotal": round(subtotal, 2),
-            "taxRate": tax_rate,
-            "taxAmount": round(tax_amount, 2),
-            "discountRate": discount_rate,
-            "discountAmount": round(discount_amount, 2),
-            "grandTotal": round(grand_total, 2)
-        },
-        "terms": [
-            "Quotation valid for 7 days.",
-            "Delivery charges may apply.",
-            "All items include standard manufacturer warranty."
-        ]
-    }
-
-
-# ---------------- API ROUTES ---------------- #
+# line prices and totals: pricing.generate_quotation
 
-@app.route("/health", methods=["GET"])
-def health():
-    return {"status": "ok"}
 
+# ---------------- ANALYSIS PIPELINE ---------------- #
 
-@app.route("/analyze-image", methods=["POST"])
-def analyze_image():
-    if "file" not in request.files:
-        return jsonify({"error": "No file"}), 400
+def detect_items(bytes_data):
+    """
+    Run Gemini vision on one photo.
+    Returns (detected_items, raw_text); detected_items is None if the reply is not JSON.
+    """
+    with span("image_prep"):
+        image_data, mime_type = prepare_image(bytes_data, IMAGE_MAX_SIDE, IMAGE_QUALITY)
 
-    file = request.files["file"]
-    bytes_data = file.read()
+    with span("vision"):
+        response = gemini_client.generate_content(VISION_MODEL, [
+            prompt,
+            {"mime_type": mime_type, "data": image_data}
+        ])
+        text = response.text.strip()
 
-    # ---- STEP 1: GEMINI DETECTION ---- #
-    response = VISION.generate_content([
-        prompt,
-        {"mime_type": "image/jpeg", "data": bytes_data}
-    ])
+    return parse_detections(text), text
 
-    text = response.text.strip()
 
+def parse_detections(text):
+    """The JSON list in a vision reply, or None."""
     try:
         start = text.index("[")
         end = text.rindex("]") + 1
         detected_raw = json.loads(text[start:end])
     except:
-        return jsonify({"error": "Gemini JSON parsing failed", "raw": text}), 500
-    
+        return None
 
     print("RAW GEMINI OUTPUT:")
     print(text)
 
-    # ---- STEP 2: MATCH TO INVENTORY ---- #
+    return detected_raw
 
-    matched_items = []
 
-    for det in detected_raw:
-        search_text = det["item_name"] + " " + det.get("attributes", "")
-        emb = get_embedding(search_text)
+def detection_texts(detected_raw):
+    return [
+        det["item_name"] + " " + det.get("attributes", "")
+        for det in detected_raw
+    ]
+
 
-        best = None
-        best_score = -1
+def match_items(detected_raw):
+    """Match detections to catalog products, one quotation line per product."""
+    with span("catalog_load"):
+        ensure_catalog()
 
-        for prod in products.find({}):
-            p_emb = ensure_embedding(prod)
-            score = cosine(emb, p_emb)
-            if score > best_score:
-                best_score = score
-                best = prod
+    query_texts = detection_texts(detected_raw)
 
+    with span("embed"):
+        query_embs = get_embeddings(query_texts)
+
+    return match_detections(detected_raw, query_texts, query_embs)
+
+
+def match_detections(detected_raw, query_texts, query_embs):
+    """Score embedded detections against the loaded catalog index."""
+    # the detection text also picks the category the query is scored within
+    with span("match"):
+        if MATCH_RECALL_CHECK:
+            check = catalog_index.recall_check(query_embs, query_texts)
+            matches = check["approx"]
+            print(f"MATCH RECALL ({catalog_index.kind}): {check['agree']}/{check['queries']}")
+        else:
+            matches = catalog_index.best_matches(query_embs, query_texts)
+
+    matched_items = []
+
+    for det, (best, best_score) in zip(detected_raw, matches):
         # Skip low confidence matches (<0.55)
         if not best or best_score < 0.50:
             continue
@@ -245,16 +316,264 @@ def analyze_image():
 
         matched_items = list(grouped.values())
 
+    return matched_items
+
+
+# ---------------- API ROUTES ---------------- #
+
+@analysis_routes.route("/health", methods=["GET"])
+def health():
+    return {"status": "ok"}
+
+
+@analysis_routes.route("/health/startup", methods=["GET"])
+def startup_report():
+    """Import, create_app and warmup timings of this worker."""
+    return jsonify(dict(startup, mongo=db_timings, gemini=gemini_client.timings))
+
+
+@analysis_routes.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    """Prometheus scrape target: request and stage latency histograms plus a few gauges."""
+    if not METRICS_ENABLED:
+        return jsonify({"error": "not found"}), 404
+    return Response(metrics.registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@analysis_routes.route("/analyze-image/cache-stats", methods=["GET"])
+def analysis_cache_stats():
+    session = validate_session(request)
+    if not session or session["role"] != "admin":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    return jsonify(dict(analysis_cache.stats(), jobs=analysis_jobs.stats(), gemini=gemini_client.status()))
+
+
+def analyze_photo(bytes_data):
+    """
+    Detection + matching for one photo, through the result cache.
+    Returns (matched_items, error_body); error_body is None on success.
+    """
+    with span("result_cache"):
+        fingerprint = analysis_cache.fingerprint(bytes_data)
+        cached = analysis_cache.get(fingerprint)
+
+    # ---- STEP 1: GEMINI DETECTION ---- #
+    if cached:
+        detected_raw = cached["detected"]
+    else:
+        try:
+            detected_raw, text = detect_items(bytes_data)
+        except gemini_client.ModelUnavailable as e:
+            return None, {"error": str(e), "retryAfter": e.retry_after}
+        if detected_raw is None:
+            return None, {"error": "Gemini JSON parsing failed", "raw": text}
+
+    # ---- STEP 2: MATCH TO INVENTORY ---- #
+    if cached and cached["matched"] is not None and cached["catalogVersion"] == catalog_index.version:
+        matched_items = cached["matched"]
+    else:
+        matched_items = match_items(detected_raw)
+        analysis_cache.put(
+            fingerprint, detected_raw,
+            matched_items if ANALYZE_CACHE_MATCHES else None,
+            catalog_index.version
+        )
+
+    return matched_items, None
+
+
+def analyze_bytes(bytes_data):
+    """Whole pipeline for one photo. Returns (body, status_code)."""
+    matched_items, error = analyze_photo(bytes_data)
+    if error:
+        return error, 503 if "retryAfter" in error else 500
 
     # ---- STEP 3: GENERATE QUOTATION ---- #
 
     # merge identical items first
     merged_items = merge_identical_items(matched_items)
 
-    quotation = generate_quotation(merged_items)
+    with span("pricing"):
+        quotation = generate_quotation(merged_items)
+
+    return quotation, 200
+
+
+@analysis_routes.route("/analyze-image", methods=["POST"])
+def analyze_image():
+    if "file" not in request.files:
+        return jsonify({"error": "No file"}), 400
+
+    file = request.files["file"]
+    bytes_data = file.read()
+
+    try:
+        job_id = analysis_jobs.submit(analyze_bytes, bytes_data)
+    except JobQueueFull:
+        return jsonify({"error": "Analysis queue is full, try again shortly"}), 503
+
+    job = analysis_jobs.wait(job_id)
+    if job["status"] == "failed":
+        return jsonify({"error": job["error"]}), 500
+
+    body, status = job["result"]
+    with span("serialize"):
+        res = jsonify(body)
+    return res, status
+
+
+@analysis_routes.route("/analyze-image/batch", methods=["POST"])
+def analyze_image_batch():
+    """Several photos of one site analysed concurrently into a single quotation."""
+    files = request.files.getlist("files")
+    if not files:
+        return jsonify({"error": "No files"}), 400
+    if len(files) > ANALYZE_BATCH_MAX:
+        return jsonify({"error": f"At most {ANALYZE_BATCH_MAX} files per batch"}), 400
+
+    submitted = []
+    try:
+        for f in files:
+            submitted.append((f.filename, analysis_jobs.submit(analyze_photo, f.read())))
+    except JobQueueFull:
+        return jsonify({"error": "Analysis queue is full, try again shortly"}), 503
+
+    matched_items, failed = [], []
+    for filename, job_id in submitted:
+        job = analysis_jobs.wait(job_id)
+        if job["status"] == "failed":
+            failed.append({"file": filename, "error": job["error"]})
+            continue
+        items, error = job["result"]
+        if error:
+            failed.append(dict(error, file=filename))
+        else:
+            matched_items.extend(items)
+
+    if len(failed) == len(submitted):
+        return jsonify({"error": "No image could be analysed", "failedImages": failed}), 500
+
+    with span("pricing"):
+        quotation = generate_quotation(merge_identical_items(matched_items))
+    if failed:
+        quotation["failedImages"] = failed
+
+    with span("serialize"):
+        return jsonify(quotation)
+
+
+# ---------------- ASYNC ANALYSIS JOBS ---------------- #
+
+@analysis_routes.route("/analyze-image/jobs", methods=["POST"])
+def submit_analysis_job():
+    if "file" not in request.files:
+        return jsonify({"error": "No file"}), 400
+
+    bytes_data = request.files["file"].read()
+
+    try:
+        job_id = analysis_jobs.submit(analyze_bytes, bytes_data, shared=True)
+    except JobQueueFull:
+        return jsonify({"error": "Analysis queue is full, try again shortly"}), 503
+
+    return jsonify({"jobId": job_id, "status": "queued"}), 202
+
+
+@analysis_routes.route("/analyze-image/jobs/<job_id>", methods=["GET"])
+def get_analysis_job(job_id):
+    job = analysis_jobs.get(job_id)
+    if not job:
+        return jsonify({"error": "not found"}), 404
+
+    res = {"jobId": job_id, "status": job["status"]}
+    if job["status"] == "done":
+        res["result"], res["statusCode"] = job["result"]
+    elif job["status"] == "failed":
+        res["error"] = job["error"]
+
+    return jsonify(res)
+
+
+# ---------------- APP FACTORY ---------------- #
+
+startup = {"importMs": None, "createAppMs": None, "warmup": {"state": "pending", "steps": {}}}
+
+
+def warmup():
+    """Connect Mongo, create indexes, load the catalog and the Gemini SDK, timing each step."""
+    state = startup["warmup"]
+    state["state"] = "running"
+    steps = [
+        ("mongoPing", lambda: mongo.admin.command("ping")),
+        ("ensureIndexes", ensure_indexes),
+        ("catalogLoad", ensure_catalog),
+        ("geminiSdk", lambda: gemini_client.generative_model(VISION_MODEL)),
+    ]
+
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+            state["steps"][name] = {"ms": round((time.perf_counter() - started) * 1000, 1)}
+        except Exception as e:
+            state["steps"][name] = {"ms": round((time.perf_counter() - started) * 1000, 1), "error": str(e)}
+            print("WARMUP ERROR:", name, e)
+
+    state["state"] = "done"
+    print("WARMUP:", {name: step["ms"] for name, step in state["steps"].items()})
+
+
+def create_app():
+    started = time.perf_counter()
+
+    app = Flask(__name__)
+    app.json = BSONJSONProvider(app)
+    app.config["MAX_CONTENT_LENGTH"] = int(os.getenv("MAX_UPLOAD_MB", "50")) * 1024 * 1024
+    CORS(app, expose_headers=["X-Next-Cursor", "Server-Timing"])
+
+    app.before_request(start_request_timer)
+    app.after_request(record_request_timer)
+    app.teardown_request(clear_request_profile)
+
+    # REGISTER BLUEPRINTS
+    app.register_blueprint(analysis_routes)
+    app.register_blueprint(auth, url_prefix="/auth")
+    app.register_blueprint(customer_routes, url_prefix="/customer")
+    app.register_blueprint(quotation_routes, url_prefix="/quotation")
+    app.register_blueprint(admin_routes, url_prefix="/admin")
+    app.register_blueprint(analytics_routes, url_prefix="/analytics")
+
+    if EMBED_INDEXER:
+        indexer.start()
+
+    if catalog_snapshots:
+        catalog_snapshots.start(catalog_index, load_catalog)
+
+    if APP_WARMUP == "sync":
+        warmup()
+    elif APP_WARMUP == "background" and startup["warmup"]["state"] == "pending":
+        threading.Thread(target=warmup, name="warmup", daemon=True).start()
+
+    startup["importMs"] = round((started - IMPORT_STARTED) * 1000, 1)
+    startup["createAppMs"] = round((time.perf_counter() - started) * 1000, 1)
+    print(f"STARTUP: imports {startup['importMs']}ms, create_app {startup['createAppMs']}ms, warmup {APP_WARMUP}")
+    return app
+
+
+_app = None
+
 
-    return jsonify(quotation)
+def __getattr__(name):
+    # `gunicorn app:app` and `from app import app` build the app on first
+    # access, so importing this module for its functions stays side-effect free
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 if __name__ == "__main__":
-    app.run(port=5000, debug=True)
\ No newline at end of file
+    create_app().run(port=5000, debug=True)
\ No newline at end of file
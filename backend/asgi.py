@@ -0,0 +1,122 @@
+# backend/asgi.py
+#
+# Async serving mode. The auth, customer, quotation and admin blueprints and
+# /analyze-image run as coroutines on Quart with motor and the SDK's async
+# model calls, so one worker keeps many requests in flight while they wait
+# on Mongo or Gemini. Every other route (analytics, batch and job analysis,
+# /health/startup) is served by the Flask app from app.py on a thread pool,
+# so the URL contract is the same whichever way the backend is started.
+#
+#   uvicorn "asgi:create_asgi_app" --factory --workers 4
+#   hypercorn "asgi:create_asgi_app()"
+#
+# Needs quart, quart-cors, motor, a2wsgi and an ASGI server on top of the
+# Flask requirements.
+
+import os
+import time
+from quart import Quart, request, g
+from quart_cors import cors
+from a2wsgi import WSGIMiddleware
+from werkzeug.exceptions import NotFound
+from werkzeug.routing import RequestRedirect
+from dotenv import load_dotenv
+import app as flask_app
+from aio.auth import auth
+from aio.customer_routes import customer_routes
+from aio.quotation_routes import quotation_routes
+from aio.admin_routes import admin_routes
+from aio.analysis import analysis_routes, analysis_slots
+from utils import metrics, gemini_client
+from utils.serialization import BSONJSONProvider
+
+load_dotenv()
+
+# threads for the Flask routes that have no async version
+WSGI_THREADS = int(os.getenv("ASGI_WSGI_THREADS", "10"))
+
+
+# ---------------- EVENT LOOP STATE ---------------- #
+
+async def start_loop_state():
+    """Semaphores and futures belong to one event loop: make them on the serving one."""
+    analysis_slots.start()
+    gemini_client.start_async()
+
+
+# ---------------- REQUEST METRICS ---------------- #
+
+async def start_request_timer():
+    g.request_start = time.perf_counter()
+    if flask_app.PROFILE_HEADER and request.headers.get("X-Profile") == "1":
+        metrics.start_profile()
+
+
+async def record_request_timer(response):
+    start = g.pop("request_start", None)
+    if start is None:
+        return response
+
+    elapsed = time.perf_counter() - start
+    route = request.url_rule.rule if request.url_rule else "unmatched"
+    metrics.request_seconds.observe(elapsed, request.method, route, str(response.status_code))
+
+    profile = metrics.end_profile()
+    if profile is not None:
+        profile.add("total", elapsed)
+        response.headers["Server-Timing"] = profile.server_timing()
+    return response
+
+
+# ---------------- DISPATCH ---------------- #
+
+class Dispatcher:
+    """Sends each HTTP request to the Quart app if it has the route, otherwise to the Flask app."""
+
+    def __init__(self, async_app, wsgi_app):
+        self.async_app = async_app
+        self.fallback = WSGIMiddleware(wsgi_app, workers=WSGI_THREADS)
+        self._urls = async_app.url_map.bind("")
+
+    def _is_async(self, scope):
+        try:
+            self._urls.match(scope["path"], scope["method"])
+        except NotFound:
+            return False
+        except RequestRedirect:
+            return True
+        except Exception:
+            return True  # 405 and friends: the route exists here, let Quart answer
+        return True
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and not self._is_async(scope):
+            return await self.fallback(scope, receive, send)
+        return await self.async_app(scope, receive, send)
+
+
+# ---------------- APP FACTORY ---------------- #
+
+def create_asgi_app():
+    started = time.perf_counter()
+
+    # the Flask app also starts the indexer, snapshots and warmup
+    wsgi_app = flask_app.create_app()
+
+    app = Quart(__name__)
+    app.json = BSONJSONProvider(app)
+    app.config["MAX_CONTENT_LENGTH"] = wsgi_app.config["MAX_CONTENT_LENGTH"]
+    app = cors(app, allow_origin="*", expose_headers=["X-Next-Cursor", "Server-Timing"])
+
+    app.before_serving(start_loop_state)
+    app.before_request(start_request_timer)
+    app.after_request(record_request_timer)
+
+    app.register_blueprint(analysis_routes)
+    app.register_blueprint(auth, url_prefix="/auth")
+    app.register_blueprint(customer_routes, url_prefix="/customer")
+    app.register_blueprint(quotation_routes, url_prefix="/quotation")
+    app.register_blueprint(admin_routes, url_prefix="/admin")
+
+    print(f"ASGI STARTUP: create_asgi_app {round((time.perf_counter() - started) * 1000, 1)}ms")
+    return Dispatcher(app, wsgi_app)
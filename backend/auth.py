@@ -1,50 +1,123 @@
 # backend/auth.py
 
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
 from werkzeug.security import generate_password_hash, check_password_hash
+from itsdangerous import URLSafeTimedSerializer, BadSignature
 import datetime, os, uuid
 from dotenv import load_dotenv
+from db import users, sessions
+from utils.ttl_cache import TTLCache
+from utils.metrics import span
 
 load_dotenv()
 
 auth = Blueprint("auth", __name__)
 
-mongo = MongoClient(os.getenv("MONGODB_URI"))
-db = mongo[os.getenv("MONGODB_DB")]
-users = db["users"]
-sessions = db["sessions"]
 
+SESSION_HOURS = 12
 
-def create_session(user):
-    session_id = f"session_{uuid.uuid4().hex}"
+# "db" keeps sessions in Mongo; "signed" issues self-contained signed tokens
+# that validate without any database access (they cannot be revoked early).
+SESSION_MODE = os.getenv("SESSION_MODE", "db")
+SESSION_SECRET = os.getenv("SESSION_SECRET", "")
+SIGNED_PREFIX = "st."
+
+if SESSION_MODE == "signed" and not SESSION_SECRET:
+    raise RuntimeError("SESSION_SECRET is required when SESSION_MODE=signed")
+
+signer = URLSafeTimedSerializer(SESSION_SECRET or "unused", salt="session")
+
+# Validated sessions are reused for a few seconds so authenticated routes
+# skip the sessions.find_one round trip. Logout drops the entry right away.
+session_cache = TTLCache(
+    max_items=int(os.getenv("SESSION_CACHE_SIZE", "10000")),
+    ttl=float(os.getenv("SESSION_CACHE_TTL", "30")),
+)
+
+
+def build_session(user):
+    """(session_id, document to insert); the document is None for signed tokens."""
+    now = datetime.datetime.utcnow()
     doc = {
-        "_id": session_id,
         "userId": str(user["_id"]),
         "role": user["role"],
         "email": user.get("email", ""),  # <-- ADD THIS
-        "createdAt": datetime.datetime.utcnow(),
-        "expiresAt": datetime.datetime.utcnow() + datetime.timedelta(hours=12)
+        "createdAt": now,
+        "expiresAt": now + datetime.timedelta(hours=SESSION_HOURS)
     }
-    sessions.insert_one(doc)
+
+    if SESSION_MODE == "signed":
+        return SIGNED_PREFIX + signer.dumps({
+            "userId": doc["userId"],
+            "role": doc["role"],
+            "email": doc["email"],
+        }), None
+
+    doc["_id"] = f"session_{uuid.uuid4().hex}"
+    return doc["_id"], doc
+
+
+def create_session(user):
+    session_id, doc = build_session(user)
+    if doc:
+        sessions.insert_one(doc)
     return session_id
 
 
+def _load_signed(session_id):
+    try:
+        data, signed_at = signer.loads(
+            session_id[len(SIGNED_PREFIX):],
+            max_age=SESSION_HOURS * 3600,
+            return_timestamp=True
+        )
+    except BadSignature:
+        return None
+
+    created = signed_at.replace(tzinfo=None)
+    return dict(
+        data,
+        _id=session_id,
+        createdAt=created,
+        expiresAt=created + datetime.timedelta(hours=SESSION_HOURS)
+    )
+
+
 def validate_session(req):
     session_id = req.headers.get("x-session-id")
     if not session_id:
         return None
 
-    session = sessions.find_one({"_id": session_id})
-    if not session:
-        return None
+    session = session_cache.get(session_id)
+    if session is None:
+        if session_id.startswith(SIGNED_PREFIX):
+            if SESSION_MODE != "signed":
+                return None
+            session = _load_signed(session_id)
+        else:
+            with span("session_lookup"):
+                session = sessions.find_one({"_id": session_id})
+        if not session:
+            return None
+        session_cache.set(session_id, session)
+
+    return check_expiry(session_id, session)
+
 
+def check_expiry(session_id, session):
+    """The session, or None (and out of the cache) once it has expired."""
     if session["expiresAt"] < datetime.datetime.utcnow():
+        session_cache.pop(session_id)
         return None
-
     return session
 
 
+def invalidate_session(session_id):
+    session_cache.pop(session_id)
+    if not session_id.startswith(SIGNED_PREFIX):
+        sessions.delete_one({"_id": session_id})
+
+
 @auth.route("/register", methods=["POST"])
 def register():
     data = request.json
@@ -77,4 +150,12 @@ def login():
         "role": user["role"],
         "email": user["email"],
         "name": user["name"]
-    })
\ No newline at end of file
+    })
+
+
+@auth.route("/logout", methods=["POST"])
+def logout():
+    session_id = request.headers.get("x-session-id")
+    if session_id:
+        invalidate_session(session_id)
+    return jsonify({"msg": "Logged out"})
@@ -0,0 +1,89 @@
+# backend/bench/bench_pricing.py
+#
+# Pricing a 10k-line bill of materials: the original float/dict
+# generate_quotation against pricing.price_quotation (int64 cents, one
+# catalog lookup). The price cache is pre-filled so no database is needed.
+#
+# This measures what exactness costs, not a speed-up: price_quotation
+# resolves and checks every line against the catalog, which the legacy
+# code never did, and still builds one dict per line. Expect it to be
+# a few times slower; most of that is the per-line formatting.
+#
+#   python bench/bench_pricing.py [lines] [rounds]
+
+import os
+import sys
+import time
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pricing
+
+
+def legacy_generate_quotation(detected_items, tax_rate=0.18, discount_rate=0.0):
+    formatted_items = []
+    for item in detected_items:
+        formatted_items.append({
+            "itemNo": item.get("itemNo", "N/A"),
+            "product": item["product"],
+            "productId": item.get("productId", "N/A"),
+            "productGroup": item.get("productGroup", "N/A"),
+            "quantity": item["quantity"],
+            "unit_price": item["unit_price"],
+            "supplier": item.get("supplier", "N/A"),
+            "store": item.get("store", "N/A"),
+            "line_total": item["line_total"],
+            "match_confidence": item.get("match_confidence", 0)
+        })
+
+    subtotal = sum(item["line_total"] for item in formatted_items)
+    tax_amount = subtotal * tax_rate
+    discount_amount = subtotal * discount_rate
+    return round(subtotal + tax_amount - discount_amount, 2)
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rng = random.Random(0)
+
+    catalog = [{
+        "productId": f"SKU-{i:06d}",
+        "itemNo": str(i),
+        "product": f"Product {i}",
+        "productGroup": rng.choice(["Chair", "Desk", "Shelf", "Organiser", "Plant"]),
+        "price": round(rng.uniform(5, 50000), 2),
+        "supplier": "IKEA",
+        "store": "IKEA Hyderabad",
+    } for i in range(lines)]
+    pricing.price_cache.set_many({doc["productId"]: doc for doc in catalog})
+
+    bom = [{"productId": doc["productId"], "quantity": rng.randint(1, 200)} for doc in catalog]
+    legacy_items = [dict(doc, quantity=b["quantity"], unit_price=doc["price"],
+                         line_total=b["quantity"] * doc["price"]) for doc, b in zip(catalog, bom)]
+    tiers = pricing.parse_tiers("10:2,50:5,100:8")
+
+    def best(fn):
+        times = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            result = fn()
+            times.append(time.perf_counter() - start)
+        return min(times), result
+
+    t_old, old_total = best(lambda: legacy_generate_quotation(legacy_items))
+    t_new, (q, _) = best(lambda: pricing.price_quotation(bom, tiers=[]))
+    t_tier, _ = best(lambda: pricing.price_quotation(bom, tiers=tiers))
+    # work the legacy code never did: it trusted the prices the caller sent
+    t_lookup, _ = best(lambda: pricing.lookup_prices(pricing.line_product_ids(bom)))
+
+    print(f"{lines} lines, best of {rounds}")
+    print(f"legacy float generate_quotation  {t_old * 1000:8.1f} ms  grandTotal={old_total}")
+    print(f"price_quotation (exact cents)    {t_new * 1000:8.1f} ms  grandTotal={q['pricing']['grandTotal']}")
+    print(f"price_quotation + volume tiers   {t_tier * 1000:8.1f} ms")
+    print(f"  of which catalog lookup        {t_lookup * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# backend/bench/bench_serialization.py
+#
+# Serialising a 10k-document list response: the old per-document _id loop +
+# Flask's default jsonify, against BSONJSONProvider.
+#
+#   python bench/bench_serialization.py [docs] [rounds]
+
+import os
+import sys
+import copy
+import time
+import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson import ObjectId
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from utils.serialization import BSONJSONProvider, orjson
+
+
+def make_quotations(n):
+    now = datetime.datetime.utcnow()
+    return [{
+        "_id": ObjectId(),
+        "quotationId": f"QT-{i:08X}",
+        "customerId": str(ObjectId()),
+        "salesExecutiveId": str(ObjectId()),
+        "date": "2026-10-18",
+        "items": [{
+            "itemNo": str(3000 + j),
+            "product": "FLINTAN High-Back Executive Chair",
+            "productId": f"IK-CH-{3000 + j}",
+            "quantity": j + 1,
+            "unit_price": 9999,
+            "line_total": 9999 * (j + 1),
+            "match_confidence": 0.812,
+        } for j in range(5)],
+        "pricing": {"subtotal": 149985.0, "taxRate": 0.18, "grandTotal": 176982.3},
+        "status": "pending",
+        "createdAt": now,
+    } for i in range(n)]
+
+
+def bench(label, fn, docs, rounds):
+    best = float("inf")
+    for _ in range(rounds):
+        batch = copy.deepcopy(docs)
+        start = time.perf_counter()
+        size = fn(batch)
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<28} {best * 1000:8.1f} ms  {size / 1024:8.0f} KiB")
+    return best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    docs = make_quotations(n)
+
+    old_app = Flask("old")
+    old_app.json = DefaultJSONProvider(old_app)
+    new_app = Flask("new")
+    new_app.json = BSONJSONProvider(new_app)
+
+    def old(batch):
+        with old_app.app_context():
+            for d in batch:
+                d["_id"] = str(d["_id"])
+            return len(old_app.json.response(batch).get_data())
+
+    def new(batch):
+        with new_app.app_context():
+            return len(new_app.json.response(batch).get_data())
+
+    print(f"{n} documents, best of {rounds}, orjson={'yes' if orjson else 'no'}")
+    t_old = bench("str(_id) loop + jsonify", old, docs, rounds)
+    t_new = bench("BSONJSONProvider", new, docs, rounds)
+    print(f"speedup: {t_old / t_new:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+# backend/bench/fake_gemini.py
+#
+# A local HTTP server speaking the Gemini REST API (generateContent,
+# embedContent, batchEmbedContents) with injectable latency, slow tails and
+# errors, for exercising utils/gemini_client.py end to end without the
+# provider. Point the backend at it with GEMINI_API_ENDPOINT.
+#
+#   python bench/fake_gemini.py serve --port 8765 --latency-ms 200 --error-rate 0.1
+#   GEMINI_API_ENDPOINT=http://127.0.0.1:8765 python app.py
+#
+#   python bench/fake_gemini.py check      # coalescing, retries, breaker, hedging
+#
+# Responses reuse the deterministic fakes from bench/fakes.py.
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakes  # noqa: E402  (bench/ is on sys.path when run as a script)
+
+ROUTE = re.compile(r"^/v1beta/(?P<model>models/[^:]+):(?P<method>\w+)")
+
+
+class Behaviour:
+    """How the server answers; changeable while it runs."""
+    latency = 0.0        # seconds added to every response
+    slow_rate = 0.0      # share of responses delayed by slow_latency instead
+    slow_latency = 1.0
+    error_rate = 0.0     # share answered 503
+    fail_next = 0        # the next n requests answered 503
+    rate_limit = 0       # requests per second before answering 429 (0 = off)
+
+
+class Counters:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.requests = 0
+        self.errors = 0
+        self._window = []
+
+    def hit(self):
+        """Count a request; returns the number seen in the last second."""
+        with self._lock:
+            now = time.monotonic()
+            self.requests += 1
+            self._window = [t for t in self._window if now - t < 1] + [now]
+            return len(self._window)
+
+
+counters = Counters()
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status, message):
+        counters.errors += 1
+        self._send(status, {"error": {"code": status, "message": message, "status": "UNAVAILABLE"}})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        match = ROUTE.match(self.path)
+        if not match:
+            return self._error(404, f"no route {self.path}")
+
+        recent = counters.hit()
+        if Behaviour.rate_limit and recent > Behaviour.rate_limit:
+            return self._error(429, "rate limit exceeded")
+        if Behaviour.fail_next > 0:
+            Behaviour.fail_next -= 1
+            return self._error(503, "injected failure")
+        if random.random() < Behaviour.error_rate:
+            return self._error(503, "injected failure")
+
+        slow = random.random() < Behaviour.slow_rate
+        time.sleep(Behaviour.slow_latency if slow else Behaviour.latency)
+
+        method = match.group("method")
+        if method == "generateContent":
+            reply = fakes.FakeVisionModel().generate_content(body.get("contents")).text
+            return self._send(200, {"candidates": [{
+                "content": {"role": "model", "parts": [{"text": reply}]},
+                "finishReason": "STOP", "index": 0,
+            }]})
+        if method == "embedContent":
+            return self._send(200, {"embedding": {"values": fakes.fake_vector(_text(body))}})
+        if method == "batchEmbedContents":
+            return self._send(200, {"embeddings": [
+                {"values": fakes.fake_vector(_text(r))} for r in body.get("requests", [])
+            ]})
+        return self._error(404, f"unknown method {method}")
+
+
+def _text(request_body):
+    return " ".join(p.get("text", "") for p in request_body.get("content", {}).get("parts", []))
+
+
+def serve(port=0):
+    """Start the server on a background thread. Returns (server, base url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+# ---------------- CHECK ---------------- #
+
+def _parallel(fn, n):
+    results, errors = [None] * n, []
+
+    def run(i):
+        try:
+            results[i] = fn(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results, errors
+
+
+def _percentile(samples, q):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * q))]
+
+
+def check():
+    """Run the client's resilience features against a local server and print what happened."""
+    _, url = serve()
+    os.environ["GEMINI_API_ENDPOINT"] = url
+    os.environ.setdefault("GEMINI_API_KEY", "fake")
+    os.environ.setdefault("GEMINI_TIMEOUT_SECONDS", "5")
+    from utils import gemini_client as client
+
+    model = "models/text-embedding-004"
+    client.RETRY_BASE_MS = 20
+
+    def section(title):
+        counters.reset()
+        client.breaker = client.CircuitBreaker(client.BREAKER_FAILURES, 0.5)
+        for key in client.stats:
+            client.stats[key] = 0
+        print(f"\n{title}")
+
+    section("coalescing: 8 concurrent identical embeds")
+    Behaviour.latency = 0.2
+    results, errors = _parallel(lambda i: client.embed_content(model=model, content="black office chair"), 8)
+    print(f"  requests sent {counters.requests}, coalesced {client.stats['coalesced']}, errors {len(errors)}")
+
+    section("retries: next 2 requests fail with 503")
+    Behaviour.latency, Behaviour.fail_next = 0.01, 2
+    client.embed_content(model=model, content="visitor chair")
+    print(f"  requests sent {counters.requests}, retries {client.stats['retries']}")
+
+    section("generateContent through the REST transport")
+    response = client.generate_content("gemini-2.5-flash", ["list the furniture"])
+    print(f"  {len(json.loads(response.text))} items detected")
+
+    section("breaker: every request fails")
+    Behaviour.error_rate = 1.0
+    outcomes = []
+    for i in range(4):
+        try:
+            client.embed_content(model=model, content=f"desk {i}")
+            outcomes.append("ok")
+        except client.ModelUnavailable:
+            outcomes.append("rejected")
+        except Exception:
+            outcomes.append("failed")
+    sent = counters.requests
+    Behaviour.error_rate = 0.0
+    time.sleep(0.6)
+    client.embed_content(model=model, content="desk probe")
+    print(f"  outcomes {outcomes}, requests sent {sent}, state after probe {client.breaker.state}")
+
+    section("hedging: 10% of responses take 1s")
+    Behaviour.latency, Behaviour.slow_rate, Behaviour.slow_latency = 0.05, 0.1, 1.0
+    for hedge_ms in (0, 150):
+        client.HEDGE_AFTER_MS = hedge_ms
+        samples = []
+        for i in range(60):
+            started = time.perf_counter()
+            client.embed_content(model=model, content=f"shelf {hedge_ms} {i}")
+            samples.append((time.perf_counter() - started) * 1000)
+        print(
+            f"  hedge after {hedge_ms or 'off'}: p50 {_percentile(samples, 0.5):.0f} ms, "
+            f"p95 {_percentile(samples, 0.95):.0f} ms, max {max(samples):.0f} ms, "
+            f"hedges {client.stats['hedges']}, hedge wins {client.stats['hedgeWins']}"
+        )
+        client.stats["hedges"] = client.stats["hedgeWins"] = 0
+    client.HEDGE_AFTER_MS = 0
+    Behaviour.slow_rate = 0.0
+
+    section("rate limit: 20 calls, 10/s bucket with burst 5")
+    client.bucket = client.TokenBucket(10, 5)
+    started = time.perf_counter()
+    _parallel(lambda i: client.embed_content(model=model, content=f"plant {i}"), 20)
+    print(f"  took {time.perf_counter() - started:.2f} s for {counters.requests} requests")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Gemini REST server")
+    parser.add_argument("command", choices=["serve", "check"])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--slow-rate", type=float, default=0)
+    parser.add_argument("--slow-ms", type=float, default=1000)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests per second before 429s")
+    args = parser.parse_args()
+
+    Behaviour.latency = args.latency_ms / 1000
+    Behaviour.slow_rate = args.slow_rate
+    Behaviour.slow_latency = args.slow_ms / 1000
+    Behaviour.error_rate = args.error_rate
+    Behaviour.rate_limit = args.rate_limit
+
+    if args.command == "check":
+        check()
+    else:
+        server, url = serve(args.port)
+        print(f"fake Gemini on {url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,159 @@
+# backend/bench/fakes.py
+#
+# Offline stand-ins for the benchmark suite: an in-memory Mongo (mongomock,
+# plus mongomock-motor for asgi.py) and deterministic Gemini vision /
+# embedding clients, sync and async, with injectable latency. install() must
+# run before app (or any backend module) is imported.
+
+import os
+import json
+import asyncio
+import time
+import types
+import hashlib
+import itertools
+import numpy as np
+from utils.quantize import pack
+from utils.matching import categories_of
+
+DIM = int(os.getenv("BENCH_EMBED_DIM", "128"))
+STORE_FORMAT = os.getenv("EMBED_STORE_FORMAT", "f16")
+
+ITEM_NAMES = [
+    "black office chair", "visitor chair", "wooden executive desk",
+    "wall shelving unit", "desk organiser", "potted plant",
+    "standing desk", "bookshelf",
+]
+ADJECTIVES = ["", "modern", "ergonomic", "compact", "large", "black", "white", "oak"]
+
+
+# one direction per catalog category, so texts naming a category land near
+# that category's products the way real embeddings do
+GROUPS = ["Chair", "Desk", "Shelf", "Organiser", "Plant"]
+_centers = np.random.default_rng(1).standard_normal((len(GROUPS), DIM))
+CENTERS = dict(zip((g.lower() for g in GROUPS), _centers / np.linalg.norm(_centers, axis=1, keepdims=True)))
+SPREAD = 0.6
+
+
+def _near(center, noise):
+    vec = center + SPREAD * noise / np.linalg.norm(noise, axis=-1, keepdims=True)
+    return vec / np.linalg.norm(vec, axis=-1, keepdims=True)
+
+
+def fake_vector(text):
+    """Same text -> same unit vector, without any model."""
+    seed = int.from_bytes(hashlib.sha1(text.encode("utf-8")).digest()[:8], "little")
+    noise = np.random.default_rng(seed).standard_normal(DIM)
+    named = [CENTERS[c] for c in categories_of(text) if c in CENTERS]
+    center = np.mean(named, axis=0) if named else np.zeros(DIM)
+    return _near(center, noise).tolist()
+
+
+class Latency:
+    """Seconds of sleep added to every fake model call; changeable while running."""
+    vision = 0.0
+    embed = 0.0
+
+
+class FakeVisionModel:
+    _calls = itertools.count()
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def generate_content(self, parts, **kwargs):
+        time.sleep(Latency.vision)
+        return self._detections()
+
+    def _detections(self):
+        n = next(self._calls)
+        # a different adjective each call so the embedding cache does not hide the work
+        detected = [
+            {"item_name": f"{ADJECTIVES[(n + i) % len(ADJECTIVES)]} {name} {n}".strip(), "quantity": 1 + i % 3}
+            for i, name in enumerate(ITEM_NAMES)
+        ]
+        return types.SimpleNamespace(text=json.dumps(detected))
+
+    async def generate_content_async(self, parts, **kwargs):
+        await asyncio.sleep(Latency.vision)
+        return self._detections()
+
+
+def _embeddings(content):
+    if isinstance(content, (list, tuple)):
+        return {"embedding": [fake_vector(c) for c in content]}
+    return {"embedding": fake_vector(content)}
+
+
+def fake_embed_content(model=None, content=None, **kwargs):
+    time.sleep(Latency.embed)
+    return _embeddings(content)
+
+
+async def fake_embed_content_async(model=None, content=None, **kwargs):
+    await asyncio.sleep(Latency.embed)
+    return _embeddings(content)
+
+
+def install():
+    """Point pymongo and google.generativeai at the stand-ins. Returns the shared mongo client."""
+    try:
+        import mongomock
+    except ImportError:
+        raise SystemExit("The benchmark suite needs mongomock: pip install mongomock")
+
+    import pymongo
+    import google.generativeai as genai
+
+    os.environ.setdefault("MONGODB_URI", "mongodb://bench")
+    os.environ.setdefault("MONGODB_DB", "bench")
+    os.environ.setdefault("MONGODB_PRODUCTS_COLLECTION", "products")
+    os.environ.setdefault("GEMINI_API_KEY", "bench")
+    os.environ["EMBED_INDEXER"] = "0"
+    os.environ["APP_WARMUP"] = "off"
+
+    client = mongomock.MongoClient()
+    pymongo.MongoClient = lambda *args, **kwargs: client
+
+    genai.configure = lambda **kwargs: None
+    genai.GenerativeModel = FakeVisionModel
+    genai.embed_content = fake_embed_content
+    genai.embed_content_async = fake_embed_content_async
+
+    # motor over the same in-memory data, when the async stack is installed
+    try:
+        import mongomock_motor
+        from motor import motor_asyncio
+    except ImportError:
+        pass
+    else:
+        motor_asyncio.AsyncIOMotorClient = lambda *args, **kwargs: mongomock_motor.AsyncMongoMockClient(
+            mock_mongo_client=client
+        )
+    return client
+
+
+def synthetic_catalog(n, seed=0):
+    """n products shaped like seed_products.py, with precomputed embeddings."""
+    rng = np.random.default_rng(seed)
+    groups = GROUPS
+    centers = np.stack([CENTERS[groups[i % len(groups)].lower()] for i in range(n)])
+    vectors = _near(centers, rng.standard_normal((n, DIM))).astype(np.float32)
+    prices = np.round(rng.uniform(100, 50000, n), 2)
+
+    for i in range(n):
+        group = groups[i % len(groups)]
+        yield {
+            "itemNo": str(10000 + i),
+            "product": f"Synthetic {group} {i}",
+            "productId": f"SYN-{group[:2].upper()}-{i:06d}",
+            "shortText": f"{group} number {i}",
+            "description": f"Synthetic catalog {group.lower()} for benchmarking.",
+            "productGroup": group,
+            "price": float(prices[i]),
+            "supplier": "BENCH",
+            "store": "BENCH",
+            "stockQuantity": 10,
+            "tags": [group.lower()],
+            "embedding": pack(vectors[i], STORE_FORMAT),
+        }
@@ -0,0 +1,272 @@
+# backend/bench/load_test.py
+#
+# Throughput of the Flask app (gunicorn, gthread) against the async app
+# (asgi.py under uvicorn), both on the offline stand-ins from bench/fakes.py
+# with injected model latency. Each server runs one worker process; the load
+# comes from this process over keep-alive connections. "per core" is
+# requests / server CPU seconds (read from /proc), so time spent waiting on
+# the fake model is not counted against either server.
+#
+#   python bench/load_test.py
+#   python bench/load_test.py --modes asgi --concurrency 128 --duration 20
+#   python bench/load_test.py --vision-latency 800 --embed-latency 150 --scenarios analyze
+#
+# Needs gunicorn, uvicorn, mongomock-motor and the asgi.py dependencies.
+
+import os
+import sys
+import time
+import json
+import uuid
+import socket
+import asyncio
+import argparse
+import statistics
+import subprocess
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BACKEND_DIR)
+
+IMAGE = open(os.path.join(BACKEND_DIR, "office.jpg"), "rb").read()
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+
+
+# ---------------- SERVER SIDE ---------------- #
+
+def _prepare():
+    """Stand-ins, latency and a seeded catalog, in the server process."""
+    import fakes
+    import run_bench
+
+    client = fakes.install()
+    fakes.Latency.vision = float(os.getenv("BENCH_VISION_LATENCY_MS", "0")) / 1000
+    fakes.Latency.embed = float(os.getenv("BENCH_EMBED_LATENCY_MS", "0")) / 1000
+    run_bench.seed(client[os.environ["MONGODB_DB"]], int(os.getenv("BENCH_CATALOG_SIZE", "1000")))
+
+
+def flask_server():
+    """gunicorn "load_test:flask_server()" """
+    _prepare()
+    import app
+    return app.create_app()
+
+
+def asgi_server():
+    """uvicorn load_test:asgi_server --factory"""
+    _prepare()
+    import asgi
+    return asgi.create_asgi_app()
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(mode, args):
+    port = _free_port()
+    env = dict(
+        os.environ,
+        BENCH_VISION_LATENCY_MS=str(args.vision_latency),
+        BENCH_EMBED_LATENCY_MS=str(args.embed_latency),
+        BENCH_CATALOG_SIZE=str(args.size),
+        ANALYZE_CACHE_PHASH="0",  # every upload differs by a few trailing bytes
+        METRICS_ENABLED="0",
+    )
+    if mode == "flask":
+        cmd = [
+            sys.executable, "-m", "gunicorn", "-w", "1", "-k", "gthread", "--threads", str(args.flask_threads),
+            "-b", f"127.0.0.1:{port}", "--chdir", BENCH_DIR, "--log-level", "warning", "load_test:flask_server()",
+        ]
+    else:
+        cmd = [
+            sys.executable, "-m", "uvicorn", "load_test:asgi_server", "--factory", "--app-dir", BENCH_DIR,
+            "--port", str(port), "--log-level", "warning", "--no-access-log",
+        ]
+    proc = subprocess.Popen(cmd, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if proc.poll() is not None:
+            raise SystemExit(f"{mode} server exited:\n{proc.stderr.read().decode()}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return proc, port
+        except OSError:
+            time.sleep(0.2)
+    proc.kill()
+    raise SystemExit(f"{mode} server did not start")
+
+
+def cpu_seconds(pid):
+    """User + system CPU of a process and its children (gunicorn's worker)."""
+    total = 0
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        total += (int(fields[11]) + int(fields[12])) / CLOCK_TICKS
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            children = f.read().split()
+    except FileNotFoundError:
+        return total
+    return total + sum(cpu_seconds(int(child)) for child in children)
+
+
+# ---------------- CLIENT SIDE ---------------- #
+
+def _request(method, path, headers=None, body=b"", content_type=None):
+    lines = [f"{method} {path} HTTP/1.1", "Host: bench"]
+    for k, v in (headers or {}).items():
+        lines.append(f"{k}: {v}")
+    if content_type:
+        lines.append(f"Content-Type: {content_type}")
+    lines.append(f"Content-Length: {len(body)}")
+    return ("\r\n".join(lines) + "\r\n\r\n").encode() + body
+
+
+def _json(method, path, payload, headers=None):
+    return _request(method, path, headers, json.dumps(payload).encode(), "application/json")
+
+
+def _upload(headers):
+    boundary = uuid.uuid4().hex
+    # trailing bytes after the JPEG end marker: a new cache key, the same picture
+    image = IMAGE + uuid.uuid4().bytes
+    body = (
+        f"--{boundary}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"site.jpg\"\r\n"
+        f"Content-Type: image/jpeg\r\n\r\n"
+    ).encode() + image + f"\r\n--{boundary}--\r\n".encode()
+    return _request("POST", "/analyze-image", headers, body, f"multipart/form-data; boundary={boundary}")
+
+
+async def _send(reader, writer, raw):
+    writer.write(raw)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split(b" ", 2)[1])
+    headers = {
+        k.strip().lower(): v.strip()
+        for k, v in (line.split(b":", 1) for line in head.split(b"\r\n")[1:] if b":" in line)
+    }
+    if headers.get(b"transfer-encoding") == b"chunked":
+        body = b""
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            chunk = await reader.readexactly(size + 2)
+            if not size:
+                break
+            body += chunk[:-2]
+    else:
+        body = await reader.readexactly(int(headers.get(b"content-length", 0)))
+    return status, body
+
+
+async def _call(port, raw):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        return await _send(reader, writer, raw)
+    finally:
+        writer.close()
+
+
+async def _worker(port, make_request, until, samples, errors):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    try:
+        while time.perf_counter() < until:
+            started = time.perf_counter()
+            try:
+                status, _ = await _send(reader, writer, make_request())
+            except (asyncio.IncompleteReadError, ConnectionError):
+                errors.append("connection")
+                writer.close()
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+                continue
+            if status >= 400:
+                errors.append(status)
+            else:
+                samples.append(time.perf_counter() - started)
+    finally:
+        writer.close()
+
+
+async def scenarios(port):
+    """name -> function building one request, with a logged-in sales session."""
+    _, body = await _call(port, _json("POST", "/auth/login", {"email": "sales@bench", "password": "sales"}))
+    session = {"x-session-id": json.loads(body)["sessionId"]}
+    await _call(port, _json("POST", "/customer/create", {"name": "Load Co", "email": "load@bench"}, session))
+    bom = {"items": [{"productId": f"SYN-CH-{i * 5:06d}", "quantity": 1 + i} for i in range(20)]}
+
+    return {
+        "analyze": lambda: _upload({}),
+        "customers": lambda: _request("GET", "/customer/list?limit=50", session),
+        "price": lambda: _json("POST", "/quotation/price", bom, session),
+    }
+
+
+async def run_load(port, pid, make_request, args):
+    samples, errors = [], []
+    # warm up: catalog load, first model calls, connection setup
+    await asyncio.gather(*[
+        _worker(port, make_request, time.perf_counter() + args.warmup, [], [])
+        for _ in range(min(4, args.concurrency))
+    ])
+
+    cpu_before = cpu_seconds(pid)
+    started = time.perf_counter()
+    until = started + args.duration
+    await asyncio.gather(*[_worker(port, make_request, until, samples, errors) for _ in range(args.concurrency)])
+    wall = time.perf_counter() - started
+    cpu = cpu_seconds(pid) - cpu_before
+
+    samples.sort()
+    return {
+        "requests": len(samples),
+        "errors": len(errors),
+        "rps": round(len(samples) / wall, 1),
+        "p50_ms": round(statistics.median(samples) * 1000, 1) if samples else None,
+        "p95_ms": round(samples[int(len(samples) * 0.95)] * 1000, 1) if samples else None,
+        "cpu_s": round(cpu, 2),
+        "rps_per_core": round(len(samples) / cpu, 1) if cpu else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Flask vs ASGI throughput on the offline stand-ins")
+    parser.add_argument("--modes", default="flask,asgi")
+    parser.add_argument("--scenarios", default="analyze,customers,price")
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=2)
+    parser.add_argument("--size", type=int, default=1000, help="catalog size")
+    parser.add_argument("--flask-threads", type=int, default=8)
+    parser.add_argument("--vision-latency", type=float, default=400, help="ms per fake vision call")
+    parser.add_argument("--embed-latency", type=float, default=80, help="ms per fake embedding call")
+    parser.add_argument("--save", help="write results as JSON")
+    args = parser.parse_args()
+
+    results = {}
+    for mode in args.modes.split(","):
+        proc, port = start_server(mode, args)
+        try:
+            requests = asyncio.run(scenarios(port))
+            for name in args.scenarios.split(","):
+                result = asyncio.run(run_load(port, proc.pid, requests[name], args))
+                results[f"{mode}/{name}"] = result
+                print(
+                    f"{mode:6} {name:10} {result['rps']:8.1f} req/s  p50 {result['p50_ms']} ms  "
+                    f"p95 {result['p95_ms']} ms  cpu {result['cpu_s']} s  "
+                    f"{result['rps_per_core']} req/s per core  errors {result['errors']}"
+                )
+        finally:
+            proc.terminate()
+            proc.wait()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+# backend/bench/run_bench.py
+#
+# Offline benchmark suite: runs the Flask app against an in-memory Mongo and
+# fake Gemini clients (bench/fakes.py) on synthetic catalogs and times the
+# hot paths. Results can be saved as a baseline and compared run to run.
+# Mongo-bound timings include the stand-in's own overhead, so compare them
+# against earlier runs of this suite, not against production numbers.
+#
+#   python bench/run_bench.py                              # 1k, 10k, 100k (100k takes minutes)
+#   python bench/run_bench.py --sizes 1000,10000 --save baseline.json
+#   python bench/run_bench.py --compare baseline.json      # exit 1 on regression
+#   python bench/run_bench.py --vision-latency 800 --embed-latency 150
+
+import os
+import sys
+import io
+import json
+import time
+import argparse
+import datetime
+import platform
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import fakes  # noqa: E402  (bench/ is on sys.path when run as a script)
+
+
+def timed(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    samples.sort()
+    return {
+        "p50_ms": round(statistics.median(samples), 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "rounds": rounds,
+    }
+
+
+def seed(db, size):
+    from werkzeug.security import generate_password_hash
+
+    for name in ("products", "users", "sessions", "customers", "quotations", "analytics_rollups"):
+        db[name].delete_many({})
+        # mongomock never uses indexes for reads and checks unique ones with a
+        # full scan per insert, which would dominate seeding at 100k products
+        db[name].drop_indexes()
+
+    batch = []
+    for doc in fakes.synthetic_catalog(size):
+        batch.append(doc)
+        if len(batch) == 5000:
+            db["products"].insert_many(batch)
+            batch = []
+    if batch:
+        db["products"].insert_many(batch)
+
+    db["users"].insert_many([
+        {"name": "Bench Admin", "email": "admin@bench", "password": generate_password_hash("admin", "pbkdf2:sha256:1000"), "role": "admin"},
+        {"name": "Bench Sales", "email": "sales@bench", "password": generate_password_hash("sales", "pbkdf2:sha256:1000"), "role": "sales"},
+    ])
+
+
+def run_size(app_module, db, size, args):
+    import pricing
+    from utils.matching import catalog_index
+
+    print(f"\n== {size} products ==")
+    start = time.perf_counter()
+    seed(db, size)
+    catalog_index.invalidate()
+    pricing.price_cache.clear()
+    print(f"seeded in {time.perf_counter() - start:.1f}s")
+
+    client = app_module.app.test_client()
+
+    def login(email, password):
+        return client.post("/auth/login", json={"email": email, "password": password}).get_json()
+
+    admin = {"x-session-id": login("admin@bench", "admin")["sessionId"]}
+    sales_login = login("sales@bench", "sales")
+    sales = {"x-session-id": sales_login["sessionId"]}
+    sales_id = sales_login["userId"]
+
+    customer_id = client.post("/customer/create", json={"name": "Bench Co", "email": "co@bench"}, headers=sales).get_json()["id"]
+    quotation = app_module.generate_quotation([{
+        "productId": "SYN-CH-000000", "product": "x", "quantity": 1, "unit_price": 1
+    }])
+    db["quotations"].insert_many([
+        dict(quotation, quotationId=f"QB-{i}", customerId=customer_id, salesExecutiveId=sales_id,
+             status="pending", createdAt=datetime.datetime.utcnow())
+        for i in range(args.quotations)
+    ])
+
+    start = time.perf_counter()
+    catalog_index.ensure_loaded(app_module.load_catalog)
+    load_ms = (time.perf_counter() - start) * 1000
+
+    counter = iter(range(10 ** 9))
+
+    def analyze():
+        # unique bytes so the result cache never answers
+        data = b"\xff\xd8\xff" + str(next(counter)).encode()
+        res = client.post("/analyze-image", data={"file": (io.BytesIO(data), "bench.jpg")})
+        assert res.status_code == 200, res.get_data(as_text=True)
+
+    detections = json.loads(fakes.FakeVisionModel().generate_content(None).text)
+    lines = [{"productId": f"SYN-CH-{i * 5:06d}", "quantity": 1 + i % 7} for i in range(min(size // 5, 1000))]
+
+    results = {"catalog_load_ms": round(load_ms, 3)}
+    results["analyze_image"] = timed(analyze, args.rounds)
+    results["match_items"] = timed(lambda: app_module.match_items(detections), args.rounds)
+    results["session_route"] = timed(
+        lambda: client.get("/customer/by-email/co@bench", headers=sales), args.rounds * 5)
+    results["list_products_page"] = timed(
+        lambda: client.get("/admin/products?limit=1000", headers=admin), args.rounds)
+    results["list_sales_quotations"] = timed(
+        lambda: client.get(f"/quotation/sales/{sales_id}", headers=sales), args.rounds)
+    results["generate_quotation_8"] = timed(
+        lambda: pricing.generate_quotation(lines[:8]), args.rounds * 5)
+    results[f"generate_quotation_{len(lines)}"] = timed(
+        lambda: pricing.generate_quotation(lines), args.rounds)
+
+    for name, value in results.items():
+        if isinstance(value, dict):
+            print(f"{name:<28} p50 {value['p50_ms']:9.3f} ms   p95 {value['p95_ms']:9.3f} ms")
+        else:
+            print(f"{name:<28} {value:9.3f} ms")
+    return results
+
+
+def compare(current, baseline, threshold, floor_ms):
+    regressions = []
+    for size, metrics in current.items():
+        for name, value in metrics.items():
+            old = baseline.get(size, {}).get(name)
+            if not isinstance(value, dict) or not isinstance(old, dict):
+                continue
+            change = (value["p50_ms"] - old["p50_ms"]) / old["p50_ms"] if old["p50_ms"] else 0
+            slower_ms = value["p50_ms"] - old["p50_ms"]
+            flag = "REGRESSION" if change > threshold and slower_ms > floor_ms else ""
+            print(f"{size:>7} {name:<28} {old['p50_ms']:9.3f} -> {value['p50_ms']:9.3f} ms  {change:+7.1%} {flag}")
+            if flag:
+                regressions.append((size, name))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline backend benchmarks")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--quotations", type=int, default=500, help="quotations seeded for the sales list route")
+    parser.add_argument("--vision-latency", type=float, default=0, help="ms added to each fake vision call")
+    parser.add_argument("--embed-latency", type=float, default=0, help="ms added to each fake embedding call")
+    parser.add_argument("--save", help="write results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="p50 slowdown counted as a regression")
+    parser.add_argument("--floor-ms", type=float, default=1.0, help="ignore p50 slowdowns smaller than this")
+    args = parser.parse_args()
+
+    mongo = fakes.install()
+    fakes.Latency.vision = args.vision_latency / 1000
+    fakes.Latency.embed = args.embed_latency / 1000
+
+    import app as app_module
+
+    db = mongo[os.environ["MONGODB_DB"]]
+    results = {}
+    for size in (int(s) for s in args.sizes.split(",")):
+        results[str(size)] = run_size(app_module, db, size, args)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({
+                "meta": {
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "embedDim": fakes.DIM,
+                    "visionLatencyMs": args.vision_latency,
+                    "embedLatencyMs": args.embed_latency,
+                    "createdAt": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                },
+                "results": results,
+            }, f, indent=2)
+        print(f"\nsaved {args.save}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        print(f"\n== compared with {args.compare} ==")
+        if compare(results, baseline, args.threshold, args.floor_ms):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+# backend/catalog_import.py
+#
+# Streaming catalog ingestion from supplier feeds (CSV or JSONL). Rows are
+# read lazily and written in chunks: one productId $in lookup and one
+# bulk_write upsert per chunk. Stored embeddings survive unless a product's
+# embedded text changed (compared by embeddings.text_hash); changed products
+# have their vector unset and the background indexer re-embeds only those.
+#
+#   python catalog_import.py feed.csv [--chunk 1000] [--embed]
+#   python catalog_import.py feed.jsonl
+#   cat feed.csv | python catalog_import.py - --format csv
+#
+# CSV: a header row with the product field names; tags are "|"-separated
+# (or a JSON array), empty cells leave the stored value untouched. Rows for
+# stored products may be partial (e.g. productId,price for a price update).
+
+import io
+import os
+import sys
+import csv
+import json
+import argparse
+import datetime
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from db import products
+from embeddings import text_hash, TEXT_FIELDS
+from indexer import FAILURE_FIELDS
+from quotation_import import parse_jsonl
+
+CHUNK_SIZE = int(os.getenv("CATALOG_IMPORT_CHUNK", "1000"))
+
+# a row only needs productId to update a stored product; new ones need these
+REQUIRED_NEW = ("product", "price")
+NUMERIC = {"price": float, "stockQuantity": int}
+# never taken from a feed
+PROTECTED = ("_id", "embedding", "embeddingHash", "textHash", *FAILURE_FIELDS)
+
+
+def parse_csv(lines):
+    """Yields (line_no, row, error) per data row; empty cells are dropped."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        row = {k.strip(): v.strip() for k, v in row.items() if k and v is not None and v.strip() != ""}
+        if row:
+            yield reader.line_num, row, None
+
+
+def parse_feed(stream, fmt):
+    """Binary or text stream -> (line_no, row, error) rows."""
+    if isinstance(stream, (io.TextIOBase, list)):
+        text = stream
+    else:
+        text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    return parse_csv(text) if fmt == "csv" else parse_jsonl(text)
+
+
+def validate_row(row):
+    """Returns (fields_to_set, None) or (None, error message)."""
+    if not isinstance(row, dict):
+        return None, "not a JSON object"
+
+    # field names become $set paths: operators and dotted paths would write outside the product
+    bad = [k for k in row if not isinstance(k, str) or k.startswith("$") or "." in k]
+    if bad:
+        return None, f"invalid field name {bad[0]!r}"
+
+    doc = {k: v for k, v in row.items() if k not in PROTECTED}
+
+    if doc.get("productId") in (None, ""):
+        return None, "missing productId"
+    doc["productId"] = str(doc["productId"])
+
+    for field, cast in NUMERIC.items():
+        if field in doc:
+            try:
+                doc[field] = cast(doc[field])
+            except (TypeError, ValueError):
+                return None, f"invalid {field}"
+    if doc.get("price", 0) < 0:
+        return None, "invalid price"
+
+    tags = doc.get("tags")
+    if isinstance(tags, str):
+        try:
+            tags = json.loads(tags) if tags.startswith("[") else [t.strip() for t in tags.split("|") if t.strip()]
+        except ValueError:
+            return None, "invalid tags"
+    if tags is not None:
+        if not isinstance(tags, list):
+            return None, "tags must be a list"
+        doc["tags"] = [str(t) for t in tags]
+
+    return doc, None
+
+
+def _write_chunk(chunk, report):
+    """chunk: [(line_no, doc)]"""
+    ids = [doc["productId"] for _, doc in chunk]
+    existing = {
+        p["productId"]: p
+        for p in products.find({"productId": {"$in": ids}}, {"embedding": False})
+    }
+
+    now = datetime.datetime.utcnow()
+    ops, written = [], []
+    for line_no, doc in chunk:
+        old = existing.get(doc["productId"])
+        if old is not None and all(k in old and old[k] == v for k, v in doc.items()):
+            report["unchanged"] += 1
+            continue
+        missing = [f for f in REQUIRED_NEW if old is None and f not in doc]
+        if missing:
+            report["errors"].append({"line": line_no, "productId": doc["productId"], "error": f"new product missing {', '.join(missing)}"})
+            continue
+
+        # partial rows keep the stored text, so hash what the product will look like
+        merged = {**{f: old[f] for f in TEXT_FIELDS if old and f in old}, **doc}
+        new_hash = text_hash(merged)
+
+        update = {"$set": dict(doc, textHash=new_hash, updatedAt=now), "$setOnInsert": {"createdAt": now}}
+        if old is None:
+            outcome = "reembed"
+        elif new_hash != (old.get("embeddingHash") or old.get("textHash") or text_hash(old)):
+            # new text: embed it, and forget failures of the old one
+            update["$unset"] = {"embedding": "", "embeddingHash": "", **{f: "" for f in FAILURE_FIELDS}}
+            outcome = "reembed"
+        else:
+            outcome = "kept"
+
+        ops.append(UpdateOne({"productId": doc["productId"]}, update, upsert=True))
+        written.append((line_no, doc["productId"], outcome))
+
+    if not ops:
+        return
+    try:
+        upserted = len(products.bulk_write(ops, ordered=False).upserted_ids)
+        failed = {}
+    except BulkWriteError as e:
+        # unordered: the other rows were written; report the failed ones by line
+        upserted = len(e.details.get("upserted", []))
+        failed = {err["index"]: err.get("errmsg", "write failed") for err in e.details.get("writeErrors", [])}
+
+    for i, (line_no, product_id, outcome) in enumerate(written):
+        if i in failed:
+            report["errors"].append({"line": line_no, "productId": product_id, "error": failed[i]})
+        else:
+            report[outcome] += 1
+    report["inserted"] += upserted
+    report["updated"] += len(ops) - len(failed) - upserted
+
+
+def import_products(rows, chunk_size=CHUNK_SIZE):
+    """
+    rows: iterable of (line_no, row, parse_error) from parse_csv / parse_jsonl.
+    Returns {"inserted", "updated", "unchanged" (row matches the stored
+    product, nothing written), "kept" (embedding unchanged), "reembed"
+    (new or text changed), "errors"}.
+    """
+    report = {"inserted": 0, "updated": 0, "unchanged": 0, "kept": 0, "reembed": 0, "errors": []}
+    seen = set()
+    chunk = []
+
+    for line_no, row, error in rows:
+        doc = None
+        if not error:
+            doc, error = validate_row(row)
+        if not error and doc["productId"] in seen:
+            error = "duplicate productId in input"
+        if error:
+            pid = row.get("productId") if isinstance(row, dict) else None
+            report["errors"].append({"line": line_no, "productId": pid, "error": error})
+            continue
+
+        seen.add(doc["productId"])
+        chunk.append((line_no, doc))
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, report)
+            chunk = []
+
+    if chunk:
+        _write_chunk(chunk, report)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upsert a CSV/JSONL supplier feed into the catalog")
+    parser.add_argument("path", help="CSV or JSONL file, or - for stdin")
+    parser.add_argument("--format", choices=["csv", "jsonl"], help="default: from the file extension")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--embed", action="store_true", help="embed new and changed products before exiting")
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.path.lower().endswith(".csv") else "jsonl")
+    source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8-sig", newline="")
+    with source:
+        report = import_products(parse_feed(source, fmt), args.chunk)
+
+    for err in report["errors"]:
+        print(f"line {err['line']}: {err['error']} ({err['productId']})")
+    print(
+        f"{report['inserted']} inserted, {report['updated']} updated, {report['unchanged']} unchanged, "
+        f"{report['kept']} embeddings kept, {report['reembed']} to embed, {len(report['errors'])} errors"
+    )
+
+    if args.embed:
+        from indexer import indexer
+        embedded = indexer.sweep()
+        if indexer.leader:
+            indexer.lease.release()
+            print(f"{embedded} products embedded")
+        else:
+            # sweep() only works while holding the indexer lease; a running web worker has it
+            print("not embedded here: another process holds the indexer lease and will embed them")
@@ -1,18 +1,15 @@
 # backend/customer_routes.py
 
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
 from bson import ObjectId
-import os, datetime
+import datetime
 from dotenv import load_dotenv
 from auth import validate_session   # <-- REQUIRED FIX
+from db import customers
+from utils.pagination import list_response
 
 load_dotenv()
 
-mongo = MongoClient(os.getenv("MONGODB_URI"))
-db = mongo[os.getenv("MONGODB_DB")]
-customers = db["customers"]
-
 customer_routes = Blueprint("customers", __name__)
 
 # ---------------- CREATE CUSTOMER ---------------- #
@@ -45,10 +42,7 @@ def create_customer():
 
 @customer_routes.route("/sales/<sales_id>", methods=["GET"])
 def list_customers_for_sales(sales_id):
-    docs = list(customers.find({"salesExecutiveId": sales_id}))
-    for d in docs:
-        d["_id"] = str(d["_id"])
-    return jsonify(docs)
+    return list_response(customers, {"salesExecutiveId": sales_id}, request)
 
 
 # ---------------- LIST ALL CUSTOMERS (ADMIN / SALES) ---------------- #
@@ -59,11 +53,7 @@ def list_all_customers():
     if not session or session["role"] not in ["sales", "admin"]:
         return jsonify({"error": "Unauthorized"}), 403
 
-    docs = list(customers.find({}))
-    for c in docs:
-        c["_id"] = str(c["_id"])
-
-    return jsonify(docs)
+    return list_response(customers, {}, request)
 
 # ---------------- GET CUSTOMER BY EMAIL ---------------- #
 @customer_routes.route("/by-email/<email>", methods=["GET"])
@@ -77,5 +67,4 @@ def get_customer_by_email(email):
     if not customer:
         return jsonify({"error": "Customer not found"}), 404
     
-    customer["_id"] = str(customer["_id"])
     return jsonify(customer)
\ No newline at end of file
@@ -0,0 +1,164 @@
+# backend/db.py
+#
+# The one MongoClient (and so the one connection pool) of the process.
+# Every blueprint, the indexer and the seed scripts import collections from here.
+# The client is created on first use; see LAZY HANDLES.
+
+import os
+import threading
+import time
+from pymongo import MongoClient, monitoring
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class PoolStats(monitoring.ConnectionPoolListener):
+    """Counts connections in use and how long requests waited to check one out."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.checked_out = 0
+        self.open = 0
+        self.checkouts = 0
+        self.failed_checkouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def connection_check_out_started(self, event):
+        self._local.started = time.perf_counter()
+
+    def connection_checked_out(self, event):
+        waited = time.perf_counter() - getattr(self._local, "started", time.perf_counter())
+        with self._lock:
+            self.checked_out += 1
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.failed_checkouts += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def connection_created(self, event):
+        with self._lock:
+            self.open += 1
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.open -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "maxPoolSize": POOL_OPTIONS["maxPoolSize"],
+                "open": self.open,
+                "checkedOut": self.checked_out,
+                "checkouts": self.checkouts,
+                "failedCheckouts": self.failed_checkouts,
+                "avgWaitMs": round(1000 * self.wait_total / self.checkouts, 3) if self.checkouts else 0,
+                "maxWaitMs": round(1000 * self.wait_max, 3),
+            }
+
+
+def _int_env(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+POOL_OPTIONS = {
+    "maxPoolSize": _int_env("MONGO_MAX_POOL_SIZE", 50),
+    "minPoolSize": _int_env("MONGO_MIN_POOL_SIZE", 0),
+    "maxIdleTimeMS": _int_env("MONGO_MAX_IDLE_MS", 60000),
+    "waitQueueTimeoutMS": _int_env("MONGO_WAIT_QUEUE_TIMEOUT_MS", 5000),
+    "connectTimeoutMS": _int_env("MONGO_CONNECT_TIMEOUT_MS", 5000),
+    "serverSelectionTimeoutMS": _int_env("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000),
+    "socketTimeoutMS": _int_env("MONGO_SOCKET_TIMEOUT_MS", 30000),
+    "readPreference": os.getenv("MONGO_READ_PREFERENCE", "primary"),
+}
+
+pool_stats = PoolStats()
+
+# ---------------- LAZY HANDLES ---------------- #
+
+# Nothing below touches the network or needs MONGODB_* set until the first
+# query, so modules can import collections freely and workers boot fast.
+
+_client = None
+_client_lock = threading.Lock()
+
+# filled in once, read by /health/startup
+timings = {}
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                started = time.perf_counter()
+                _client = MongoClient(os.getenv("MONGODB_URI"), event_listeners=[pool_stats], **POOL_OPTIONS)
+                timings["clientMs"] = round((time.perf_counter() - started) * 1000, 1)
+    return _client
+
+
+class Lazy:
+    """Stands in for a client, database or collection until first used, then forwards everything."""
+
+    def __init__(self, resolve, label):
+        self._resolve = resolve
+        self._label = label
+        self._target = None
+
+    def _get(self):
+        if self._target is None:
+            self._target = self._resolve()
+        return self._target
+
+    def __getattr__(self, name):
+        return getattr(self._get(), name)
+
+    def __getitem__(self, name):
+        return self._get()[name]
+
+    def __repr__(self):
+        state = "resolved" if self._target is not None else "unresolved"
+        return f"<Lazy {self._label} ({state})>"
+
+
+def _collection(name_fn):
+    return Lazy(lambda: db[name_fn()], "collection")
+
+
+mongo = Lazy(get_client, "MongoClient")
+db = Lazy(lambda: get_client()[os.getenv("MONGODB_DB")], "database")
+
+products = _collection(lambda: os.getenv("MONGODB_PRODUCTS_COLLECTION"))
+users = _collection(lambda: "users")
+sessions = _collection(lambda: "sessions")
+customers = _collection(lambda: "customers")
+quotations = _collection(lambda: "quotations")
+rollups = _collection(lambda: "analytics_rollups")
+leases = _collection(lambda: "leases")
+deleted_products = _collection(lambda: "deleted_products")
+jobs = _collection(lambda: "analysis_jobs")
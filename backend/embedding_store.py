@@ -0,0 +1,79 @@
+# backend/embedding_store.py
+#
+# How product embeddings are stored in Mongo. New vectors are written as
+# packed BinData (EMBED_STORE_FORMAT: f16 by default, or i8) instead of a
+# BSON array of doubles; readers accept both, so a catalog can be migrated
+# in place while the app keeps serving.
+#
+#   python embedding_store.py check [f16|i8]     -> accuracy of a format vs float,
+#                                                  on the vectors still stored as arrays
+#   python embedding_store.py migrate [f16|i8]   -> repack every stored embedding
+#
+# Run `check` before `migrate`: once packed, the float originals are gone.
+
+import os
+import sys
+import numpy as np
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+from db import products
+from utils.quantize import pack, unpack, format_of, accuracy_report, FORMATS
+
+load_dotenv()
+
+STORE_FORMAT = os.getenv("EMBED_STORE_FORMAT", "f16")
+MIGRATE_BATCH = 1000
+
+if STORE_FORMAT not in FORMATS:
+    raise RuntimeError(f"EMBED_STORE_FORMAT must be one of {sorted(FORMATS)}")
+
+
+def encode(emb, fmt=STORE_FORMAT):
+    """Value written to products.embedding."""
+    return pack(emb, fmt)
+
+
+def migrate(fmt=STORE_FORMAT, collection=products):
+    """Repack every embedding not already in `fmt`. Returns how many were rewritten."""
+    ops, total = [], 0
+    cursor = collection.find({"embedding": {"$exists": True}}, {"embedding": True})
+
+    for doc in cursor:
+        if format_of(doc["embedding"]) == fmt:
+            continue
+        # match on the old value so a concurrent re-embed is never overwritten
+        ops.append(UpdateOne(
+            {"_id": doc["_id"], "embedding": doc["embedding"]},
+            {"$set": {"embedding": pack(unpack(doc["embedding"]), fmt)}}
+        ))
+        if len(ops) == MIGRATE_BATCH:
+            total += collection.bulk_write(ops, ordered=False).modified_count
+            ops = []
+
+    if ops:
+        total += collection.bulk_write(ops, ordered=False).modified_count
+    return total
+
+
+def check(fmt=STORE_FORMAT, collection=products, limit=20000):
+    """accuracy_report() over up to `limit` embeddings still stored as float arrays."""
+    vectors = [
+        doc["embedding"]
+        for doc in collection.find({"embedding": {"$type": "array"}}, {"embedding": True}).limit(limit)
+    ]
+    if not vectors:
+        return None
+    return accuracy_report(np.asarray(vectors, dtype=np.float32), fmt)
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    fmt = sys.argv[2] if len(sys.argv) > 2 else STORE_FORMAT
+
+    if command == "migrate":
+        print(f"{migrate(fmt)} embeddings repacked as {fmt}")
+    elif command == "check":
+        report = check(fmt)
+        print(report if report else "no float-array embeddings left to check against")
+    else:
+        print("usage: python embedding_store.py check|migrate [f16|i8]")
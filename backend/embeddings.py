@@ -0,0 +1,93 @@
+# backend/embeddings.py
+
+import os
+import hashlib
+from dotenv import load_dotenv
+from utils.embedding_cache import EmbeddingCache
+from utils.metrics import span
+from utils import gemini_client
+
+load_dotenv()
+
+EMBED_MODEL = "models/text-embedding-004"
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "100"))  # provider limit per batch call
+
+embedding_cache = EmbeddingCache(
+    max_items=int(os.getenv("EMBED_CACHE_SIZE", "10000")),
+    path=os.getenv("EMBED_CACHE_PATH") or None,
+    disk_max_items=int(os.getenv("EMBED_CACHE_DISK_MAX", "1000000")),
+)
+
+
+def get_embedding(text):
+    emb = embedding_cache.get(EMBED_MODEL, text)
+    if emb is not None:
+        return emb
+
+    with span("embed_api"):
+        res = gemini_client.embed_content(model=EMBED_MODEL, content=text)
+    emb = res["embedding"]
+    embedding_cache.put(EMBED_MODEL, text, emb)
+    return emb
+
+
+def get_embeddings(texts):
+    """
+    Embed a list of texts, in order, using as few model calls as possible:
+    cache hits and duplicates are skipped and the rest go out in batches
+    of EMBED_BATCH_SIZE.
+    """
+    results, batches = _from_cache(texts)
+
+    fetched = {}
+    for chunk in batches:
+        with span("embed_api"):
+            res = gemini_client.embed_content(model=EMBED_MODEL, content=chunk)
+        _keep(chunk, res, fetched)
+
+    return [emb if emb is not None else fetched[t] for t, emb in zip(texts, results)]
+
+
+async def get_embeddings_async(texts):
+    """get_embeddings() for the async app: same cache and batching, awaiting the model."""
+    results, batches = _from_cache(texts)
+
+    fetched = {}
+    for chunk in batches:
+        with span("embed_api"):
+            res = await gemini_client.embed_content_async(model=EMBED_MODEL, content=chunk)
+        _keep(chunk, res, fetched)
+
+    return [emb if emb is not None else fetched[t] for t, emb in zip(texts, results)]
+
+
+def _from_cache(texts):
+    """(cached embedding or None per text, batches of distinct texts to fetch)."""
+    results = [embedding_cache.get(EMBED_MODEL, t) for t in texts]
+    missing = list(dict.fromkeys(t for t, emb in zip(texts, results) if emb is None))
+    return results, [missing[i:i + EMBED_BATCH_SIZE] for i in range(0, len(missing), EMBED_BATCH_SIZE)]
+
+
+def _keep(chunk, res, fetched):
+    for text, emb in zip(chunk, res["embedding"]):
+        embedding_cache.put(EMBED_MODEL, text, emb)
+        fetched[text] = emb
+
+
+def product_text(prod):
+    """Text a product is embedded from."""
+    return " ".join([
+        prod.get("product", ""),
+        prod.get("shortText", ""),
+        prod.get("description", ""),
+        prod.get("productGroup", ""),
+        " ".join(prod.get("tags", []))
+    ])
+
+
+TEXT_FIELDS = ("product", "shortText", "description", "productGroup", "tags")
+
+
+def text_hash(prod):
+    """Changes exactly when the product's embedding would: its text or the model."""
+    return hashlib.sha1(f"{EMBED_MODEL}\n{product_text(prod)}".encode("utf-8")).hexdigest()
@@ -0,0 +1,316 @@
+# backend/indexer.py
+#
+# Background embedding of catalog products. Requests only ever read stored
+# vectors; anything inserted without an `embedding` (admin add-product, seed
+# scripts, imports) is picked up here, embedded in batches and written back
+# with one bulk_write per batch.
+#
+# A batch the model refuses is split in halves until the products it refuses
+# are alone; those are recorded (embeddingError, embeddingAttempts,
+# embeddingRetryAt) and skipped until their retry time, with exponential
+# backoff, so one bad product cannot hold up the rest of the catalog. A
+# transient failure (outage, rate limit) backs off the whole batch.
+#
+# Every web worker starts an indexer, but only the holder of a lease document
+# in Mongo (the `leases` collection) does the work; the others stand by and
+# take over if it stops renewing. Products queued on a standby are found by
+# the leader's next sweep, and without catalog snapshots a standby adds what
+# the leader embedded (embeddedAt) to its own index.
+#
+#   python indexer.py      -> run the worker as its own process
+
+import os
+import queue
+import socket
+import threading
+import time
+import datetime
+from pymongo import UpdateOne, ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from dotenv import load_dotenv
+from db import products, leases
+from embeddings import get_embeddings, product_text, text_hash, EMBED_BATCH_SIZE
+from embedding_store import encode
+from utils.matching import catalog_index, product_key
+from utils.snapshot import catalog_snapshots
+from utils.gemini_client import is_transient
+
+load_dotenv()
+
+MISSING = {"embedding": {"$exists": False}}
+SWEEP = "sweep"
+FAILURE_FIELDS = ("embeddingError", "embeddingAttempts", "embeddingRetryAt")
+
+RETRY_BASE_SECONDS = float(os.getenv("EMBED_RETRY_BASE_SECONDS", "60"))
+RETRY_MAX_SECONDS = float(os.getenv("EMBED_RETRY_MAX_SECONDS", "21600"))
+LEASE_SECONDS = float(os.getenv("EMBED_INDEXER_LEASE_SECONDS", "120"))
+LEASE_ID = "embedding-indexer"
+
+
+def due():
+    """Products to embed now: no embedding, and no failed attempt still backing off."""
+    return dict(MISSING, embeddingRetryAt={"$not": {"$gt": datetime.datetime.utcnow()}})
+
+
+def retry_at(attempts):
+    delay = min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+    return datetime.datetime.utcnow() + datetime.timedelta(seconds=delay)
+
+
+# ---------------- LEASE ---------------- #
+
+class Lease:
+    """One holder at a time across processes and hosts: a document whose expiresAt the holder keeps pushing forward."""
+
+    def __init__(self, collection, name, seconds):
+        self.collection = collection
+        self.name = name
+        self.seconds = seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+
+    def hold(self):
+        """Take or renew the lease. False while another live process holds it."""
+        now = datetime.datetime.utcnow()
+        try:
+            self.collection.find_one_and_update(
+                {"_id": self.name, "$or": [{"owner": self.owner}, {"expiresAt": {"$lt": now}}]},
+                {"$set": {"owner": self.owner, "expiresAt": now + datetime.timedelta(seconds=self.seconds)}},
+                upsert=True,
+                return_document=ReturnDocument.AFTER,
+            )
+            return True
+        except DuplicateKeyError:
+            # the document exists and matched neither condition: someone else holds it
+            return False
+
+    def release(self):
+        self.collection.delete_one({"_id": self.name, "owner": self.owner})
+
+
+# ---------------- INDEXER ---------------- #
+
+
+class EmbeddingIndexer:
+    """
+    Job queue + worker thread. A job is a product _id to embed; when the
+    queue stays empty for `poll_interval` seconds the worker sweeps the
+    collection for any product still missing an embedding. request_sweep()
+    asks for one right away (after a catalog import). Work is only done
+    while `lease` is held.
+    """
+
+    def __init__(self, collection, lease, batch_size=EMBED_BATCH_SIZE, poll_interval=30):
+        self.collection = collection
+        self.lease = lease
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.leader = False
+        self._jobs = queue.Queue()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {"indexed": 0, "failed": 0, "lastRun": None, "lastError": None}
+        self._lease_checked = 0
+        self._followed = datetime.datetime.utcnow()
+
+    def enqueue(self, product_id):
+        self._jobs.put(product_id)
+
+    def request_sweep(self):
+        self._jobs.put(SWEEP)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run_forever, name="embedding-indexer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._jobs.put(None)
+
+    def _hold_lease(self):
+        """Renew the lease at most every poll_interval / 2; False if another process holds it."""
+        if self.leader and time.monotonic() - self._lease_checked < self.poll_interval / 2:
+            return True
+        try:
+            self.leader = self.lease.hold()
+        except Exception as e:
+            print("INDEXER LEASE ERROR:", e)
+            self.leader = False
+        self._lease_checked = time.monotonic()
+        return self.leader
+
+    def _stand_by(self):
+        # the leader's sweeps pick up whatever was queued here
+        while not self._jobs.empty():
+            self._jobs.get_nowait()
+        if not catalog_snapshots:
+            self._run(self.follow)
+        self._stop.wait(self.poll_interval)
+
+    def follow(self):
+        """Add products the leader embedded since the last look to this process's index."""
+        # a little overlap: embeddedAt is set just before the leader's write lands
+        since = self._followed - datetime.timedelta(seconds=5)
+        self._followed = datetime.datetime.utcnow()
+        added = 0
+        for p in self.collection.find({"embeddedAt": {"$gte": since}, "embedding": {"$exists": True}}):
+            current = catalog_index.get(product_key(p))
+            if current is None or current.get("embeddingHash") != p.get("embeddingHash"):
+                catalog_index.add(p, p["embedding"])
+                added += 1
+        return added
+
+    def run_forever(self):
+        needs_sweep = True
+        try:
+            while not self._stop.is_set():
+                if not self._hold_lease():
+                    self._stand_by()
+                    needs_sweep = True
+                    continue
+                if needs_sweep:
+                    self.sweep()
+                    needs_sweep = False
+                self._next_job()
+        finally:
+            if self.leader:
+                self.lease.release()
+
+    def _next_job(self):
+        try:
+            first = self._jobs.get(timeout=self.poll_interval)
+        except queue.Empty:
+            self.sweep()
+            return
+        if first is None:
+            return
+        if first == SWEEP:
+            self.sweep()
+            return
+
+        ids = [first]
+        while len(ids) < self.batch_size:
+            try:
+                job = self._jobs.get_nowait()
+            except queue.Empty:
+                break
+            if job == SWEEP:
+                self._jobs.put(SWEEP)
+                break
+            if job is not None:
+                ids.append(job)
+
+        self._run(lambda: self.index_batch(
+            list(self.collection.find({"_id": {"$in": ids}, **due()}))
+        ))
+
+    def sweep(self):
+        """Embed every product that has no embedding and is not backing off. Returns how many were indexed."""
+        total = 0
+        while not self._stop.is_set() and self._hold_lease():
+            batch = list(self.collection.find(due()).limit(self.batch_size))
+            if not batch:
+                break
+            done = self._run(lambda: self.index_batch(batch))
+            if not done:
+                break
+            total += done
+        return total
+
+    def _run(self, job):
+        try:
+            return job()
+        except Exception as e:
+            with self._lock:
+                self._stats["failed"] += 1
+                self._stats["lastError"] = str(e)
+            print("INDEXER ERROR:", e)
+            time.sleep(1)
+            return 0
+
+    def index_batch(self, batch):
+        if not batch:
+            return 0
+
+        try:
+            embs = get_embeddings([product_text(p) for p in batch])
+        except Exception as e:
+            if len(batch) == 1 or is_transient(e):
+                self.record_failure(batch, e)
+                raise
+            return self._bisect(batch)
+
+        now = datetime.datetime.utcnow()
+        # textHash in the filter: a product whose text was re-imported while
+        # it was being embedded stays missing and is picked up again
+        self.collection.bulk_write([
+            UpdateOne(
+                {"_id": p["_id"], "textHash": p.get("textHash"), **MISSING},
+                {
+                    "$set": {"embedding": encode(emb), "embeddingHash": text_hash(p), "embeddedAt": now},
+                    "$unset": {f: "" for f in FAILURE_FIELDS},
+                }
+            )
+            for p, emb in zip(batch, embs)
+        ], ordered=False)
+
+        for p, emb in zip(batch, embs):
+            catalog_index.add(dict(p, embeddingHash=text_hash(p)), emb)
+
+        with self._lock:
+            self._stats["indexed"] += len(batch)
+            self._stats["lastRun"] = datetime.datetime.utcnow().isoformat()
+        return len(batch)
+
+    def _bisect(self, batch):
+        """Embed each half of a refused batch on its own, so only the refused products are recorded."""
+        mid = len(batch) // 2
+        done, error = 0, None
+        for half in (batch[:mid], batch[mid:]):
+            try:
+                done += self.index_batch(half)
+            except Exception as e:
+                error = e
+        if error is not None and not done:
+            raise error
+        return done
+
+    def record_failure(self, batch, error):
+        """Back each product of a failed batch off: its next attempt waits RETRY_BASE_SECONDS * 2^(attempts-1)."""
+        message = str(error)[:500]
+        self.collection.bulk_write([
+            UpdateOne(
+                {"_id": p["_id"], **MISSING},
+                {"$set": {
+                    "embeddingError": message,
+                    "embeddingAttempts": p.get("embeddingAttempts", 0) + 1,
+                    "embeddingRetryAt": retry_at(p.get("embeddingAttempts", 0) + 1),
+                }}
+            )
+            for p in batch
+        ], ordered=False)
+
+    def status(self):
+        with self._lock:
+            stats = dict(self._stats)
+        stats["pending"] = self.collection.count_documents(MISSING)
+        stats["backingOff"] = self.collection.count_documents(dict(MISSING, embeddingError={"$exists": True}))
+        stats["leader"] = self.leader
+        stats["queued"] = self._jobs.qsize()
+        stats["running"] = bool(self._thread and self._thread.is_alive())
+        return stats
+
+
+indexer = EmbeddingIndexer(
+    products,
+    Lease(leases, LEASE_ID, LEASE_SECONDS),
+    poll_interval=float(os.getenv("EMBED_INDEXER_POLL_SECONDS", "30")),
+)
+
+
+if __name__ == "__main__":
+    print("Embedding indexer running...")
+    indexer.run_forever()
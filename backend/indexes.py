@@ -0,0 +1,119 @@
+# backend/indexes.py
+#
+# Every index the routes rely on, declared in one place.
+#
+#   python indexes.py          -> create any missing index
+#   python indexes.py check    -> explain each route query and list collection scans,
+#                                 plus slow unindexed queries from system.profile
+
+import sys
+from pymongo import ASCENDING, DESCENDING
+from db import db, products, users, sessions, customers, quotations, rollups, deleted_products, jobs
+
+# also created on the scratch collection analytics.rebuild() swaps in
+ROLLUP_INDEXES = [
+    ([("dim", ASCENDING), ("key", ASCENDING), ("day", ASCENDING)], {"unique": True}),  # /analytics/rollups
+]
+
+# collection -> [(keys, options)]
+INDEXES = {
+    users: [
+        ([("email", ASCENDING)], {"unique": True}),                     # login
+    ],
+    sessions: [
+        ([("expiresAt", ASCENDING)], {"expireAfterSeconds": 0}),        # expired sessions removed by Mongo
+    ],
+    customers: [
+        ([("salesExecutiveId", ASCENDING), ("_id", ASCENDING)], {}),    # /customer/sales/<id>
+        ([("email", ASCENDING)], {}),                                   # /customer/by-email/<email>
+    ],
+    quotations: [
+        ([("quotationId", ASCENDING)], {"unique": True}),
+        ([("customerId", ASCENDING), ("_id", ASCENDING)], {}),          # /quotation/customer/<id>
+        ([("salesExecutiveId", ASCENDING), ("_id", ASCENDING)], {}),    # /quotation/sales/<id>
+    ],
+    rollups: ROLLUP_INDEXES,
+    deleted_products: [
+        ([("deletedAt", ASCENDING)], {"expireAfterSeconds": 86400}),   # app.apply_catalog_deletes; a day is plenty
+    ],
+    jobs: [
+        ([("expiresAt", ASCENDING)], {"expireAfterSeconds": 0}),        # finished /analyze-image/jobs removed by Mongo
+    ],
+    products: [
+        ([("productId", ASCENDING)], {
+            "unique": True,
+            "partialFilterExpression": {"productId": {"$type": "string"}},
+        }),
+    ],
+}
+
+# representative filter/sort of each route query, used by check()
+QUERIES = [
+    ("POST /auth/login", users, {"email": "x"}, None),
+    ("validate_session", sessions, {"_id": "x"}, None),
+    ("GET /customer/sales/<id>", customers, {"salesExecutiveId": "x"}, [("_id", ASCENDING)]),
+    ("GET /customer/by-email/<email>", customers, {"email": "x"}, None),
+    ("GET /quotation/customer/<id>", quotations, {"customerId": "x"}, [("_id", ASCENDING)]),
+    ("GET /quotation/sales/<id>", quotations, {"salesExecutiveId": "x"}, [("_id", ASCENDING)]),
+    ("product by productId", products, {"productId": "x"}, None),
+]
+
+
+def ensure_indexes():
+    """Create missing indexes. Failures are reported, not raised, so startup continues."""
+    created, failed = [], []
+    for collection, specs in INDEXES.items():
+        for keys, options in specs:
+            try:
+                created.append(f"{collection.name}.{collection.create_index(keys, **options)}")
+            except Exception as e:
+                failed.append(f"{collection.name} {keys}: {e}")
+                print("INDEX ERROR:", collection.name, keys, e)
+    return created, failed
+
+
+def _stages(plan):
+    stages = [plan.get("stage")]
+    for key in ("inputStage", "queryPlan"):
+        if key in plan:
+            stages += _stages(plan[key])
+    for child in plan.get("inputStages", []):
+        stages += _stages(child)
+    return stages
+
+
+def check(slow_ms=100):
+    """Returns route queries whose winning plan is a collection scan, and slow COLLSCANs from the profiler."""
+    unindexed = []
+    for label, collection, filt, sort in QUERIES:
+        cursor = collection.find(filt)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.explain()["queryPlanner"]["winningPlan"]
+        if "COLLSCAN" in _stages(plan):
+            unindexed.append(label)
+
+    slow = []
+    try:
+        for op in db["system.profile"].find(
+            {"millis": {"$gte": slow_ms}, "planSummary": "COLLSCAN"}
+        ).sort("ts", DESCENDING).limit(50):
+            slow.append({"ns": op.get("ns"), "millis": op.get("millis"), "filter": str(op.get("command", {}).get("filter"))})
+    except Exception:
+        pass  # profiler not enabled or not permitted
+
+    return unindexed, slow
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] == ["check"]:
+        unindexed, slow = check()
+        for label in unindexed:
+            print("COLLSCAN:", label)
+        for op in slow:
+            print(f"SLOW {op['millis']}ms {op['ns']} {op['filter']}")
+        if not unindexed and not slow:
+            print("All route queries use an index.")
+    else:
+        created, failed = ensure_indexes()
+        print(f"{len(created)} indexes ensured, {len(failed)} failed")
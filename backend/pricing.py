@@ -0,0 +1,220 @@
+# backend/pricing.py
+#
+# Quotation pricing for anything from a 3-line photo quote to a 10k-line
+# bill of materials. All catalog prices are resolved with one $in query
+# (behind a short-lived cache) and line maths runs column-wise on int64
+# cents, so totals are exact; tax and discount are rounded half-up to the
+# cent with Decimal.
+
+import os
+import math
+import uuid
+import datetime
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+from db import products
+from utils.ttl_cache import TTLCache
+from utils.metrics import span
+
+CENT = Decimal("0.01")
+# keeps every line total, and the sum of 10k of them, well inside int64 cents
+MAX_QUANTITY = int(os.getenv("PRICING_MAX_QUANTITY", "100000"))
+
+PRICE_FIELDS = {
+    "_id": False, "productId": True, "itemNo": True, "product": True,
+    "productGroup": True, "price": True, "supplier": True, "store": True,
+}
+
+price_cache = TTLCache(
+    max_items=int(os.getenv("PRICE_CACHE_SIZE", "100000")),
+    ttl=float(os.getenv("PRICE_CACHE_TTL", "60")),
+)
+
+
+def parse_tiers(spec):
+    """'10:2,50:5' -> [(10, 200), (50, 500)]: from quantity 10 a line gets 2% off (in basis points)."""
+    tiers = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        min_qty, pct = part.split(":")
+        tiers.append((int(min_qty), int(Decimal(pct) * 100)))
+    return sorted(tiers)
+
+
+VOLUME_TIERS = parse_tiers(os.getenv("PRICING_VOLUME_TIERS", ""))
+
+
+def lookup_prices(product_ids):
+    """productId -> catalog fields, with a single $in query for everything not cached."""
+    wanted = set(product_ids)
+    found = price_cache.get_many(wanted)
+    missing = list(wanted - found.keys())
+
+    if missing:
+        with span("price_lookup"):
+            fetched = {
+                doc["productId"]: doc
+                for doc in products.find({"productId": {"$in": missing}}, PRICE_FIELDS)
+            }
+        price_cache.set_many(fetched)
+        found.update(fetched)
+
+    return found
+
+
+def to_cents(values):
+    return np.rint(np.asarray(values, dtype=np.float64) * 100).astype(np.int64)
+
+
+def _round_div(numer, denom):
+    """Integer division of an int64 array by a positive int, halves rounded away from zero like ROUND_HALF_UP."""
+    return np.sign(numer) * ((2 * np.abs(numer) + denom) // (2 * denom))
+
+
+def _money(cents):
+    """int64 cents -> list of amounts: whole amounts as int, the rest as float."""
+    amounts = (cents / 100).astype(object)
+    whole = cents % 100 == 0
+    amounts[whole] = (cents[whole] // 100).astype(object)
+    return amounts.tolist()
+
+
+def line_product_ids(items):
+    return [i.get("productId") for i in items if i.get("productId")]
+
+
+def price_lines(items, tiers=None, use_catalog=True, catalog=None):
+    """
+    items: dicts with productId and quantity (unit_price and product details
+    are taken from the item when the catalog does not know the product).
+    `catalog` is lookup_prices() output fetched by the caller (the async app).
+    Returns (formatted_items, net_cents, volume_discount_cents, errors).
+    """
+    tiers = VOLUME_TIERS if tiers is None else tiers
+    if catalog is None:
+        catalog = lookup_prices(line_product_ids(items)) if use_catalog else {}
+
+    # catalog fields win over whatever the caller sent
+    infos, quantities, prices, errors = [], [], [], []
+    for n, item in enumerate(items):
+        info = catalog.get(item.get("productId")) or item
+        price = info.get("price", item.get("unit_price"))
+        if price is None or "product" not in info:
+            errors.append({"line": n + 1, "productId": item.get("productId"), "error": "unknown product"})
+            continue
+        infos.append((info, item))
+        quantities.append(item["quantity"])
+        prices.append(price)
+
+    qty = np.array(quantities, dtype=np.int64)
+    unit = to_cents(prices)
+    gross = qty * unit
+
+    if tiers:
+        bps = np.zeros(len(infos), dtype=np.int64)
+        for min_qty, tier_bps in tiers:
+            bps[qty >= min_qty] = tier_bps
+        discount = _round_div(gross * bps, 10000)
+    else:
+        discount = np.zeros(len(infos), dtype=np.int64)
+    net = gross - discount
+
+    formatted = [{
+        "itemNo": info.get("itemNo", "N/A"),
+        "product": info["product"],
+        "productId": info.get("productId", "N/A"),
+        "productGroup": info.get("productGroup", "N/A"),
+        "quantity": q,
+        "unit_price": u,
+        "supplier": info.get("supplier", "N/A"),
+        "store": info.get("store", "N/A"),
+        "volume_discount": d,
+        "line_total": t,
+        "match_confidence": item.get("match_confidence", 0)
+    } for (info, item), q, u, d, t in zip(infos, qty.tolist(), _money(unit), _money(discount), _money(net))]
+
+    return formatted, net, discount, errors
+
+
+def compute_totals(net_cents, discount_cents, tax_rate, discount_rate):
+    subtotal = Decimal(int(net_cents.sum())) / 100
+    tax_amount = (subtotal * Decimal(str(tax_rate))).quantize(CENT, ROUND_HALF_UP)
+    discount_amount = (subtotal * Decimal(str(discount_rate))).quantize(CENT, ROUND_HALF_UP)
+    grand_total = subtotal + tax_amount - discount_amount
+
+    return {
+        "subtotal": float(subtotal),
+        "volumeDiscount": float(Decimal(int(discount_cents.sum())) / 100),
+        "taxRate": tax_rate,
+        "taxAmount": float(tax_amount),
+        "discountRate": discount_rate,
+        "discountAmount": float(discount_amount),
+        "grandTotal": float(grand_total)
+    }
+
+
+def generate_quotation(detected_items, customer_name="Walk-in Client", tax_rate=0.18, discount_rate=0.0, catalog=None):
+    """price_quotation for matched photo items; lines it could not price are listed under unpricedLines."""
+    quotation, errors = price_quotation(detected_items, customer_name, tax_rate, discount_rate, catalog=catalog)
+    quotation["unpricedLines"] = errors
+    return quotation
+
+
+def price_quotation(items, customer_name="Walk-in Client", tax_rate=0.18, discount_rate=0.0, tiers=None, catalog=None):
+    """Returns (quotation, line_errors)."""
+    quotation_id = f"QT-{uuid.uuid4().hex[:8].upper()}"
+    date_str = datetime.datetime.now().strftime("%Y-%m-%d")
+
+    formatted_items, net, discount, errors = price_lines(items, tiers, catalog=catalog)
+
+    return {
+        "quotationId": quotation_id,
+        "date": date_str,
+        "customerName": customer_name,
+        "validity": "7 days",
+        "items": formatted_items,
+        "pricing": compute_totals(net, discount, tax_rate, discount_rate),
+        "terms": [
+            "Quotation valid for 7 days.",
+            "Delivery charges may apply.",
+            "All items include standard manufacturer warranty."
+        ]
+    }, errors
+
+
+# ---------------- REQUEST CHECKS ---------------- #
+
+def _rate(data, field, default):
+    value = data.get(field, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or not 0 <= value <= 1:
+        raise ValueError(f"{field} must be a number between 0 and 1")
+    return value
+
+
+def parse_price_request(data):
+    """
+    A /quotation/price body -> ((items, customer_name, tax_rate, discount_rate), None),
+    or (None, error message) for a 400.
+    """
+    if not isinstance(data, dict):
+        return None, "items required"
+    items = data.get("items")
+    if not isinstance(items, list) or not items:
+        return None, "items required"
+    for item in items:
+        if not isinstance(item, dict):
+            return None, "every item must be an object"
+        # productIds go into a $in filter and a dict lookup: plain non-empty strings only
+        product_id = item.get("productId")
+        if not isinstance(product_id, str) or not product_id:
+            return None, "every item needs a productId string"
+        quantity = item.get("quantity")
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or not 0 < quantity <= MAX_QUANTITY:
+            return None, f"every item needs an integer quantity between 1 and {MAX_QUANTITY}"
+
+    try:
+        tax_rate = _rate(data, "taxRate", 0.18)
+        discount_rate = _rate(data, "discountRate", 0.0)
+    except ValueError as e:
+        return None, str(e)
+
+    return (items, data.get("customerName", "Walk-in Client"), tax_rate, discount_rate), None
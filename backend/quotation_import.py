@@ -0,0 +1,195 @@
+# backend/quotation_import.py
+#
+# Bulk creation of quotations from a JSONL stream (one quotation per line),
+# written in chunks: one bulk_write for the quotations and one grouped
+# bulk_write for the customer back-references per chunk. Idempotent on
+# quotationId, so a migration can be re-run safely.
+#
+#   python quotation_import.py quotations.jsonl [--sales-id <userId>] [--chunk 500]
+
+import os
+import sys
+import json
+import argparse
+import datetime
+from collections import defaultdict
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from db import quotations, customers
+from analytics import record_quotations
+
+CHUNK_SIZE = int(os.getenv("QUOTATION_IMPORT_CHUNK", "500"))
+
+REQUIRED = ("quotationId", "customerId", "items", "pricing")
+
+
+def build_quotation(data, sales_exec_id):
+    """Quotation document as stored by /quotation/save."""
+    return {
+        "quotationId": data["quotationId"],
+        "customerId": data["customerId"],
+        "salesExecutiveId": sales_exec_id,
+        "date": data["date"],
+        "items": data["items"],
+        "pricing": data["pricing"],
+        "terms": data["terms"],
+        "status": "pending",
+        "createdAt": datetime.datetime.utcnow()
+    }
+
+
+def validate_row(row, sales_exec_id=None):
+    """Returns (quotation_doc, None) or (None, error message)."""
+    if not isinstance(row, dict):
+        return None, "not a JSON object"
+
+    missing = [f for f in REQUIRED if f not in row]
+    if missing:
+        return None, f"missing {', '.join(missing)}"
+
+    # ids end up in query filters: anything but a plain string (e.g. {"$ne": null}) is refused
+    for field in ("quotationId", "customerId"):
+        if not isinstance(row[field], str) or not row[field]:
+            return None, f"{field} must be a non-empty string"
+
+    sales_id = sales_exec_id or row.get("salesExecutiveId")
+    if not sales_id:
+        return None, "missing salesExecutiveId"
+    if not isinstance(sales_id, str):
+        return None, "salesExecutiveId must be a string"
+
+    try:
+        ObjectId(row["customerId"])
+    except InvalidId:
+        return None, "invalid customerId"
+
+    if not isinstance(row["items"], list) or not isinstance(row["pricing"], dict):
+        return None, "items must be a list and pricing an object"
+
+    doc = build_quotation(dict(
+        row,
+        date=row.get("date") or datetime.datetime.utcnow().strftime("%Y-%m-%d"),
+        terms=row.get("terms", [])
+    ), sales_id)
+
+    if row.get("status"):
+        doc["status"] = row["status"]
+    if row.get("createdAt"):
+        try:
+            doc["createdAt"] = datetime.datetime.fromisoformat(row["createdAt"])
+        except (TypeError, ValueError):
+            return None, "invalid createdAt"
+
+    return doc, None
+
+
+def parse_jsonl(lines):
+    """Yields (line_no, row, error) for each non-blank line."""
+    for line_no, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        try:
+            yield line_no, json.loads(line), None
+        except ValueError as e:
+            yield line_no, None, f"invalid JSON: {e}"
+
+
+def _write_chunk(chunk, report):
+    """chunk: [(line_no, doc)]"""
+    # customers referenced by this chunk must exist
+    customer_ids = {ObjectId(doc["customerId"]) for _, doc in chunk}
+    known = {str(c["_id"]) for c in customers.find({"_id": {"$in": list(customer_ids)}}, {"_id": 1})}
+
+    rows = []
+    for line_no, doc in chunk:
+        if doc["customerId"] not in known:
+            report["errors"].append({"line": line_no, "quotationId": doc["quotationId"], "error": "customer not found"})
+        else:
+            rows.append((line_no, doc))
+    if not rows:
+        return
+
+    try:
+        result = quotations.bulk_write([
+            UpdateOne({"quotationId": doc["quotationId"]}, {"$setOnInsert": doc}, upsert=True)
+            for _, doc in rows
+        ], ordered=False)
+        upserted, failed = result.upserted_ids, {}
+    except BulkWriteError as e:
+        # unordered: the other rows were written; report the failed ones by line
+        upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+        failed = {err["index"]: err.get("errmsg", "write failed") for err in e.details.get("writeErrors", [])}
+
+    by_customer = defaultdict(list)
+    inserted = []
+    for i, (line_no, doc) in enumerate(rows):
+        if i in failed:
+            report["errors"].append({"line": line_no, "quotationId": doc["quotationId"], "error": failed[i]})
+            continue
+        qid = upserted.get(i)
+        if qid is None:
+            report["skipped"].append({"line": line_no, "quotationId": doc["quotationId"]})
+            continue
+        report["inserted"] += 1
+        inserted.append(doc)
+        by_customer[doc["customerId"]].append(str(qid))
+
+    record_quotations(inserted)
+
+    if by_customer:
+        customers.bulk_write([
+            UpdateOne({"_id": ObjectId(cid)}, {"$addToSet": {"quotations": {"$each": qids}}})
+            for cid, qids in by_customer.items()
+        ], ordered=False)
+
+
+def import_quotations(rows, sales_exec_id=None, chunk_size=CHUNK_SIZE):
+    """
+    rows: iterable of (line_no, row, parse_error) as produced by parse_jsonl.
+    Returns {"inserted", "skipped" (quotationId already present), "errors"}.
+    """
+    report = {"inserted": 0, "skipped": [], "errors": []}
+    seen = set()
+    chunk = []
+
+    for line_no, row, error in rows:
+        doc = None
+        if not error:
+            doc, error = validate_row(row, sales_exec_id)
+        if not error and doc["quotationId"] in seen:
+            error = "duplicate quotationId in input"
+        if error:
+            qid = row.get("quotationId") if isinstance(row, dict) else None
+            report["errors"].append({"line": line_no, "quotationId": qid, "error": error})
+            continue
+
+        seen.add(doc["quotationId"])
+        chunk.append((line_no, doc))
+        if len(chunk) >= chunk_size:
+            _write_chunk(chunk, report)
+            chunk = []
+
+    if chunk:
+        _write_chunk(chunk, report)
+
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import quotations from JSONL")
+    parser.add_argument("path", help="JSONL file, or - for stdin")
+    parser.add_argument("--sales-id", help="salesExecutiveId for rows that do not carry one")
+    parser.add_argument("--chunk", type=int, default=CHUNK_SIZE)
+    args = parser.parse_args()
+
+    source = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    with source:
+        report = import_quotations(parse_jsonl(source), args.sales_id, args.chunk)
+
+    for err in report["errors"]:
+        print(f"line {err['line']}: {err['error']} ({err['quotationId']})")
+    print(f"{report['inserted']} inserted, {len(report['skipped'])} already present, {len(report['errors'])} errors")
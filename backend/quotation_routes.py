@@ -1,19 +1,19 @@
 # backend/quotation_routes.py
 
 from flask import Blueprint, request, jsonify
-from pymongo import MongoClient
 from bson import ObjectId
-import datetime, os
+from pymongo.errors import DuplicateKeyError
 from dotenv import load_dotenv
 from auth import validate_session
+from db import quotations, customers
+from utils.pagination import list_response
+from quotation_import import build_quotation, import_quotations, parse_jsonl
+from analytics import record_quotation
+from pricing import price_quotation, parse_price_request
+from utils.metrics import span
 
 load_dotenv()
 
-mongo = MongoClient(os.getenv("MONGODB_URI"))
-db = mongo[os.getenv("MONGODB_DB")]
-quotations = db["quotations"]
-customers = db["customers"]
-
 quotation_routes = Blueprint("quotations", __name__)
 
 
@@ -32,29 +32,78 @@ def save_quotation():
         return jsonify({"error": "customerId required"}), 400
 
     # Build quotation payload
-    quotation = {
-        "quotationId": data["quotationId"],
-        "customerId": data["customerId"],
-        "salesExecutiveId": session["userId"],  # This now stores actual user ID
-        "date": data["date"],
-        "items": data["items"],
-        "pricing": data["pricing"],
-        "terms": data["terms"],
-        "status": "pending",
-        "createdAt": datetime.datetime.utcnow()
-    }
-
-    inserted = quotations.insert_one(quotation)
-    qid = inserted.inserted_id
-
-    customers.update_one(
-        {"_id": ObjectId(data["customerId"])},
-        {"$push": {"quotations": str(qid)}}
-    )
+    quotation = build_quotation(data, session["userId"])  # actual user ID
+
+    with span("quotation_write"):
+        try:
+            inserted = quotations.insert_one(quotation)
+        except DuplicateKeyError:
+            # quotationId is unique (indexes.py): a repeated save is a conflict, not a 500
+            return jsonify({"error": f"Quotation {quotation['quotationId']} already saved"}), 409
+        qid = inserted.inserted_id
+
+        customers.update_one(
+            {"_id": ObjectId(data["customerId"])},
+            {"$push": {"quotations": str(qid)}}
+        )
+
+    with span("rollup_update"):
+        record_quotation(quotation)
 
     return jsonify({"msg": "Quotation saved", "id": str(qid)})
 
 
+# ---------------------------------------------------
+# PRICE A BILL OF MATERIALS  (Sales / Admin)
+# ---------------------------------------------------
+@quotation_routes.route("/price", methods=["POST"])
+def price_bill_of_materials():
+    """
+    Body: {"items": [{"productId", "quantity"}, ...], "customerName", "taxRate", "discountRate"}
+    Prices every line from the catalog and returns a quotation ready for /save.
+    """
+    session = validate_session(request)
+    if not session or session["role"] not in ["sales", "admin"]:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    args, error = parse_price_request(request.json or {})
+    if error:
+        return jsonify({"error": error}), 400
+
+    quotation, errors = price_quotation(*args)
+    if errors:
+        return jsonify({"error": "Some lines could not be priced", "lines": errors}), 400
+
+    return jsonify(quotation)
+
+
+# ---------------------------------------------------
+# BULK IMPORT  (Sales: own quotations, Admin: migration)
+# ---------------------------------------------------
+@quotation_routes.route("/import", methods=["POST"])
+def import_quotations_route():
+    """
+    Body is JSONL (one quotation per line) or a JSON array. Sales executives
+    import as themselves; admins must give salesExecutiveId on every row.
+    """
+    session = validate_session(request)
+    if not session or session["role"] not in ["sales", "admin"]:
+        return jsonify({"error": "Unauthorized"}), 403
+
+    sales_exec_id = session["userId"] if session["role"] == "sales" else None
+
+    if request.is_json:
+        data = request.json
+        if not isinstance(data, list):
+            return jsonify({"error": "Expected a JSON array or JSONL"}), 400
+        rows = ((i, row, None) for i, row in enumerate(data, 1))
+    else:
+        rows = parse_jsonl(request.stream)
+
+    report = import_quotations(rows, sales_exec_id)
+    return jsonify(report), 200 if not report["errors"] else 207
+
+
 # ---------------------------------------------------
 # VIEW QUOTATION BY ID
 # ---------------------------------------------------
@@ -64,7 +113,6 @@ def view_quotation(qid):
     if not q:
         return jsonify({"error": "not found"}), 404
 
-    q["_id"] = str(q["_id"])
     return jsonify(q)
 
 # ---------------------------------------------------
@@ -76,13 +124,8 @@ def get_customer_quotations(customer_id):
     if not session:
         return jsonify({"error": "Unauthorized"}), 403
     
-    # Find all quotations for this customer
-    customer_quotations = list(quotations.find({"customerId": customer_id}))
-    
-    for q in customer_quotations:
-        q["_id"] = str(q["_id"])
-    
-    return jsonify(customer_quotations)
+    # Quotations for this customer, one page at a time
+    return list_response(quotations, {"customerId": customer_id}, request)
 
 @quotation_routes.route("/sales/<sales_id>", methods=["GET"])
 def get_sales_quotations(sales_id):
@@ -90,9 +133,4 @@ def get_sales_quotations(sales_id):
     if not session or session["role"] != "sales":
         return jsonify({"error": "Unauthorized"}), 403
 
-    results = list(quotations.find({"salesExecutiveId": sales_id}))
-
-    for q in results:
-        q["_id"] = str(q["_id"])
-
-    return jsonify(results)
\ No newline at end of file
+    return list_response(quotations, {"salesExecutiveId": sales_id}, request)
\ No newline at end of file
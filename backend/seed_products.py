@@ -1,12 +1,4 @@
-import os
-from dotenv import load_dotenv
-from pymongo import MongoClient
-
-load_dotenv()
-
-client = MongoClient(os.getenv("MONGODB_URI"))
-db = client[os.getenv("MONGODB_DB")]
-col = db[os.getenv("MONGODB_PRODUCTS_COLLECTION")]
+from catalog_import import import_products
 
 products = [
     # --- EXECUTIVE CHAIR ---
@@ -100,10 +92,7 @@ products = [
     }
 ]
 
-# Clear old data
-col.delete_many({})
-
-# Insert new data
-col.insert_many(products)
+# Upsert by productId: stored embeddings are kept unless a product's text changed
+report = import_products((i, p, None) for i, p in enumerate(products, 1))
 
-print("Office inventory seeded successfully!")
\ No newline at end of file
+print("Office inventory seeded successfully!", {k: v for k, v in report.items() if k != "errors"})
\ No newline at end of file
@@ -1,13 +1,5 @@
-from pymongo import MongoClient
 from werkzeug.security import generate_password_hash
-import os
-from dotenv import load_dotenv
-
-load_dotenv()
-
-mongo = MongoClient(os.getenv("MONGODB_URI"))
-db = mongo[os.getenv("MONGODB_DB")]
-users = db["users"]
+from db import users
 
 users.delete_many({})
 
@@ -0,0 +1,11 @@
+# backend/tests/conftest.py
+#
+# The backend is a flat set of modules run from backend/; put it on the path
+# so tests import them the same way the app does.
+#
+#   cd backend && python -m pytest -q
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,108 @@
+# backend/tests/test_analytics.py
+
+import datetime
+import pytest
+from bson import ObjectId
+import analytics
+
+mongomock = pytest.importorskip("mongomock")
+
+UTC = datetime.timezone.utc
+
+
+@pytest.fixture
+def db(monkeypatch):
+    database = mongomock.MongoClient().db
+    monkeypatch.setattr(analytics, "db", database)
+    monkeypatch.setattr(analytics, "quotations", database.quotations)
+    monkeypatch.setattr(analytics, "rollups", database.analytics_rollups)
+    monkeypatch.setattr(analytics.time, "sleep", lambda seconds: None)  # rebuild's wait for a new second
+    return database
+
+
+def quotation(created, total, group="Chair", status="pending", sales="s1"):
+    return {
+        "_id": ObjectId.from_datetime(created),
+        "salesExecutiveId": sales,
+        "customerId": "c1",
+        "status": status,
+        "createdAt": created.astimezone(UTC).replace(tzinfo=None),
+        "pricing": {"grandTotal": total},
+        "items": [{"productGroup": group, "quantity": 2, "line_total": total}],
+    }
+
+
+def rollups(db):
+    return sorted(
+        (d["_id"], d.get("count", d.get("lines")), d.get("grandTotal", d.get("value")))
+        for d in db.analytics_rollups.find()
+    )
+
+
+def test_day_is_the_utc_day():
+    local = datetime.datetime(2024, 1, 2, 1, 0, tzinfo=datetime.timezone(datetime.timedelta(hours=5, minutes=30)))
+    assert analytics._day({"createdAt": local}) == "2024-01-01"
+    assert analytics._day({"createdAt": datetime.datetime(2024, 1, 2, 1, 0)}) == "2024-01-02"
+
+
+def test_rebuild_matches_the_incremental_rollups(db):
+    days_ago = lambda n: datetime.datetime.now(UTC) - datetime.timedelta(days=n)
+    docs = [
+        quotation(days_ago(3), 100),
+        quotation(days_ago(2), 50, group="Desk", status="accepted"),
+        quotation(days_ago(2) + datetime.timedelta(seconds=1), 25, sales="s2"),
+    ]
+    db.quotations.insert_many(docs)
+    analytics.record_quotations(docs)
+    incremental = rollups(db)
+
+    assert analytics.rebuild() == len(incremental)
+    assert rollups(db) == incremental
+
+
+def test_rebuild_keeps_the_rollup_indexes(db):
+    db.quotations.insert_one(quotation(datetime.datetime.now(UTC) - datetime.timedelta(days=1), 10))
+    analytics.rebuild()
+
+    indexes = db.analytics_rollups.index_information()
+    keys = [[k for k, _ in index["key"]] for index in indexes.values() if index.get("unique")]
+    assert ["dim", "key", "day"] in keys
+    assert "analytics_rollups_rebuild" not in db.list_collection_names()
+
+
+def test_rebuild_replays_recent_saves(db):
+    old = quotation(datetime.datetime.now(UTC) - datetime.timedelta(days=1), 100)
+    db.quotations.insert_one(old)
+    analytics.record_quotations([old])
+
+    # saved while the rebuild runs: its increments land in the collection being replaced
+    recent = quotation(datetime.datetime.now(UTC) - datetime.timedelta(seconds=2), 7)
+    db.quotations.insert_one(recent)
+    analytics.record_quotations([recent])
+
+    analytics.rebuild()
+    totals = {d["_id"]: d for d in db.analytics_rollups.find()}
+    assert totals["salesExecutive:s1"]["count"] == 2
+    assert totals["salesExecutive:s1"]["grandTotal"] == 107
+    assert totals["productGroup:Chair"]["lines"] == 2
+
+
+def test_rebuild_does_not_replay_saves_after_the_swap(db, monkeypatch):
+    old = quotation(datetime.datetime.now(UTC) - datetime.timedelta(days=1), 100)
+    db.quotations.insert_one(old)
+    analytics.record_quotations([old])
+
+    replay = analytics._replay
+
+    def save_then_replay(since, until):
+        # saved right after the rename: its increments already reach the new collection
+        late = quotation(datetime.datetime.now(UTC) + datetime.timedelta(seconds=1), 7)
+        db.quotations.insert_one(late)
+        analytics.record_quotations([late])
+        replay(since, until)
+
+    monkeypatch.setattr(analytics, "_replay", save_then_replay)
+    analytics.rebuild()
+    totals = {d["_id"]: d for d in db.analytics_rollups.find()}
+    assert totals["salesExecutive:s1"]["count"] == 2
+    assert totals["salesExecutive:s1"]["grandTotal"] == 107
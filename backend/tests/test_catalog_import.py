@@ -0,0 +1,73 @@
+# backend/tests/test_catalog_import.py
+
+import pytest
+import admin_routes
+import catalog_import
+from catalog_import import import_products, validate_row
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def products(monkeypatch):
+    collection = mongomock.MongoClient().db.products
+    monkeypatch.setattr(catalog_import, "products", collection)
+    return collection
+
+
+def rows(*docs):
+    return [(n, doc, None) for n, doc in enumerate(docs, start=1)]
+
+
+@pytest.mark.parametrize("field", ["$where", "$set", "dimensions.width", "a.$"])
+def test_operator_and_dotted_fields_are_refused(field):
+    doc, error = validate_row({"productId": "P3", field: "x"})
+    assert doc is None
+    assert error == f"invalid field name {field!r}"
+
+
+def test_reimporting_the_same_feed_changes_nothing(products):
+    feed = rows({"productId": "P1", "product": "Chair", "price": "10"},
+                {"productId": "P2", "product": "Desk", "price": "20"})
+    assert import_products(feed)["inserted"] == 2
+    stamped = products.find_one({"productId": "P1"})["updatedAt"]
+
+    report = import_products(feed)
+    assert (report["inserted"], report["updated"], report["unchanged"]) == (0, 0, 2)
+    assert products.find_one({"productId": "P1"})["updatedAt"] == stamped
+
+    report = import_products(rows({"productId": "P1", "price": "12"}, {"productId": "P2", "price": "20"}))
+    assert (report["updated"], report["unchanged"], report["kept"]) == (1, 1, 1)
+
+
+def test_write_errors_are_reported_by_line(products):
+    products.create_index("itemNo", unique=True)
+    report = import_products(rows(
+        {"productId": "P1", "product": "Chair", "price": 10, "itemNo": "1"},
+        {"productId": "P2", "product": "Desk", "price": 20, "itemNo": "1"},
+        {"productId": "P3", "product": "Lamp", "price": 5, "itemNo": "3"},
+    ))
+
+    assert [(e["line"], e["productId"]) for e in report["errors"]] == [(2, "P2")]
+    assert report["inserted"] + report["updated"] == 2
+    assert report["reembed"] == 2
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+
+
+def test_import_feed_invalidates_only_on_change(products, monkeypatch):
+    invalidate, sweep = Recorder(), Recorder()
+    monkeypatch.setattr(admin_routes.catalog_index, "invalidate", invalidate)
+    monkeypatch.setattr(admin_routes.indexer, "request_sweep", sweep)
+    feed = "productId,product,price\nP1,Chair,10\n"
+
+    admin_routes.import_feed(feed.splitlines(keepends=True), "csv")
+    admin_routes.import_feed(feed.splitlines(keepends=True), "csv")
+
+    assert invalidate.calls == sweep.calls == 1
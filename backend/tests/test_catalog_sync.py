@@ -0,0 +1,63 @@
+# backend/tests/test_catalog_sync.py
+
+import datetime
+import pytest
+from bson import ObjectId
+import app
+import admin_routes
+from utils.matching import CatalogIndex
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def worker(monkeypatch):
+    """app's catalog sync on a fresh index and a mongomock tombstone collection, no snapshots."""
+    database = mongomock.MongoClient().db
+    index = CatalogIndex()
+    monkeypatch.setattr(app, "catalog_index", index)
+    monkeypatch.setattr(app, "catalog_snapshots", None)
+    monkeypatch.setattr(app, "deleted_products", database.deleted_products)
+    monkeypatch.setattr(app, "_deletes", dict(app._deletes, checked=0.0, since=datetime.datetime.utcnow()))
+    return index, database.deleted_products
+
+
+def product(pid):
+    return {"_id": ObjectId(), "productId": pid, "product": pid}
+
+
+def test_delete_on_another_worker_reaches_this_index(worker):
+    index, tombstones = worker
+    chair, desk = product("CH-1"), product("DK-1")
+    index.build([(chair, [1.0, 0.0]), (desk, [0.0, 1.0])])
+
+    tombstones.insert_one(admin_routes.tombstone(chair))
+    app.apply_catalog_deletes()
+
+    assert index.get("CH-1") is None
+    assert index.get("DK-1") is not None
+
+
+def test_sync_is_throttled(worker, monkeypatch):
+    index, tombstones = worker
+    chair = product("CH-1")
+    index.build([(chair, [1.0, 0.0])])
+    app.apply_catalog_deletes()
+
+    tombstones.insert_one(admin_routes.tombstone(chair))
+    app.apply_catalog_deletes()
+    assert index.get("CH-1") is not None
+
+    app._deletes["checked"] = 0.0
+    app.apply_catalog_deletes()
+    assert index.get("CH-1") is None
+
+
+def test_reimported_product_is_kept(worker):
+    index, tombstones = worker
+    old, new = product("CH-1"), product("CH-1")
+    index.build([(new, [1.0, 0.0])])
+
+    tombstones.insert_one(admin_routes.tombstone(old))
+    app.apply_catalog_deletes()
+    assert index.get("CH-1")["_id"] == new["_id"]
@@ -0,0 +1,191 @@
+# backend/tests/test_gemini_client.py
+
+import asyncio
+import pytest
+from utils import gemini_client
+from utils.gemini_client import CircuitBreaker, TokenBucket, ModelUnavailable
+
+
+class Unavailable(Exception):
+    code = 503
+
+
+class BadRequest(Exception):
+    code = 400
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """gemini_client with a fresh breaker and bucket, no backoff and no coalescing."""
+    monkeypatch.setattr(gemini_client, "breaker", CircuitBreaker(failures=2, reset_seconds=60))
+    monkeypatch.setattr(gemini_client, "bucket", TokenBucket(0, 1))
+    monkeypatch.setattr(gemini_client, "RETRIES", 0)
+    monkeypatch.setattr(gemini_client, "HEDGE_AFTER_MS", 0)
+    monkeypatch.setattr(gemini_client, "COALESCE", False)
+    return gemini_client
+
+
+def fail(error):
+    def fn(options):
+        raise error
+    return fn
+
+
+def half_open(breaker):
+    """Open the circuit and let its reset time pass."""
+    breaker.failure()
+    breaker.failure()
+    breaker._opened_at -= breaker.reset_seconds
+
+
+# ---------------- STATE MACHINE ---------------- #
+
+def test_opens_after_consecutive_failures(client):
+    for _ in range(2):
+        with pytest.raises(Unavailable):
+            client.call("k", fail(Unavailable()))
+    assert client.breaker.state == "open"
+
+    sent = []
+    with pytest.raises(ModelUnavailable) as e:
+        client.call("k", lambda options: sent.append(options))
+    assert not sent
+    assert e.value.retry_after >= 1
+
+
+def test_success_resets_the_failure_count(client):
+    with pytest.raises(Unavailable):
+        client.call("k", fail(Unavailable()))
+    assert client.call("k", lambda options: "ok") == "ok"
+    with pytest.raises(Unavailable):
+        client.call("k", fail(Unavailable()))
+    assert client.breaker.state == "closed"
+
+
+def test_bad_request_is_not_a_failure(client):
+    for _ in range(3):
+        with pytest.raises(BadRequest):
+            client.call("k", fail(BadRequest()))
+    assert client.breaker.state == "closed"
+
+
+def test_half_open_lets_one_probe_through(client):
+    breaker = client.breaker
+    half_open(breaker)
+
+    assert breaker.before() is True
+    assert breaker.state == "half-open"
+    with pytest.raises(ModelUnavailable):
+        breaker.before()
+
+    breaker.success()
+    assert breaker.state == "closed"
+    assert breaker.before() is False
+
+
+def test_failed_probe_reopens(client):
+    half_open(client.breaker)
+    with pytest.raises(Unavailable):
+        client.call("k", fail(Unavailable()))
+    assert client.breaker.state == "open"
+    with pytest.raises(ModelUnavailable):
+        client.call("k", lambda options: "ok")
+
+
+def test_non_retryable_probe_closes(client):
+    half_open(client.breaker)
+    with pytest.raises(BadRequest):
+        client.call("k", fail(BadRequest()))
+    assert client.breaker.state == "closed"
+
+
+def test_interrupted_probe_is_released(client):
+    half_open(client.breaker)
+    with pytest.raises(KeyboardInterrupt):
+        client.call("k", fail(KeyboardInterrupt()))
+    assert client.breaker.state == "half-open"
+    assert client.call("k", lambda options: "ok") == "ok"
+    assert client.breaker.state == "closed"
+
+
+# ---------------- RATE LIMIT ---------------- #
+
+def test_rate_limited_call_does_not_take_the_probe(client, monkeypatch):
+    monkeypatch.setattr(client, "RATE_WAIT_SECONDS", 0)
+    monkeypatch.setattr(client, "bucket", TokenBucket(rate=0.01, burst=1))
+    half_open(client.breaker)
+
+    assert client.bucket.try_acquire()
+    with pytest.raises(ModelUnavailable, match="rate limit"):
+        client.call("k", lambda options: "ok")
+    assert not client.breaker._probing
+
+    client.bucket._tokens = 1
+    assert client.call("k", lambda options: "ok") == "ok"
+    assert client.breaker.state == "closed"
+
+
+# ---------------- ASYNC ---------------- #
+
+def test_cancelled_async_probe_is_released(client):
+    half_open(client.breaker)
+
+    async def run():
+        client.start_async()
+        started = asyncio.Event()
+
+        async def slow(options):
+            started.set()
+            await asyncio.sleep(10)
+
+        task = asyncio.create_task(client.call_async("k", slow))
+        await started.wait()
+        assert client.breaker._probing
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        assert not client.breaker._probing
+
+        async def ok(options):
+            return "ok"
+
+        return await client.call_async("k", ok)
+
+    assert asyncio.run(run()) == "ok"
+    assert client.breaker.state == "closed"
+
+
+def test_async_failures_share_the_breaker(client):
+    async def unavailable(options):
+        raise Unavailable()
+
+    async def run():
+        client.start_async()
+        for _ in range(2):
+            with pytest.raises(Unavailable):
+                await client.call_async("k", unavailable)
+
+    asyncio.run(run())
+    assert client.breaker.state == "open"
+
+
+def test_async_calls_need_the_serving_loop_state(client, monkeypatch):
+    monkeypatch.setattr(client, "_slots_async", None)
+
+    async def ok(options):
+        return "ok"
+
+    async def run():
+        return await client.call_async("k", ok)
+
+    with pytest.raises(RuntimeError, match="start_async"):
+        asyncio.run(run())
+
+    async def started():
+        client.start_async()
+        return await client.call_async("k", ok)
+
+    # a fresh loop each time, as each ASGI server process has
+    assert asyncio.run(started()) == "ok"
+    assert asyncio.run(started()) == "ok"
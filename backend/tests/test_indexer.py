@@ -0,0 +1,127 @@
+# backend/tests/test_indexer.py
+
+import datetime
+import pytest
+import indexer
+from indexer import EmbeddingIndexer, Lease
+from utils.gemini_client import ModelUnavailable
+
+mongomock = pytest.importorskip("mongomock")
+
+
+def fake_embeddings(texts):
+    if any("BAD" in t for t in texts):
+        raise ValueError("model rejected the text")
+    return [[1.0, 0.0, 0.5] for _ in texts]
+
+
+@pytest.fixture
+def db(monkeypatch):
+    monkeypatch.setattr(indexer, "get_embeddings", fake_embeddings)
+    monkeypatch.setattr(indexer.time, "sleep", lambda seconds: None)  # _run's pause after an error
+    return mongomock.MongoClient().db
+
+
+def make_indexer(db, owner="a", batch_size=1):
+    lease = Lease(db.leases, "embedding-indexer", 60)
+    lease.owner = owner
+    return EmbeddingIndexer(db.products, lease, batch_size=batch_size)
+
+
+# ---------------- FAILURES ---------------- #
+
+def test_failing_product_backs_off_and_the_rest_proceed(db):
+    db.products.insert_many([{"product": "BAD chair"}, {"product": "desk"}, {"product": "lamp"}])
+    worker = make_indexer(db)
+
+    assert worker.sweep() == 0
+    bad = db.products.find_one({"product": "BAD chair"})
+    assert bad["embeddingError"] == "model rejected the text"
+    assert bad["embeddingAttempts"] == 1
+    assert bad["embeddingRetryAt"] > datetime.datetime.utcnow()
+
+    # the next sweep skips it instead of failing on it again
+    assert worker.sweep() == 2
+    assert db.products.count_documents({"embedding": {"$exists": True}}) == 2
+    status = worker.status()
+    assert status["pending"] == 1
+    assert status["backingOff"] == 1
+
+
+def test_refused_product_is_isolated_within_a_batch(db):
+    db.products.insert_many([{"product": "desk"}, {"product": "BAD chair"}, {"product": "lamp"}, {"product": "shelf"}])
+    worker = make_indexer(db, batch_size=100)
+
+    assert worker.sweep() == 3
+    assert db.products.count_documents({"embedding": {"$exists": True}}) == 3
+    assert db.products.count_documents({"embeddingError": {"$exists": True}}) == 1
+    assert db.products.find_one({"product": "BAD chair"})["embeddingAttempts"] == 1
+
+    # the next sweep has nothing due: no retry of the good products, no new attempt on the bad one
+    assert worker.sweep() == 0
+    assert db.products.find_one({"product": "BAD chair"})["embeddingAttempts"] == 1
+
+
+def test_transient_failure_backs_off_the_whole_batch(db, monkeypatch):
+    calls = []
+
+    def unavailable(texts):
+        calls.append(texts)
+        raise ModelUnavailable("Gemini circuit breaker is open")
+
+    monkeypatch.setattr(indexer, "get_embeddings", unavailable)
+    db.products.insert_many([{"product": "desk"}, {"product": "lamp"}, {"product": "shelf"}])
+
+    assert make_indexer(db, batch_size=100).sweep() == 0
+    assert len(calls) == 1
+    assert db.products.count_documents({"embeddingAttempts": 1}) == 3
+
+
+def test_backoff_doubles_and_is_capped(monkeypatch):
+    monkeypatch.setattr(indexer, "RETRY_BASE_SECONDS", 60)
+    monkeypatch.setattr(indexer, "RETRY_MAX_SECONDS", 200)
+    now = datetime.datetime.utcnow()
+    delays = [round((indexer.retry_at(n) - now).total_seconds()) for n in (1, 2, 3, 4)]
+    assert delays == [60, 120, 200, 200]
+
+
+def test_retry_when_due_and_success_clears_the_failure(db, monkeypatch):
+    db.products.insert_one({"product": "BAD chair"})
+    worker = make_indexer(db)
+    worker.sweep()
+    db.products.update_one({}, {"$set": {"embeddingRetryAt": datetime.datetime.utcnow() - datetime.timedelta(seconds=1)}})
+
+    worker.sweep()
+    assert db.products.find_one()["embeddingAttempts"] == 2
+
+    db.products.update_one({}, {"$set": {"embeddingRetryAt": datetime.datetime.utcnow(), "product": "chair"}})
+    assert worker.sweep() == 1
+    fixed = db.products.find_one()
+    assert "embedding" in fixed and "embeddedAt" in fixed
+    assert not any(f in fixed for f in indexer.FAILURE_FIELDS)
+
+
+# ---------------- LEASE ---------------- #
+
+def test_one_lease_holder_at_a_time(db):
+    first, second = make_indexer(db, "a").lease, make_indexer(db, "b").lease
+    assert first.hold()
+    assert first.hold()  # renewing
+    assert not second.hold()
+
+    db.leases.update_one({}, {"$set": {"expiresAt": datetime.datetime.utcnow() - datetime.timedelta(seconds=1)}})
+    assert second.hold()
+    assert not first.hold()
+
+    second.release()
+    assert first.hold()
+
+
+def test_standby_does_not_sweep(db):
+    db.products.insert_one({"product": "desk"})
+    leader, standby = make_indexer(db, "a"), make_indexer(db, "b")
+    assert leader._hold_lease()
+
+    assert standby.sweep() == 0
+    assert not standby.leader
+    assert leader.sweep() == 1
@@ -0,0 +1,90 @@
+# backend/tests/test_jobs.py
+
+import asyncio
+import pytest
+from utils.jobs import AsyncSlots, JobQueueFull, JobRunner
+
+
+def test_slots_must_be_started():
+    slots = AsyncSlots(workers=1, queue_depth=0)
+
+    async def run():
+        async with slots.slot():
+            pass
+
+    with pytest.raises(RuntimeError, match="start"):
+        asyncio.run(run())
+
+
+def test_admission_limit():
+    slots = AsyncSlots(workers=1, queue_depth=1)
+
+    async def run():
+        slots.start()
+        release = asyncio.Event()
+
+        async def hold():
+            async with slots.slot():
+                await release.wait()
+
+        running = asyncio.create_task(hold())
+        waiting = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert slots.stats()["running"] == 1
+        assert slots.stats()["queued"] == 1
+
+        with pytest.raises(JobQueueFull):
+            async with slots.slot():
+                pass
+
+        release.set()
+        await asyncio.gather(running, waiting)
+        return slots.stats()
+
+    stats = asyncio.run(run())
+    assert stats["running"] == stats["queued"] == 0
+
+
+def test_restart_on_a_new_loop():
+    slots = AsyncSlots(workers=1, queue_depth=4)
+
+    async def run():
+        slots.start()
+
+        async def one():
+            async with slots.slot():
+                await asyncio.sleep(0)
+
+        await asyncio.gather(one(), one(), one())
+
+    # contended waits bind a semaphore to its loop; start() gives each loop its own
+    asyncio.run(run())
+    asyncio.run(run())
+
+
+def test_shared_job_can_be_polled_from_another_worker():
+    mongomock = pytest.importorskip("mongomock")
+    store = mongomock.MongoClient().db.analysis_jobs
+    runner = JobRunner(workers=1, queue_depth=0, store=store)
+    other_worker = JobRunner(workers=1, queue_depth=0, store=store)
+
+    job_id = runner.submit(lambda: ({"total": 1.5}, 200), shared=True)
+    runner.wait(job_id, timeout=5)
+
+    job = other_worker.get(job_id)
+    assert job["status"] == "done"
+    assert job["result"] == [{"total": 1.5}, 200]
+    assert store.find_one({"_id": job_id})["expiresAt"]
+
+
+def test_unshared_jobs_stay_local():
+    mongomock = pytest.importorskip("mongomock")
+    store = mongomock.MongoClient().db.analysis_jobs
+    runner = JobRunner(workers=1, queue_depth=0, store=store)
+
+    job_id = runner.submit(lambda: "x")
+    runner.wait(job_id, timeout=5)
+
+    assert runner.get(job_id)["status"] == "done"
+    assert store.count_documents({}) == 0
+    assert JobRunner(store=store).get(job_id) is None
@@ -0,0 +1,71 @@
+# backend/tests/test_pagination.py
+
+import json
+import pytest
+from flask import Flask, request
+from utils import pagination
+from utils.pagination import list_response, CURSOR_HEADER
+from utils.serialization import BSONJSONProvider
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(pagination, "PAGE_SIZE", 3)
+    monkeypatch.setattr(pagination, "MAX_PAGE_SIZE", 5)
+    items = mongomock.MongoClient().db.items
+    items.insert_many([{"n": n, "owner": "a" if n % 2 else "b"} for n in range(8)])
+
+    app = Flask(__name__)
+    app.json = BSONJSONProvider(app)
+    app.add_url_rule("/items", "items", lambda: list_response(items, {}, request))
+    app.add_url_rule("/items/a", "items_a", lambda: list_response(items, {"owner": "a"}, request, {"_id": True}))
+    return app.test_client()
+
+
+def numbers(response):
+    return [doc["n"] for doc in response.get_json()]
+
+
+def test_whole_list_without_limit_or_cursor(client):
+    response = client.get("/items")
+    assert numbers(response) == list(range(8))
+    assert CURSOR_HEADER not in response.headers
+
+
+def test_limit_pages_with_a_cursor(client):
+    first = client.get("/items?limit=5")
+    assert numbers(first) == [0, 1, 2, 3, 4]
+
+    rest = client.get(f"/items?limit=5&after={first.headers[CURSOR_HEADER]}")
+    assert numbers(rest) == [5, 6, 7]
+    assert CURSOR_HEADER not in rest.headers
+
+
+def test_cursor_alone_uses_the_default_page_size(client):
+    first = client.get("/items?limit=1")
+    page = client.get(f"/items?after={first.headers[CURSOR_HEADER]}")
+    assert numbers(page) == [1, 2, 3]
+    assert CURSOR_HEADER in page.headers
+
+
+def test_limit_is_capped(client):
+    assert len(client.get("/items?limit=500").get_json()) == 5
+
+
+def test_filter_and_projection(client):
+    docs = client.get("/items/a").get_json()
+    assert len(docs) == 4
+    assert all(set(doc) == {"_id"} for doc in docs)
+
+
+@pytest.mark.parametrize("query", ["after=nope", "limit=x"])
+def test_bad_arguments(client, query):
+    assert client.get(f"/items?{query}").status_code == 400
+
+
+def test_ndjson_streams_everything(client):
+    response = client.get("/items?format=ndjson")
+    assert response.mimetype == "application/x-ndjson"
+    assert [json.loads(line)["n"] for line in response.data.decode().splitlines()] == list(range(8))
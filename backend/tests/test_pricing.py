@@ -0,0 +1,160 @@
+# backend/tests/test_pricing.py
+
+import math
+from decimal import Decimal, ROUND_HALF_UP
+import numpy as np
+import pytest
+from flask import Flask
+import pricing
+import quotation_routes
+from pricing import price_lines, generate_quotation, parse_price_request, _round_div, _money
+
+CATALOG = {
+    "P-1": {"productId": "P-1", "product": "Chair", "price": 0.1, "itemNo": "1"},
+    "P-2": {"productId": "P-2", "product": "Desk", "price": 0.2, "itemNo": "2"},
+    "P-3": {"productId": "P-3", "product": "Lamp", "price": 19.99, "itemNo": "3"},
+}
+
+
+# ---------------- LINE MATHS ---------------- #
+
+@pytest.mark.parametrize("numer", [-25, -15, -5, -4, 0, 4, 5, 15, 25, -10001, 10001])
+def test_round_div_matches_decimal_half_up(numer):
+    expected = int((Decimal(numer) / 10).quantize(Decimal(1), ROUND_HALF_UP))
+    assert _round_div(np.array([numer], dtype=np.int64), 10)[0] == expected
+
+
+def test_money_keeps_whole_amounts_as_int():
+    amounts = _money(np.array([1000, 1999, 0, -250], dtype=np.int64))
+    assert amounts == [10, 19.99, 0, -2.5]
+    assert [type(a) for a in amounts] == [int, float, int, float]
+
+
+def test_line_totals_are_exact_cents():
+    items = [{"productId": "P-1", "quantity": 1}, {"productId": "P-2", "quantity": 1}]
+    formatted, net, discount, errors = price_lines(items, tiers=[], catalog=CATALOG)
+
+    assert errors == []
+    assert int(net.sum()) == 30  # 0.1 + 0.2, no float drift
+    assert [line["line_total"] for line in formatted] == [0.1, 0.2]
+
+
+def test_volume_tiers_round_half_up():
+    # 3 x 19.99 = 59.97, 2.5% off = 1.49925 -> 1.50
+    formatted, net, discount, _ = price_lines(
+        [{"productId": "P-3", "quantity": 3}], tiers=[(3, 250)], catalog=CATALOG)
+    assert formatted[0]["volume_discount"] == 1.5
+    assert formatted[0]["line_total"] == 58.47
+
+
+def test_catalog_price_wins_over_the_callers():
+    formatted, _, _, _ = price_lines(
+        [{"productId": "P-3", "quantity": 1, "unit_price": 0.01, "product": "Cheap"}], tiers=[], catalog=CATALOG)
+    assert formatted[0]["unit_price"] == 19.99
+    assert formatted[0]["product"] == "Lamp"
+
+
+def test_totals_round_tax_and_discount_to_the_cent():
+    quotation, _ = pricing.price_quotation(
+        [{"productId": "P-3", "quantity": 1}], tax_rate=0.125, discount_rate=0.1, tiers=[], catalog=CATALOG)
+    totals = quotation["pricing"]
+    assert totals["subtotal"] == 19.99
+    assert totals["taxAmount"] == 2.5       # 2.49875
+    assert totals["discountAmount"] == 2.0  # 1.999
+    assert totals["grandTotal"] == 20.49
+
+
+def test_generate_quotation_reports_unpriced_lines():
+    quotation = generate_quotation([
+        {"productId": "P-1", "quantity": 2},
+        {"productId": "NOPE", "quantity": 1},
+    ], catalog=CATALOG)
+
+    assert len(quotation["items"]) == 1
+    assert quotation["unpricedLines"] == [{"line": 2, "productId": "NOPE", "error": "unknown product"}]
+
+
+# ---------------- REQUEST CHECKS ---------------- #
+
+def body(**fields):
+    return dict({"items": [{"productId": "P-1", "quantity": 2}]}, **fields)
+
+
+def test_valid_request_and_defaults():
+    args, error = parse_price_request(body())
+    assert error is None
+    assert args == ([{"productId": "P-1", "quantity": 2}], "Walk-in Client", 0.18, 0.0)
+
+
+@pytest.mark.parametrize("quantity", [True, False, 0, -3, 1.5, "2", None, pricing.MAX_QUANTITY + 1, 2 ** 70])
+def test_bad_quantities(quantity):
+    args, error = parse_price_request(body(items=[{"productId": "P-1", "quantity": quantity}]))
+    assert args is None
+    assert error.startswith("every item needs an integer quantity")
+
+
+@pytest.mark.parametrize("items", [None, [], "P-1", ["P-1"]])
+def test_bad_items(items):
+    args, error = parse_price_request(body(items=items))
+    assert args is None
+
+
+@pytest.mark.parametrize("product_id", [None, "", 7, ["P-1"], {"$gt": ""}])
+def test_bad_product_ids(product_id):
+    args, error = parse_price_request(body(items=[{"productId": product_id, "quantity": 1}]))
+    assert args is None
+    assert error == "every item needs a productId string"
+
+
+@pytest.mark.parametrize("field", ["taxRate", "discountRate"])
+@pytest.mark.parametrize("value", [True, -0.1, 1.5, math.nan, math.inf, "0.1", None])
+def test_bad_rates(field, value):
+    args, error = parse_price_request(body(**{field: value}))
+    assert args is None
+    assert error == f"{field} must be a number between 0 and 1"
+
+
+@pytest.mark.parametrize("value", [0, 1, 0.07])
+def test_rate_bounds_are_inclusive(value):
+    args, error = parse_price_request(body(taxRate=value, discountRate=value))
+    assert error is None
+    assert args[2] == args[3] == value
+
+
+# ---------------- ROUTE ---------------- #
+
+@pytest.fixture
+def client(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    monkeypatch.setattr(quotation_routes, "validate_session", lambda req: {"role": "sales", "userId": "u1"})
+    monkeypatch.setattr(pricing, "products", mongomock.MongoClient().db.products)
+    pricing.price_cache.set_many(CATALOG)
+    app = Flask(__name__)
+    app.register_blueprint(quotation_routes.quotation_routes, url_prefix="/quotation")
+    return app.test_client()
+
+
+def test_price_route(client):
+    response = client.post("/quotation/price", json=body(taxRate=0.1))
+    assert response.status_code == 200
+    assert response.json["pricing"]["grandTotal"] == 0.22
+
+
+@pytest.mark.parametrize("payload", [
+    body(items=[{"productId": "P-1", "quantity": True}]),
+    body(items=[{"productId": "P-1", "quantity": -1}]),
+    body(taxRate=2),
+    body(discountRate="lots"),
+    body(items=[{"productId": {"$ne": None}, "quantity": 1}]),
+    [1, 2],
+])
+def test_price_route_rejects_bad_input(client, payload):
+    response = client.post("/quotation/price", json=payload)
+    assert response.status_code == 400
+    assert "error" in response.json
+
+
+def test_price_route_lists_unknown_products(client):
+    response = client.post("/quotation/price", json=body(items=[{"productId": "NOPE", "quantity": 1}]))
+    assert response.status_code == 400
+    assert response.json["lines"][0]["productId"] == "NOPE"
@@ -0,0 +1,123 @@
+# backend/tests/test_quotation_import.py
+
+import json
+import pytest
+import quotation_import
+from quotation_import import validate_row, parse_jsonl, import_quotations
+
+mongomock = pytest.importorskip("mongomock")
+
+CUSTOMER = "64b000000000000000000001"
+SALES = "64b0000000000000000000aa"
+
+
+def row(**fields):
+    return dict({
+        "quotationId": "Q-1",
+        "customerId": CUSTOMER,
+        "items": [{"productId": "P-1", "quantity": 1}],
+        "pricing": {"grandTotal": 10},
+    }, **fields)
+
+
+def jsonl(*rows):
+    return parse_jsonl([r if isinstance(r, str) else json.dumps(r) for r in rows])
+
+
+@pytest.fixture
+def db(monkeypatch):
+    """quotations and customers on mongomock, one known customer, no analytics."""
+    database = mongomock.MongoClient().db
+    database.customers.insert_one({"_id": quotation_import.ObjectId(CUSTOMER), "quotations": []})
+    database.quotations.create_index("quotationId", unique=True)
+    monkeypatch.setattr(quotation_import, "quotations", database.quotations)
+    monkeypatch.setattr(quotation_import, "customers", database.customers)
+    monkeypatch.setattr(quotation_import, "record_quotations", lambda docs: None)
+    return database
+
+
+# ---------------- VALIDATION ---------------- #
+
+def test_valid_row():
+    doc, error = validate_row(row(), SALES)
+    assert error is None
+    assert doc["quotationId"] == "Q-1"
+    assert doc["salesExecutiveId"] == SALES
+    assert doc["status"] == "pending"
+
+
+@pytest.mark.parametrize("field, value", [
+    ("quotationId", {"$ne": None}),
+    ("quotationId", ""),
+    ("quotationId", 7),
+    ("customerId", {"$ne": None}),
+    ("customerId", ["x"]),
+    ("customerId", None),
+])
+def test_ids_must_be_non_empty_strings(field, value):
+    doc, error = validate_row(row(**{field: value}), SALES)
+    assert doc is None
+    assert error == f"{field} must be a non-empty string"
+
+
+@pytest.mark.parametrize("fields, error", [
+    ({"customerId": "not-an-id"}, "invalid customerId"),
+    ({"items": {}}, "items must be a list and pricing an object"),
+    ({"createdAt": "yesterday"}, "invalid createdAt"),
+])
+def test_invalid_rows(fields, error):
+    assert validate_row(row(**fields), SALES) == (None, error)
+
+
+def test_missing_fields_and_sales_id():
+    assert validate_row({"quotationId": "Q-1"}, SALES) == (None, "missing customerId, items, pricing")
+    assert validate_row(row(), None) == (None, "missing salesExecutiveId")
+    assert validate_row(row(salesExecutiveId={"$gt": ""}), None) == (None, "salesExecutiveId must be a string")
+
+
+# ---------------- REPORT ---------------- #
+
+def test_report_lists_every_bad_line(db):
+    report = import_quotations(jsonl(
+        row(),
+        "{not json",
+        row(quotationId={"$ne": None}),
+        row(),
+        "",
+        row(quotationId="Q-2", customerId="64b000000000000000000009"),
+        row(quotationId="Q-3"),
+    ), SALES)
+
+    assert report["inserted"] == 2
+    errors = {e["line"]: e["error"] for e in report["errors"]}
+    assert sorted(errors) == [2, 3, 4, 6]
+    assert errors[2].startswith("invalid JSON")
+    assert errors[3] == "quotationId must be a non-empty string"
+    assert errors[4] == "duplicate quotationId in input"
+    assert errors[6] == "customer not found"
+    assert len(db.customers.find_one()["quotations"]) == 2
+
+def test_rerun_skips_existing(db):
+    import_quotations(jsonl(row()), SALES)
+    # existing row last: mongomock numbers upserts by their order among upserts
+    report = import_quotations(jsonl(row(quotationId="Q-2"), row()), SALES)
+    assert report["inserted"] == 1
+    assert report["skipped"] == [{"line": 2, "quotationId": "Q-1"}]
+    assert report["errors"] == []
+
+
+def test_write_errors_are_reported_by_line(db):
+    # a second unique index the import knows nothing about
+    db.quotations.create_index("pricing.ref", unique=True)
+    db.quotations.insert_one({"quotationId": "OLD", "pricing": {"ref": "R-1"}})
+
+    report = import_quotations(jsonl(
+        row(quotationId="Q-1", pricing={"ref": "R-2"}),
+        row(quotationId="Q-2", pricing={"ref": "R-1"}),
+    ), SALES)
+
+    assert report["inserted"] == 1
+    assert len(report["errors"]) == 1
+    assert report["errors"][0]["line"] == 2
+    assert report["errors"][0]["quotationId"] == "Q-2"
+    assert len(db.customers.find_one()["quotations"]) == 1
@@ -0,0 +1,37 @@
+# backend/tests/test_quotation_routes.py
+
+import pytest
+from flask import Flask
+import quotation_routes
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    database = mongomock.MongoClient().db
+    database.quotations.create_index("quotationId", unique=True)
+    customer = database.customers.insert_one({"name": "Acme"}).inserted_id
+
+    monkeypatch.setattr(quotation_routes, "quotations", database.quotations)
+    monkeypatch.setattr(quotation_routes, "customers", database.customers)
+    monkeypatch.setattr(quotation_routes, "validate_session", lambda request: {"role": "sales", "userId": "S1"})
+    monkeypatch.setattr(quotation_routes, "record_quotation", lambda quotation: None)
+
+    app = Flask(__name__)
+    app.register_blueprint(quotation_routes.quotation_routes, url_prefix="/quotation")
+    return app.test_client(), database, str(customer)
+
+
+def test_saving_the_same_quotation_twice_is_a_conflict(client):
+    http, database, customer_id = client
+    body = {"quotationId": "QT-1", "customerId": customer_id, "date": "2026-01-01",
+            "items": [], "pricing": {}, "terms": []}
+
+    assert http.post("/quotation/save", json=body).status_code == 200
+    again = http.post("/quotation/save", json=body)
+
+    assert again.status_code == 409
+    assert "QT-1" in again.get_json()["error"]
+    assert database.quotations.count_documents({}) == 1
+    assert len(database.customers.find_one()["quotations"]) == 1
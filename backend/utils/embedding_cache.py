@@ -0,0 +1,118 @@
+# backend/utils/embedding_cache.py
+
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Two-tier cache of text embeddings keyed by a hash of (model, text).
+
+    The memory tier is an LRU capped at `max_items`. If `path` is set, a
+    SQLite file backs it so entries survive restarts and are shared by every
+    worker process on the host; it is capped at `disk_max_items`, dropping
+    the oldest rows first.
+    """
+
+    def __init__(self, max_items=10000, path=None, disk_max_items=1000000):
+        self.max_items = max_items
+        self.path = path
+        self.disk_max_items = disk_max_items
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {"hits": 0, "diskHits": 0, "misses": 0, "evictions": 0}
+        self._disk_writes = 0
+
+        if path:
+            self._conn().execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, vec BLOB NOT NULL, created REAL NOT NULL)"
+            )
+            self._conn().execute(
+                "CREATE INDEX IF NOT EXISTS embeddings_created ON embeddings (created)"
+            )
+
+    @staticmethod
+    def key(model, text):
+        return hashlib.sha256(f"{model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _conn(self):
+        # sqlite3 connections cannot be shared between threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key, vec):
+        with self._lock:
+            self._items[key] = vec
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+                self._counters["evictions"] += 1
+
+    def get(self, model, text):
+        key = self.key(model, text)
+
+        with self._lock:
+            vec = self._items.get(key)
+            if vec is not None:
+                self._items.move_to_end(key)
+                self._counters["hits"] += 1
+                return vec
+
+        if self.path:
+            row = self._conn().execute(
+                "SELECT vec FROM embeddings WHERE key = ?", (key,)
+            ).fetchone()
+            if row:
+                vec = np.frombuffer(row[0], dtype=np.float32).tolist()
+                self._remember(key, vec)
+                with self._lock:
+                    self._counters["diskHits"] += 1
+                return vec
+
+        with self._lock:
+            self._counters["misses"] += 1
+        return None
+
+    def put(self, model, text, vec):
+        key = self.key(model, text)
+        self._remember(key, vec)
+
+        if self.path:
+            self._conn().execute(
+                "INSERT OR REPLACE INTO embeddings (key, vec, created) VALUES (?, ?, ?)",
+                (key, np.asarray(vec, dtype=np.float32).tobytes(), time.time())
+            )
+            self._disk_writes += 1
+            if self._disk_writes % 1000 == 0:
+                self._trim_disk()
+
+    def _trim_disk(self):
+        self._conn().execute(
+            "DELETE FROM embeddings WHERE key IN ("
+            " SELECT key FROM embeddings ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_items,)
+        )
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._counters, size=len(self._items), maxSize=self.max_items)
+
+        lookups = stats["hits"] + stats["diskHits"] + stats["misses"]
+        stats["hitRate"] = (stats["hits"] + stats["diskHits"]) / lookups if lookups else None
+
+        if self.path:
+            stats["diskSize"] = self._conn().execute(
+                "SELECT COUNT(*) FROM embeddings"
+            ).fetchone()[0]
+        return stats
@@ -0,0 +1,500 @@
+# backend/utils/gemini_client.py
+#
+# The google.generativeai SDK, imported and configured on first use, and the
+# one path every model call takes. The import alone takes about a second, so
+# web workers, scripts and benchmarks that never call a model do not pay for it.
+#
+# Each call goes through, in order:
+#   coalescing     identical concurrent calls share one request
+#   rate limit     token bucket, GEMINI_RATE_PER_SECOND (0 = off)
+#   breaker        after GEMINI_BREAKER_FAILURES failures in a row, fail fast
+#                  for GEMINI_BREAKER_RESET_SECONDS, then let one probe through
+#   retries        transient errors (429, 5xx, timeouts) retried GEMINI_RETRIES
+#                  times with full-jitter exponential backoff
+#   hedging        if an attempt is slower than GEMINI_HEDGE_AFTER_MS, a second
+#                  one is sent and the first answer wins (0 = off)
+#   timeout        GEMINI_TIMEOUT_SECONDS per attempt, GEMINI_MAX_CONCURRENCY
+#                  attempts in flight per process
+#
+# generate_content_async / embed_content_async run the same steps on asyncio
+# for the ASGI app (asgi.py), sharing the breaker, rate limit and stats;
+# start_async() must run on the serving loop first.
+#
+# GEMINI_API_ENDPOINT points the SDK (REST transport) at another host, e.g.
+# the fake server in bench/fake_gemini.py.
+
+import os
+import asyncio
+import random
+import hashlib
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TIMEOUT_SECONDS = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "30"))
+RETRIES = int(os.getenv("GEMINI_RETRIES", "2"))
+RETRY_BASE_MS = float(os.getenv("GEMINI_RETRY_BASE_MS", "250"))
+RETRY_MAX_MS = float(os.getenv("GEMINI_RETRY_MAX_MS", "4000"))
+RATE_PER_SECOND = float(os.getenv("GEMINI_RATE_PER_SECOND", "0"))
+RATE_BURST = float(os.getenv("GEMINI_RATE_BURST", "0")) or max(1.0, RATE_PER_SECOND)
+RATE_WAIT_SECONDS = float(os.getenv("GEMINI_RATE_WAIT_SECONDS", "5"))
+MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "16"))
+BREAKER_FAILURES = int(os.getenv("GEMINI_BREAKER_FAILURES", "5"))
+BREAKER_RESET_SECONDS = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+HEDGE_AFTER_MS = float(os.getenv("GEMINI_HEDGE_AFTER_MS", "0"))
+COALESCE = os.getenv("GEMINI_COALESCE", "1") == "1"
+API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT")
+
+# HTTP statuses worth another attempt; anything else (bad request, auth) is not
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+# transport errors that carry no status code
+RETRYABLE_ERRORS = {"ConnectionError", "Timeout", "ReadTimeout", "ConnectTimeout", "RetryError"}
+
+_lock = threading.RLock()
+_genai = None
+_models = {}
+
+# filled in once, read by /health/startup
+timings = {}
+
+
+class ModelUnavailable(Exception):
+    """The call was not sent: the breaker is open or no rate-limit token came in time."""
+
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+# ---------------- SDK ---------------- #
+
+def sdk():
+    """The configured google.generativeai module."""
+    global _genai
+    if _genai is None:
+        with _lock:
+            if _genai is None:
+                started = time.perf_counter()
+                import google.generativeai as genai
+                options = {}
+                if API_ENDPOINT:
+                    options = {"transport": "rest", "client_options": {"api_endpoint": API_ENDPOINT}}
+                genai.configure(api_key=os.getenv("GEMINI_API_KEY"), **options)
+                timings["sdkImportMs"] = round((time.perf_counter() - started) * 1000, 1)
+                _genai = genai
+    return _genai
+
+
+def generative_model(name):
+    """One shared GenerativeModel per model name."""
+    model = _models.get(name)
+    if model is None:
+        with _lock:
+            model = _models.get(name)
+            if model is None:
+                model = _models[name] = sdk().GenerativeModel(name)
+    return model
+
+
+# ---------------- LIMITS ---------------- #
+
+class TokenBucket:
+    """`rate` calls per second on average, bursts of up to `burst`."""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self):
+        """Take a token, or return the seconds until one is due."""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0
+            return (1 - self._tokens) / self.rate
+
+    def acquire(self, timeout):
+        if not self.rate:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            delay = self._take()
+            if not delay:
+                return True
+            if time.monotonic() + delay > deadline:
+                return False
+            time.sleep(delay)
+
+    async def acquire_async(self, timeout):
+        if not self.rate:
+            return True
+        deadline = time.monotonic() + timeout
+        while True:
+            delay = self._take()
+            if not delay:
+                return True
+            if time.monotonic() + delay > deadline:
+                return False
+            await asyncio.sleep(delay)
+
+    def try_acquire(self):
+        return not self.rate or not self._take()
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `failures` consecutive failures; open -> half-open
+    after `reset_seconds`, when one probe call is let through; its outcome
+    closes or re-opens the circuit.
+    """
+
+    def __init__(self, failures, reset_seconds):
+        self.failures = failures
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self._count = 0
+        self._opened_at = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    def before(self):
+        """
+        Raise ModelUnavailable unless a call may go out now. True when the
+        call is the half-open probe: the caller must release() it if the
+        attempt ends without a success() or failure().
+        """
+        with self._lock:
+            if self.state == "closed":
+                return False
+            remaining = self._opened_at + self.reset_seconds - time.monotonic()
+            if self.state == "open" and remaining <= 0:
+                self.state = "half-open"
+            if self.state == "half-open" and not self._probing:
+                self._probing = True
+                return True
+        stats["breakerRejected"] += 1
+        raise ModelUnavailable("Gemini circuit breaker is open", retry_after=max(1, round(remaining)))
+
+    def success(self):
+        with self._lock:
+            self.state = "closed"
+            self._count = 0
+            self._probing = False
+
+    def failure(self):
+        with self._lock:
+            self._count += 1
+            if self.state == "half-open" or self._count >= self.failures:
+                if self.state != "open":
+                    stats["breakerOpened"] += 1
+                self.state = "open"
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+    def release(self):
+        """The probe ended with no verdict (cancelled, interrupted): let the next call probe."""
+        with self._lock:
+            self._probing = False
+
+
+bucket = TokenBucket(RATE_PER_SECOND, RATE_BURST)
+breaker = CircuitBreaker(BREAKER_FAILURES, BREAKER_RESET_SECONDS)
+_slots = threading.BoundedSemaphore(MAX_CONCURRENCY)
+# hedged attempts run here; the losing attempt finishes in the background
+_pool = ThreadPoolExecutor(max_workers=MAX_CONCURRENCY, thread_name_prefix="gemini")
+_inflight = {}
+_inflight_lock = threading.Lock()
+# the async path has its own, made on the serving loop by start_async()
+_slots_async = None
+_inflight_async = {}
+
+stats = {
+    "calls": 0, "coalesced": 0, "attempts": 0, "retries": 0, "failures": 0,
+    "hedges": 0, "hedgeWins": 0, "rateLimited": 0, "breakerOpened": 0, "breakerRejected": 0,
+}
+
+
+def status():
+    return dict(stats, breaker=breaker.state, inflight=len(_inflight) + len(_inflight_async))
+
+
+# ---------------- CALLS ---------------- #
+
+def _retryable(e):
+    if isinstance(e, (TimeoutError, ConnectionError)):
+        return True
+    code = getattr(e, "code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS
+    return type(e).__name__ in RETRYABLE_ERRORS
+
+
+def is_transient(e):
+    """Worth trying again later (outage, rate limit, open breaker), as opposed to a request the model refuses."""
+    return isinstance(e, ModelUnavailable) or _retryable(e)
+
+
+def _attempt(fn):
+    with _slots:
+        stats["attempts"] += 1
+        # retry=None: the SDK's own retries would hide failures from the breaker
+        return fn({"timeout": TIMEOUT_SECONDS, "retry": None})
+
+
+def _hedged(fn):
+    """One attempt, plus a second if the first is slower than HEDGE_AFTER_MS."""
+    if not HEDGE_AFTER_MS:
+        return _attempt(fn)
+
+    first = _pool.submit(_attempt, fn)
+    done, _ = wait([first], timeout=HEDGE_AFTER_MS / 1000)
+    # a hedge never waits for a rate-limit token: under pressure it is skipped
+    if done or not bucket.try_acquire():
+        return first.result()
+
+    stats["hedges"] += 1
+    second = _pool.submit(_attempt, fn)
+    pending, error = {first, second}, None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is second:
+                    stats["hedgeWins"] += 1
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def _rate_limited():
+    stats["rateLimited"] += 1
+    return ModelUnavailable("Gemini rate limit reached", retry_after=max(1, round(1 / bucket.rate)))
+
+
+def _backoff(e, attempt):
+    """Book a failed attempt: seconds to wait before the next one, or None to give up."""
+    if not _retryable(e):
+        breaker.success()  # the provider answered; the request itself was bad
+        return None
+    breaker.failure()
+    stats["failures"] += 1
+    if attempt == RETRIES:
+        return None
+    stats["retries"] += 1
+    return random.uniform(0, min(RETRY_MAX_MS, RETRY_BASE_MS * 2 ** attempt)) / 1000
+
+
+def _with_retries(fn):
+    for attempt in range(RETRIES + 1):
+        # the token first: a probe must not be held while waiting for one
+        if not bucket.acquire(RATE_WAIT_SECONDS):
+            raise _rate_limited()
+        probe = breaker.before()
+
+        try:
+            result = _hedged(fn)
+        except Exception as e:
+            delay = _backoff(e, attempt)
+            if delay is None:
+                raise
+        else:
+            breaker.success()
+            return result
+        finally:
+            if probe:
+                breaker.release()
+        time.sleep(delay)
+
+
+def _fingerprint(value, digest):
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        digest.update(b"b%d:" % len(value))
+        digest.update(value)
+    elif isinstance(value, str):
+        digest.update(b"s%d:" % len(value.encode("utf-8")))
+        digest.update(value.encode("utf-8"))
+    elif isinstance(value, dict):
+        digest.update(b"{")
+        for key in sorted(value):
+            _fingerprint(key, digest)
+            _fingerprint(value[key], digest)
+        digest.update(b"}")
+    elif isinstance(value, (list, tuple)):
+        digest.update(b"[")
+        for item in value:
+            _fingerprint(item, digest)
+        digest.update(b"]")
+    else:
+        digest.update(repr(value).encode("utf-8"))
+
+
+def _key(value):
+    digest = hashlib.sha1()
+    _fingerprint(value, digest)
+    return digest.hexdigest()
+
+
+def call(key, fn):
+    """
+    Run fn(request_options) through the breaker, rate limit, retries and
+    hedging. Concurrent calls with the same key wait for the first one's
+    result instead of sending their own request.
+    """
+    stats["calls"] += 1
+    if not COALESCE:
+        return _with_retries(fn)
+
+    key = _key(key)
+    with _inflight_lock:
+        leader = _inflight.get(key)
+        if leader is None:
+            future = _inflight[key] = Future()
+    if leader is not None:
+        stats["coalesced"] += 1
+        return leader.result()
+
+    try:
+        result = _with_retries(fn)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+
+
+def generate_content(model_name, contents, **kwargs):
+    """GenerativeModel(model_name).generate_content(contents) as a resilient call."""
+    model = generative_model(model_name)
+    return call(
+        ("generate", model_name, contents, kwargs),
+        lambda options: model.generate_content(contents, request_options=options, **kwargs),
+    )
+
+
+def embed_content(**kwargs):
+    return call(
+        ("embed", kwargs),
+        lambda options: sdk().embed_content(request_options=options, **kwargs),
+    )
+
+
+# ---------------- ASYNC CALLS ---------------- #
+
+# The same pipeline for the async app, awaiting the SDK's *_async methods.
+# Breaker, rate limit and stats are shared with the threaded path.
+
+def start_async():
+    """Concurrency slots and in-flight futures for the running event loop (asgi.py's before_serving)."""
+    global _slots_async, _inflight_async
+    _slots_async = asyncio.Semaphore(MAX_CONCURRENCY)
+    _inflight_async = {}
+
+
+async def _attempt_async(fn):
+    if _slots_async is None:
+        raise RuntimeError("gemini_client.start_async() was not called on the serving loop")
+    async with _slots_async:
+        stats["attempts"] += 1
+        return await asyncio.wait_for(fn({"timeout": TIMEOUT_SECONDS, "retry": None}), TIMEOUT_SECONDS)
+
+
+async def _hedged_async(fn):
+    if not HEDGE_AFTER_MS:
+        return await _attempt_async(fn)
+
+    first = asyncio.ensure_future(_attempt_async(fn))
+    done, _ = await asyncio.wait([first], timeout=HEDGE_AFTER_MS / 1000)
+    if done or not bucket.try_acquire():
+        return await first
+
+    stats["hedges"] += 1
+    second = asyncio.ensure_future(_attempt_async(fn))
+    pending, error = {first, second}, None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.exception() is None:
+                if task is second:
+                    stats["hedgeWins"] += 1
+                for other in pending:
+                    other.cancel()
+                return task.result()
+            error = task.exception()
+    raise error
+
+
+async def _with_retries_async(fn):
+    for attempt in range(RETRIES + 1):
+        if not await bucket.acquire_async(RATE_WAIT_SECONDS):
+            raise _rate_limited()
+        probe = breaker.before()
+
+        try:
+            result = await _hedged_async(fn)
+        except Exception as e:
+            delay = _backoff(e, attempt)
+            if delay is None:
+                raise
+        else:
+            breaker.success()
+            return result
+        finally:
+            # CancelledError is not an Exception: without this the probe stays taken
+            if probe:
+                breaker.release()
+        await asyncio.sleep(delay)
+
+
+async def call_async(key, fn):
+    """call() for coroutines: fn(request_options) returns an awaitable."""
+    stats["calls"] += 1
+    if not COALESCE:
+        return await _with_retries_async(fn)
+
+    key = _key(key)
+    leader = _inflight_async.get(key)
+    if leader is not None:
+        stats["coalesced"] += 1
+        return await asyncio.shield(leader)
+
+    future = _inflight_async[key] = asyncio.get_running_loop().create_future()
+    try:
+        result = await _with_retries_async(fn)
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        if isinstance(e, asyncio.CancelledError):
+            future.cancel()
+        else:
+            future.set_exception(e)
+            future.exception()  # retrieved here, so an unawaited future does not warn
+        raise
+    finally:
+        del _inflight_async[key]
+
+
+async def generate_content_async(model_name, contents, **kwargs):
+    model = generative_model(model_name)
+    return await call_async(
+        ("generate", model_name, contents, kwargs),
+        lambda options: model.generate_content_async(contents, request_options=options, **kwargs),
+    )
+
+
+async def embed_content_async(**kwargs):
+    return await call_async(
+        ("embed", kwargs),
+        lambda options: sdk().embed_content_async(request_options=options, **kwargs),
+    )
@@ -0,0 +1,64 @@
+# backend/utils/images.py
+
+import io
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # without Pillow uploads are sent as-is
+    Image = None
+
+SIGNATURES = [
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+]
+
+PASSTHROUGH = {"JPEG", "PNG", "WEBP"}
+
+
+def sniff_mime(data):
+    """Real image type from the leading bytes, or None if unrecognised."""
+    for magic, mime in SIGNATURES:
+        if data.startswith(magic):
+            return mime
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:8] == b"ftyp" and data[8:12] in (b"heic", b"heix", b"mif1"):
+        return "image/heic"
+    return None
+
+
+def prepare_image(data, max_side=1600, quality=85):
+    """
+    Shrink a photo before it goes to the vision model.
+    Returns (bytes, mime_type). Images already within `max_side` in a format
+    the model takes directly are passed through untouched.
+    """
+    mime = sniff_mime(data) or "image/jpeg"
+    if Image is None:
+        return data, mime
+
+    try:
+        img = Image.open(io.BytesIO(data))
+        fmt = img.format
+        img = ImageOps.exif_transpose(img)
+    except Exception:
+        return data, mime
+
+    resized = max(img.size) > max_side
+    if not resized and fmt in PASSTHROUGH:
+        return data, mime
+
+    if resized:
+        img.thumbnail((max_side, max_side), Image.LANCZOS)
+    if img.mode not in ("RGB", "L"):
+        img = img.convert("RGB")
+
+    out = io.BytesIO()
+    img.save(out, "JPEG", quality=quality, optimize=True)
+    encoded = out.getvalue()
+
+    if not resized and len(encoded) >= len(data):
+        return data, mime
+    return encoded, "image/jpeg"
@@ -0,0 +1,188 @@
+# backend/utils/jobs.py
+
+import asyncio
+import datetime
+import json
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from utils.metrics import bind_profile, current_profile, record
+from utils.serialization import dumps_bytes
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobRunner:
+    """
+    Bounded background pool for slow work (model calls). At most `workers`
+    jobs run at once and at most `queue_depth` more may wait; beyond that
+    submit() raises JobQueueFull instead of piling up requests. Finished
+    jobs are kept for `result_ttl` seconds so they can be polled.
+
+    Jobs submitted with shared=True are also written to `store` (a Mongo
+    collection with a TTL index on expiresAt), so any worker process can
+    answer get() for them, not just the one running the job.
+    """
+
+    def __init__(self, workers=4, queue_depth=32, result_ttl=600, store=None):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.result_ttl = result_ttl
+        self.store = store
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis")
+        self._slots = threading.BoundedSemaphore(workers + queue_depth)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, shared=False):
+        if not self._slots.acquire(blocking=False):
+            raise JobQueueFull()
+
+        self._purge()
+        job_id = f"job_{uuid.uuid4().hex}"
+        job = {
+            "jobId": job_id,
+            "status": "queued",
+            "result": None,
+            "error": None,
+            "createdAt": time.time(),
+            "finishedAt": None,
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+
+        if shared and self.store is not None:
+            job["shared"] = True
+            self._save(job, insert=True)
+
+        try:
+            job["future"] = self._pool.submit(self._run, job, fn, args, current_profile())
+        except Exception:
+            self._slots.release()
+            raise
+        return job_id
+
+    def _run(self, job, fn, args, profile):
+        job["status"] = "running"
+        self._save(job)
+        try:
+            with bind_profile(profile):
+                record("queue_wait", time.time() - job["createdAt"])
+                job["result"] = fn(*args)
+            job["status"] = "done"
+        except Exception as e:
+            job["error"] = str(e)
+            job["status"] = "failed"
+        finally:
+            job["finishedAt"] = time.time()
+            self._save(job)
+            self._slots.release()
+        return job
+
+    def _save(self, job, insert=False):
+        """Mirror a shared job to the store. Failures are printed; the local copy still answers."""
+        if not job.get("shared"):
+            return
+        doc = self._public(job)
+        # BSON-safe copy of the result (tuples, numpy values)
+        doc["result"] = json.loads(dumps_bytes(doc["result"]))
+        doc["expiresAt"] = datetime.datetime.utcnow() + datetime.timedelta(seconds=self.result_ttl)
+        try:
+            if insert:
+                self.store.insert_one(dict(doc, _id=job["jobId"]))
+            else:
+                self.store.update_one({"_id": job["jobId"]}, {"$set": doc})
+        except Exception as e:
+            print("JOB STORE ERROR:", job["jobId"], e)
+
+    @staticmethod
+    def _public(job):
+        return {k: v for k, v in job.items() if k not in ("future", "shared", "_id", "expiresAt")}
+
+    def get(self, job_id):
+        """Public view of a job, or None if unknown or expired. Shared jobs run elsewhere are read from the store."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job:
+            return self._public(job)
+        if self.store is None:
+            return None
+        return self._public(self.store.find_one({"_id": job_id}) or {}) or None
+
+    def wait(self, job_id, timeout=None):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        job["future"].result(timeout)
+        return self.get(job_id)
+
+    def _purge(self):
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            for job_id in [k for k, j in self._jobs.items() if j["finishedAt"] and j["finishedAt"] < cutoff]:
+                del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            states = [j["status"] for j in self._jobs.values()]
+        return {
+            "workers": self.workers,
+            "queueDepth": self.queue_depth,
+            "queued": states.count("queued"),
+            "running": states.count("running"),
+        }
+
+
+class AsyncSlots:
+    """
+    JobRunner's admission control for the async app: at most `workers`
+    analyses run at once and `queue_depth` more wait; beyond that slot()
+    raises JobQueueFull. The work itself runs on the event loop, which
+    must call start() first (asgi.py does, in before_serving).
+    """
+
+    def __init__(self, workers=64, queue_depth=256):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self._semaphore = None
+        self._waiting = 0
+        self._running = 0
+
+    def start(self):
+        """Make the semaphore on the running loop; an asyncio.Semaphore cannot move to another."""
+        self._semaphore = asyncio.Semaphore(self.workers)
+        self._waiting = 0
+        self._running = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore is None:
+            raise RuntimeError("AsyncSlots.start() was not called on the serving loop")
+        if self._running + self._waiting >= self.workers + self.queue_depth:
+            raise JobQueueFull()
+
+        queued = time.time()
+        self._waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+
+        self._running += 1
+        record("queue_wait", time.time() - queued)
+        try:
+            yield
+        finally:
+            self._running -= 1
+            self._semaphore.release()
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "queueDepth": self.queue_depth,
+            "queued": self._waiting,
+            "running": self._running,
+        }
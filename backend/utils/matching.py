@@ -0,0 +1,477 @@
+# backend/utils/matching.py
+
+import os
+import re
+import time
+import threading
+import numpy as np
+from dotenv import load_dotenv
+from utils import quantize
+
+load_dotenv()
+
+PREFILTER = os.getenv("MATCH_PREFILTER", "1") == "1"
+# below this best in-category score the query is re-scored against the whole catalog
+PREFILTER_MIN_SCORE = float(os.getenv("MATCH_PREFILTER_MIN_SCORE", "0.6"))
+# rows decoded to float32 per step when the matrix is held as float16/int8
+SCORE_CHUNK = int(os.getenv("MATCH_SCORE_CHUNK", "4096"))
+
+
+def product_key(prod):
+    return prod.get("productId") or str(prod["_id"])
+
+
+def normalize_rows(matrix):
+    """L2-normalise every row so a dot product is the cosine similarity."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / (norms + 1e-9)
+
+
+# ---------------- CATEGORIES ---------------- #
+
+# word in a detection or product text -> catalog category. Covers the
+# categories the vision prompt asks for; extend with MATCH_CATEGORY_ALIASES.
+CATEGORY_ALIASES = {
+    "chair": "chair", "chairs": "chair", "armchair": "chair", "stool": "chair",
+    "seat": "chair", "seating": "chair",
+    "desk": "desk", "desks": "desk", "table": "desk", "workstation": "desk",
+    "shelf": "shelf", "shelves": "shelf", "shelving": "shelf", "bookshelf": "shelf",
+    "bookcase": "shelf", "rack": "shelf", "storage": "shelf", "cabinet": "shelf",
+    "organiser": "organiser", "organizer": "organiser", "organisers": "organiser",
+    "organizers": "organiser", "corkboard": "organiser", "pinboard": "organiser",
+    "noticeboard": "organiser",
+    "plant": "plant", "plants": "plant", "planter": "plant", "fern": "plant",
+}
+
+
+def parse_aliases(spec):
+    """"sofa:chair,couch:chair" -> {"sofa": "chair", "couch": "chair"}"""
+    aliases = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        word, category = part.split(":")
+        aliases[word.strip().lower()] = category.strip().lower()
+    return aliases
+
+
+CATEGORY_ALIASES.update(parse_aliases(os.getenv("MATCH_CATEGORY_ALIASES", "")))
+
+
+def categories_of(*texts):
+    """Catalog categories mentioned anywhere in the given texts."""
+    words = re.findall(r"[a-z]+", " ".join(texts).lower())
+    return {CATEGORY_ALIASES[w] for w in words if w in CATEGORY_ALIASES}
+
+
+def product_categories(prod):
+    return categories_of(prod.get("productGroup", ""), *prod.get("tags", []))
+
+
+# ---------------- EXACT INDEX ---------------- #
+
+class CatalogIndex:
+    """
+    Process-resident matrix of every product embedding.
+
+    Rows are pre-normalised and keyed by productId, so scoring all
+    detections of a request against the catalog is one matrix multiply.
+    Products can be added and removed in place without a rebuild.
+
+    An inverted index from category (productGroup and tags) to rows lets
+    best_matches() score a named detection against its category only.
+
+    `dtype` float16 or int8 keeps the rows quantised in memory (int8 with a
+    per-row scale) and scores them in place; see utils/quantize.py.
+    """
+
+    kind = "exact"
+
+    def __init__(self, dtype="float32"):
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.RLock()
+        self._matrix = np.zeros((0, 0), dtype=self.dtype)
+        self._scales = np.ones(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        self._size = 0
+        self._ids = []
+        self._docs = []
+        self._positions = {}
+        self._stale = True
+        self.version = 0
+        # set by utils/snapshot.py: snapshot currently served, and when this
+        # process first changed the catalog after loading it
+        self.snapshot_version = None
+        self.dirty_since = None
+        self.recall_stats = {"queries": 0, "agree": 0}
+        self.prefilter_stats = {"queries": 0, "narrowed": 0, "fallbacks": 0, "candidates": 0}
+        self._postings = {}
+        self._candidates = {}
+
+    def __len__(self):
+        return len(self._positions)
+
+    def build(self, entries):
+        """entries: iterable of (product_doc, embedding)."""
+        ids, docs, vectors = [], [], []
+        for prod, emb in entries:
+            doc = {k: v for k, v in prod.items() if k != "embedding"}
+            ids.append(product_key(doc))
+            docs.append(doc)
+            vectors.append(emb)
+
+        matrix, scales = quantize.stack(vectors, self.dtype)
+        self.install(ids, docs, matrix, scales)
+
+    def install(self, ids, docs, matrix, scales, snapshot_version=None):
+        """
+        Swap in prepared rows (normalised, in self.dtype). The arrays may be
+        read-only memory maps; they are copied only if a product is added later.
+        """
+        with self._lock:
+            self._matrix = np.ascontiguousarray(matrix)
+            self._scales = scales
+            self._alive = np.ones(len(ids), dtype=bool)
+            self._size = len(ids)
+            self._ids = ids
+            self._docs = docs
+            self._positions = {pid: i for i, pid in enumerate(ids)}
+            self._postings = {}
+            for row, doc in enumerate(docs):
+                self._post(row, doc)
+            self._stale = False
+            self.snapshot_version = snapshot_version
+            self.version += 1
+            self._on_build()
+
+    def ensure_loaded(self, loader):
+        """Build from loader() the first time, or after invalidate()."""
+        if self._stale:
+            self.build(loader())
+
+    def invalidate(self):
+        """Mark the catalog as changed; the old matrix keeps serving until the rebuild."""
+        self._stale = True
+        self._mark_dirty()
+        self.version += 1
+
+    def _mark_dirty(self):
+        if self.dirty_since is None:
+            self.dirty_since = time.time()
+
+    @property
+    def stale(self):
+        return self._stale
+
+    def add(self, prod, emb):
+        """Insert or replace one product. Ignored until the index has been built."""
+        with self._lock:
+            if self._stale:
+                return
+
+            pid = product_key(prod)
+            if pid in self._positions:
+                self.remove(pid)
+
+            vec = normalize_rows(quantize.unpack(emb))[0]
+            codes, scales = quantize.quantize_rows(vec.reshape(1, -1), self.dtype)
+            if not self._size:
+                self._matrix = np.zeros((0, len(vec)), dtype=self.dtype)
+            if self._size == len(self._matrix) or not self._matrix.flags.writeable:
+                self._grow()
+
+            row = self._size
+            self._matrix[row] = codes[0]
+            self._scales[row] = scales[0]
+            self._alive[row] = True
+            self._size += 1
+            self._ids.append(pid)
+            self._docs.append({k: v for k, v in prod.items() if k != "embedding"})
+            self._positions[pid] = row
+            self._post(row, self._docs[row])
+            self._mark_dirty()
+            self.version += 1
+            self._on_add(row, vec)
+
+    def remove(self, product_id):
+        with self._lock:
+            row = self._positions.pop(product_id, None)
+            if row is None:
+                return False
+            self._alive[row] = False
+            for category in product_categories(self._docs[row]):
+                self._postings[category].discard(row)
+            self._docs[row] = None
+            self._candidates = {}
+            self._mark_dirty()
+            self.version += 1
+            self._on_remove(row)
+            return True
+
+    def get(self, product_id):
+        row = self._positions.get(product_id)
+        return None if row is None else self._docs[row]
+
+    def _post(self, row, doc):
+        for category in product_categories(doc):
+            self._postings.setdefault(category, set()).add(row)
+        self._candidates = {}
+
+    def candidates(self, name):
+        """
+        (rows, matrix) of the categories named by `name`, or None if it names
+        none. The sub-matrix is cached per category set until the catalog changes.
+        """
+        categories = frozenset(categories_of(name) & self._postings.keys())
+        if not categories:
+            return None
+
+        found = self._candidates.get(categories)
+        if found is None:
+            rows = np.fromiter(sorted(set().union(*(self._postings[c] for c in categories))), dtype=np.int64)
+            if len(rows) and rows[-1] - rows[0] + 1 == len(rows):
+                # contiguous (snapshots are written grouped by category): a view, not a copy
+                block = slice(rows[0], rows[-1] + 1)
+                found = (rows, self._matrix[block], self._scales[block])
+            else:
+                found = (rows, self._matrix[rows], self._scales[rows])
+            self._candidates[categories] = found
+        return found
+
+    def _score(self, queries, matrix, scales):
+        """Normalised float32 queries x stored rows -> float32 cosine scores."""
+        if matrix.dtype == np.float32:
+            return queries @ matrix.T
+
+        scores = np.empty((len(queries), len(matrix)), dtype=np.float32)
+        for start in range(0, len(matrix), SCORE_CHUNK):
+            chunk = matrix[start:start + SCORE_CHUNK].astype(np.float32)
+            scores[:, start:start + SCORE_CHUNK] = queries @ chunk.T
+        if matrix.dtype == np.int8:
+            scores *= scales
+        return scores
+
+    def rows_float32(self, rows):
+        """Decoded float32 copies of the given rows."""
+        return self._matrix[rows].astype(np.float32) * self._scales[rows, None]
+
+    def _grow(self):
+        capacity = max(16, 2 * len(self._matrix))
+        matrix = np.zeros((capacity, self._matrix.shape[1]), dtype=self.dtype)
+        matrix[:self._size] = self._matrix[:self._size]
+        scales = np.ones(capacity, dtype=np.float32)
+        scales[:self._size] = self._scales[:self._size]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:self._size] = self._alive[:self._size]
+        self._matrix, self._scales, self._alive = matrix, scales, alive
+
+    # hooks for subclasses that keep extra structures over the rows
+    def _on_build(self):
+        pass
+
+    def _on_add(self, row, vec):
+        pass
+
+    def _on_remove(self, row):
+        pass
+
+    def exact_matches(self, query_vectors):
+        """
+        Score every query against the whole catalog at once.
+        Returns one (product_doc, score) per query, or (None, -1) if the catalog is empty.
+        """
+        with self._lock:
+            if not len(self._positions) or not len(query_vectors):
+                return [(None, -1)] * len(query_vectors)
+
+            scores = self._score(normalize_rows(query_vectors), self._matrix[:self._size], self._scales[:self._size])
+            scores[:, ~self._alive[:self._size]] = -np.inf
+            best = scores.argmax(axis=1)
+
+            return [
+                (self._docs[j], float(scores[i, j]))
+                for i, j in enumerate(best)
+            ]
+
+    def best_matches(self, query_vectors, names=None):
+        return self._prefiltered(query_vectors, names, self.exact_matches)
+
+    def _prefiltered(self, query_vectors, names, full_scan):
+        """
+        With detection names, score each query against its category's rows
+        only. Queries that name no known category, or whose best in-category
+        score is under PREFILTER_MIN_SCORE, go to full_scan instead.
+        """
+        if not PREFILTER or names is None or not len(query_vectors):
+            return full_scan(query_vectors)
+
+        queries = normalize_rows(query_vectors)
+        results = [None] * len(queries)
+        fallback = []
+
+        with self._lock:
+            stats = self.prefilter_stats
+            stats["queries"] += len(queries)
+
+            # queries naming the same categories share one matrix multiply
+            groups = {}
+            for i, name in enumerate(names):
+                found = self.candidates(name)
+                if found is None or not len(found[0]):
+                    fallback.append(i)
+                else:
+                    groups.setdefault(id(found), (found, []))[1].append(i)
+
+            for (rows, matrix, scales), members in groups.values():
+                scores = self._score(queries[members], matrix, scales)
+                best = scores.argmax(axis=1)
+                for i, j, score in zip(members, best, scores[np.arange(len(members)), best]):
+                    if score < PREFILTER_MIN_SCORE:
+                        fallback.append(i)
+                        continue
+                    stats["narrowed"] += 1
+                    stats["candidates"] += len(rows)
+                    results[i] = (self._docs[rows[j]], float(score))
+
+            if fallback:
+                stats["fallbacks"] += len(fallback)
+                for i, match in zip(fallback, full_scan(queries[fallback])):
+                    results[i] = match
+
+        return results
+
+    def recall_check(self, query_vectors, names=None):
+        """Compare best_matches() with the exact scan and accumulate top-1 recall."""
+        approx = self.best_matches(query_vectors, names)
+        exact = self.exact_matches(query_vectors)
+
+        agree = sum(
+            1 for (a, _), (e, _) in zip(approx, exact)
+            if (a and product_key(a)) == (e and product_key(e))
+        )
+        with self._lock:
+            self.recall_stats["queries"] += len(exact)
+            self.recall_stats["agree"] += agree
+
+        return {
+            "queries": len(exact),
+            "agree": agree,
+            "recall": agree / len(exact) if exact else 1.0,
+            "approx": approx,
+        }
+
+
+# ---------------- IVF INDEX ---------------- #
+
+def _kmeans(data, k, iterations, rng):
+    """Spherical k-means: centroids stay unit length so scoring is a dot product."""
+    centroids = data[rng.choice(len(data), k, replace=False)].copy()
+
+    for _ in range(iterations):
+        assign = (data @ centroids.T).argmax(axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, data)
+        filled = np.bincount(assign, minlength=k) > 0
+        centroids[filled] = normalize_rows(sums[filled])
+
+    return centroids
+
+
+class IVFIndex(CatalogIndex):
+    """
+    Inverted-file ANN index: rows are bucketed under their nearest k-means
+    centroid and a query only scores the rows of its `nprobe` closest buckets.
+    New products are assigned to the nearest existing centroid, so admin
+    updates never retrain; call build() again to re-balance the buckets.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, nlist=0, nprobe=8, iterations=10, train_size=50000, seed=0, dtype="float32"):
+        super().__init__(dtype)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.iterations = iterations
+        self.train_size = train_size
+        self._rng = np.random.default_rng(seed)
+        self._centroids = None
+        self._lists = []
+        self._assign = {}
+
+    def _on_build(self):
+        self._centroids = None
+        self._lists = []
+        self._assign = {}
+
+        rows = np.flatnonzero(self._alive[:self._size])
+        if not len(rows):
+            return
+
+        data = self.rows_float32(rows)
+        k = self.nlist or int(np.sqrt(len(rows)))
+        k = max(1, min(k, len(rows)))
+
+        train = data
+        if len(rows) > self.train_size:
+            train = data[self._rng.choice(len(rows), self.train_size, replace=False)]
+
+        self._centroids = _kmeans(train, k, self.iterations, self._rng)
+        assign = (data @ self._centroids.T).argmax(axis=1)
+
+        self._lists = [[] for _ in range(k)]
+        for row, c in zip(rows.tolist(), assign.tolist()):
+            self._lists[c].append(row)
+            self._assign[row] = c
+
+    def _on_add(self, row, vec):
+        if self._centroids is None:
+            self._centroids = vec.reshape(1, -1).copy()
+            self._lists = [[]]
+        c = int((self._centroids @ vec).argmax())
+        self._lists[c].append(row)
+        self._assign[row] = c
+
+    def _on_remove(self, row):
+        c = self._assign.pop(row, None)
+        if c is not None:
+            self._lists[c].remove(row)
+
+    def best_matches(self, query_vectors, names=None):
+        return self._prefiltered(query_vectors, names, self.ann_matches)
+
+    def ann_matches(self, query_vectors):
+        with self._lock:
+            if self._centroids is None or not len(query_vectors):
+                return self.exact_matches(query_vectors)
+
+            queries = normalize_rows(query_vectors)
+            nprobe = min(self.nprobe, len(self._centroids))
+            probes = np.argsort(-(queries @ self._centroids.T), axis=1)[:, :nprobe]
+
+            results = []
+            for q, probe in zip(queries, probes):
+                candidates = [row for c in probe for row in self._lists[c]]
+                if not candidates:
+                    results.append((None, -1))
+                    continue
+
+                candidates = np.asarray(candidates)
+                scores = self._score(q.reshape(1, -1), self._matrix[candidates], self._scales[candidates])[0]
+                best = int(scores.argmax())
+                results.append((self._docs[candidates[best]], float(scores[best])))
+
+            return results
+
+
+def create_index(kind="exact", dtype="float32"):
+    if kind == "ivf":
+        return IVFIndex(
+            nlist=int(os.getenv("MATCH_IVF_NLIST", "0")),
+            nprobe=int(os.getenv("MATCH_IVF_NPROBE", "8")),
+            dtype=dtype,
+        )
+    return CatalogIndex(dtype)
+
+
+catalog_index = create_index(os.getenv("MATCH_INDEX", "exact"), os.getenv("MATCH_DTYPE", "float32"))
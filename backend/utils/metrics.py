@@ -0,0 +1,162 @@
+# backend/utils/metrics.py
+
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# seconds; wide enough for both in-memory matching and multi-second Gemini calls
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram, one series per label tuple."""
+
+    def __init__(self, name, help_text, labels, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = labels
+        self.buckets = buckets
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, seconds, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += seconds
+            series["count"] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = [(k, dict(v, counts=list(v["counts"]))) for k, v in sorted(self._series.items())]
+
+        for label_values, series in snapshot:
+            labels = ",".join(f'{k}="{_escape(v)}"' for k, v in zip(self.labels, label_values))
+            prefix = labels + "," if labels else ""
+            running = 0
+            for bound, count in zip(self.buckets, series["counts"]):
+                running += count
+                lines.append(f'{self.name}_bucket{{{prefix}le="{bound}"}} {running}')
+            lines.append(f'{self.name}_bucket{{{prefix}le="+Inf"}} {series["count"]}')
+            suffix = f"{{{labels}}}" if labels else ""
+            lines.append(f"{self.name}_sum{suffix} {series['sum']:.6f}")
+            lines.append(f"{self.name}_count{suffix} {series['count']}")
+        return lines
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Registry:
+    """Histograms plus gauges read from callbacks at scrape time."""
+
+    def __init__(self):
+        self._histograms = []
+        self._gauges = []
+
+    def histogram(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        hist = Histogram(name, help_text, labels, buckets)
+        self._histograms.append(hist)
+        return hist
+
+    def gauge(self, name, help_text, fn):
+        self._gauges.append((name, help_text, fn))
+
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = []
+        for hist in self._histograms:
+            lines.extend(hist.render())
+        for name, help_text, fn in self._gauges:
+            try:
+                value = fn()
+            except Exception:
+                continue
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} gauge", f"{name} {value}"]
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_seconds = registry.histogram(
+    "http_request_duration_seconds", "Request latency by route", ("method", "route", "status")
+)
+stage_seconds = registry.histogram(
+    "stage_duration_seconds", "Latency of pipeline stages (model calls, queries, serialisation)", ("stage",)
+)
+
+
+# ---------------- PER-REQUEST PROFILES ---------------- #
+
+# The profile of the request being served, if one was asked for. A context
+# variable follows both a thread (Flask) and an asyncio task (asgi.py); job
+# workers re-bind the submitting request's profile while they run.
+_profile = ContextVar("profile", default=None)
+
+
+class Profile:
+    def __init__(self):
+        self.stages = []
+        self._lock = threading.Lock()
+
+    def add(self, stage, seconds):
+        with self._lock:
+            self.stages.append((stage, seconds))
+
+    def server_timing(self):
+        """Server-Timing header value; repeated stages are summed."""
+        totals = {}
+        with self._lock:
+            for stage, seconds in self.stages:
+                totals[stage] = totals.get(stage, 0.0) + seconds
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in totals.items())
+
+
+def current_profile():
+    return _profile.get()
+
+
+def start_profile():
+    profile = Profile()
+    _profile.set(profile)
+    return profile
+
+
+def end_profile():
+    profile = current_profile()
+    _profile.set(None)
+    return profile
+
+
+@contextmanager
+def bind_profile(profile):
+    token = _profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _profile.reset(token)
+
+
+def record(stage, seconds):
+    stage_seconds.observe(seconds, stage)
+    profile = current_profile()
+    if profile is not None:
+        profile.add(stage, seconds)
+
+
+@contextmanager
+def span(stage):
+    """Time a block into stage_duration_seconds and the active profile."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(stage, time.perf_counter() - start)
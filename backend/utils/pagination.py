@@ -0,0 +1,69 @@
+# backend/utils/pagination.py
+
+import os
+from bson import ObjectId
+from bson.errors import InvalidId
+from flask import Response, jsonify, stream_with_context, current_app
+from dotenv import load_dotenv
+from utils.metrics import span
+
+load_dotenv()
+
+PAGE_SIZE = int(os.getenv("LIST_PAGE_SIZE", "1000"))
+MAX_PAGE_SIZE = int(os.getenv("LIST_MAX_PAGE_SIZE", "1000"))
+CURSOR_HEADER = "X-Next-Cursor"
+
+
+def _ndjson(cursor):
+    dumps = current_app.json.dumps
+    for doc in cursor:
+        yield dumps(doc) + "\n"
+
+
+def list_response(collection, filt, req, projection=None):
+    """
+    Listing ordered by _id. Without limit or after it is the whole list,
+    as the frontend expects; either one asks for keyset pages.
+
+    ?limit=N        page size (default LIST_PAGE_SIZE, capped at LIST_MAX_PAGE_SIZE)
+    ?after=<id>     continue after this _id; the next value comes back in X-Next-Cursor
+    ?format=ndjson  stream one document per line straight from the cursor instead
+                    of building a page (no page cap unless limit is given)
+    """
+    args = req.args
+
+    try:
+        after = ObjectId(args["after"]) if args.get("after") else None
+        limit = int(args.get("limit", PAGE_SIZE))
+    except (InvalidId, ValueError):
+        return jsonify({"error": "Invalid after/limit"}), 400
+
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    paged = "limit" in args or "after" in args
+
+    if after:
+        filt = {**filt, "_id": {"$gt": after}}
+
+    cursor = collection.find(filt, projection).sort("_id", 1)
+
+    if args.get("format") == "ndjson":
+        if "limit" in args:
+            cursor = cursor.limit(limit)
+        return Response(stream_with_context(_ndjson(cursor)), mimetype="application/x-ndjson")
+
+    if not paged:
+        with span("list_query"):
+            docs = list(cursor)
+        with span("serialize"):
+            return jsonify(docs)
+
+    with span("list_query"):
+        docs = list(cursor.limit(limit + 1))
+    has_more = len(docs) > limit
+    docs = docs[:limit]
+
+    with span("serialize"):
+        res = jsonify(docs)
+    if has_more:
+        res.headers[CURSOR_HEADER] = str(docs[-1]["_id"])
+    return res
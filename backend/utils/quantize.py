@@ -0,0 +1,146 @@
+# backend/utils/quantize.py
+#
+# Packed embedding encodings for Mongo (BinData) and the in-memory index.
+# Vectors are L2-normalised before packing; cosine scores do not depend on
+# length, so only the direction has to survive quantisation.
+#
+#   f16: 0x01 | float16 x dim                       (2 bytes / dim)
+#   i8:  0x02 | float32 scale | int8 x dim          (1 byte / dim, value = code * scale)
+#
+# A 768-dim embedding is ~1.5 KB as f16 and ~0.8 KB as i8, against ~10 KB as a
+# BSON array of doubles, and a whole catalog decodes with one np.frombuffer.
+
+import numpy as np
+from bson.binary import Binary
+
+FORMATS = {"f16": 1, "i8": 2}
+TAGS = {code: fmt for fmt, code in FORMATS.items()}
+
+# in-memory matrix dtype for each stored format
+DTYPES = {"f16": np.float16, "i8": np.int8}
+
+
+def _record_dtype(fmt, dim):
+    if fmt == "f16":
+        return np.dtype([("tag", "u1"), ("codes", "<f2", (dim,))])
+    return np.dtype([("tag", "u1"), ("scale", "<f4"), ("codes", "i1", (dim,))])
+
+
+def _dim(fmt, nbytes):
+    return (nbytes - 1) // 2 if fmt == "f16" else nbytes - 5
+
+
+def format_of(value):
+    """"f16" / "i8" for packed values, None for plain arrays."""
+    if isinstance(value, (bytes, bytearray)) and value:
+        return TAGS.get(value[0])
+    return None
+
+
+def quantize_rows(matrix, dtype):
+    """
+    Normalised float32 rows -> (codes, scales) in the given matrix dtype.
+    Scales are 1 except for int8, where row = codes * scale.
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scales = np.ones(len(matrix), dtype=np.float32)
+
+    if dtype == np.int8:
+        peak = np.abs(matrix).max(axis=1) if matrix.size else scales
+        scales = np.where(peak > 0, peak / 127, 1).astype(np.float32)
+        codes = np.rint(matrix / scales[:, None]).astype(np.int8)
+        return codes, scales
+
+    return matrix.astype(dtype), scales
+
+
+def pack(vector, fmt="f16"):
+    """Normalise and pack one embedding into a BinData value."""
+    vec = np.asarray(vector, dtype=np.float32).ravel()
+    vec = vec / (np.linalg.norm(vec) + 1e-9)
+
+    codes, scales = quantize_rows(vec.reshape(1, -1), DTYPES[fmt])
+    record = np.zeros(1, dtype=_record_dtype(fmt, len(vec)))
+    record["tag"] = FORMATS[fmt]
+    record["codes"] = codes
+    if fmt == "i8":
+        record["scale"] = scales
+    return Binary(record.tobytes())
+
+
+def unpack(value):
+    """Stored embedding (packed or a plain list) -> float32 vector."""
+    fmt = format_of(value)
+    if fmt is None:
+        return np.asarray(value, dtype=np.float32)
+
+    record = np.frombuffer(value, dtype=_record_dtype(fmt, _dim(fmt, len(value))))[0]
+    vec = record["codes"].astype(np.float32)
+    return vec * record["scale"] if fmt == "i8" else vec
+
+
+def stack(values, dtype=np.float32):
+    """
+    Stored embeddings -> (codes, scales) ready for the index, rows normalised.
+
+    When every value is packed in the same format the whole catalog is
+    decoded from one joined buffer with no per-element Python objects; if
+    that format is also the matrix dtype, the stored codes are used as is.
+    """
+    values = list(values)
+    if not values:
+        return np.zeros((0, 0), dtype=dtype), np.ones(0, dtype=np.float32)
+
+    fmt = format_of(values[0])
+    if fmt and all(format_of(v) == fmt and len(v) == len(values[0]) for v in values):
+        records = np.frombuffer(b"".join(values), dtype=_record_dtype(fmt, _dim(fmt, len(values[0]))))
+        if DTYPES[fmt] == dtype:
+            codes = np.ascontiguousarray(records["codes"])
+            scales = records["scale"].astype(np.float32) if fmt == "i8" else np.ones(len(values), dtype=np.float32)
+            return codes, scales
+        matrix = records["codes"].astype(np.float32)
+        if fmt == "i8":
+            matrix *= records["scale"][:, None]
+    else:
+        matrix = np.stack([unpack(v) for v in values])
+
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-9
+    return quantize_rows(matrix, dtype)
+
+
+def accuracy_report(vectors, fmt, queries=None, noise=0.3, seed=0):
+    """
+    Compare scoring on `fmt`-packed vectors with the float32 path.
+
+    Queries default to the catalog vectors themselves plus Gaussian noise
+    (`noise` relative to the vector length). Returns top-1 agreement and
+    the absolute cosine error of the winning scores.
+    """
+    rng = np.random.default_rng(seed)
+    exact = np.asarray(vectors, dtype=np.float32)
+    exact = exact / (np.linalg.norm(exact, axis=1, keepdims=True) + 1e-9)
+
+    if queries is None:
+        picks = exact[rng.choice(len(exact), min(len(exact), 500), replace=False)]
+        queries = picks + noise * rng.standard_normal(picks.shape).astype(np.float32) / np.sqrt(exact.shape[1])
+    queries = np.asarray(queries, dtype=np.float32)
+    queries = queries / (np.linalg.norm(queries, axis=1, keepdims=True) + 1e-9)
+
+    codes, scales = stack([bytes(pack(v, fmt)) for v in exact], DTYPES[fmt])
+    approx_scores = (queries @ codes.astype(np.float32).T) * scales
+    exact_scores = queries @ exact.T
+
+    best_exact = exact_scores.argmax(axis=1)
+    best_approx = approx_scores.argmax(axis=1)
+    rows = np.arange(len(queries))
+    error = np.abs(approx_scores[rows, best_exact] - exact_scores[rows, best_exact])
+
+    return {
+        "format": fmt,
+        "vectors": len(exact),
+        "queries": len(queries),
+        "top1Agreement": float((best_exact == best_approx).mean()),
+        "scoreErrorMean": float(error.mean()),
+        "scoreErrorMax": float(error.max()),
+        "bytesPerVector": len(pack(exact[0], fmt)),
+    }
@@ -0,0 +1,98 @@
+# backend/utils/result_cache.py
+
+import copy
+import hashlib
+import io
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    from PIL import Image
+except ImportError:  # perceptual matching is optional
+    Image = None
+
+
+def perceptual_hash(data):
+    """64-bit difference hash; re-encoded or resized copies of a photo hash (almost) the same."""
+    if Image is None:
+        return None
+    try:
+        img = Image.open(io.BytesIO(data)).convert("L").resize((9, 8))
+    except Exception:
+        return None
+
+    px = list(img.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (px[row * 9 + col] > px[row * 9 + col + 1])
+    return bits
+
+
+class AnalysisCache:
+    """
+    Results of /analyze-image keyed by the sha256 of the uploaded bytes,
+    with an optional perceptual-hash fallback. Entries expire after `ttl`
+    seconds and the oldest are evicted beyond `max_items`.
+    """
+
+    def __init__(self, max_items=500, ttl=3600, phash_distance=None):
+        self.max_items = max_items
+        self.ttl = ttl
+        self.phash_distance = phash_distance if Image is not None else None
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "phashHits": 0, "misses": 0}
+
+    def fingerprint(self, data):
+        digest = hashlib.sha256(data).hexdigest()
+        phash = perceptual_hash(data) if self.phash_distance is not None else None
+        return digest, phash
+
+    def _find(self, digest, phash, now):
+        entry = self._items.get(digest)
+        if entry and entry["expires"] > now:
+            self._items.move_to_end(digest)
+            self._counters["hits"] += 1
+            return entry
+
+        if phash is not None:
+            for key, entry in reversed(self._items.items()):
+                other = entry["phash"]
+                if entry["expires"] > now and other is not None \
+                        and bin(phash ^ other).count("1") <= self.phash_distance:
+                    self._items.move_to_end(key)
+                    self._counters["phashHits"] += 1
+                    return entry
+
+        self._counters["misses"] += 1
+        return None
+
+    def get(self, fingerprint):
+        """Returns a copy of {"detected", "matched", "catalogVersion"} or None."""
+        digest, phash = fingerprint
+        with self._lock:
+            entry = self._find(digest, phash, time.time())
+            return copy.deepcopy(entry["result"]) if entry else None
+
+    def put(self, fingerprint, detected, matched=None, catalog_version=None):
+        digest, phash = fingerprint
+        result = {
+            "detected": detected,
+            "matched": matched,
+            "catalogVersion": catalog_version,
+        }
+        with self._lock:
+            self._items[digest] = {
+                "phash": phash,
+                "expires": time.time() + self.ttl,
+                "result": copy.deepcopy(result),
+            }
+            self._items.move_to_end(digest)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._counters, size=len(self._items), maxSize=self.max_items)
@@ -0,0 +1,53 @@
+# backend/utils/serialization.py
+
+import datetime
+import decimal
+import json
+from bson import ObjectId, Decimal128
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # fall back to the stdlib encoder
+    orjson = None
+
+
+def bson_default(obj):
+    """Encode the BSON/Mongo types that show up in documents."""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    if isinstance(obj, Decimal128):
+        return float(obj.to_decimal())
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson:
+    _ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps_bytes(obj):
+        return orjson.dumps(obj, default=bson_default, option=_ORJSON_OPTIONS)
+else:
+    def dumps_bytes(obj):
+        return json.dumps(obj, default=bson_default, separators=(",", ":")).encode("utf-8")
+
+
+class BSONJSONProvider(DefaultJSONProvider):
+    """
+    Flask JSON provider that writes Mongo documents as they come out of
+    pymongo: ObjectId as its hex string, datetimes as ISO 8601, Decimal128
+    as a number. Uses orjson when it is installed.
+    """
+
+    def dumps(self, obj, **kwargs):
+        if not kwargs:
+            return dumps_bytes(obj).decode("utf-8")
+        kwargs.setdefault("default", bson_default)
+        return json.dumps(obj, **kwargs)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps_bytes(obj) + b"\n", mimetype=self.mimetype)
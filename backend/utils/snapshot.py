@@ -0,0 +1,219 @@
+# backend/utils/snapshot.py
+#
+# Versioned on-disk snapshot of the catalog index, shared by every worker on
+# a host. Each version is a directory holding the rows as .npy files plus a
+# JSON file of ids and product fields; CURRENT names the live version.
+# Workers np.load(mmap_mode="r") the rows, so the page cache holds one copy
+# however many processes serve it.
+#
+#   <dir>/CURRENT                      "000001718000000000000"
+#   <dir>/catalog-<version>/vectors.npy, scales.npy, meta.json
+#
+# A version is written into a temp directory and renamed into place before
+# CURRENT is replaced, so readers never see a partial snapshot. Publishing
+# takes an flock on <dir>/.lock; only one worker rebuilds at a time.
+
+import os
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import threading
+import numpy as np
+from utils import quantize
+from utils.matching import product_key, product_categories
+from utils.serialization import dumps_bytes, orjson
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# product fields kept in the snapshot: what a match result and the category
+# prefilter read
+SNAPSHOT_FIELDS = ("_id", "productId", "itemNo", "product", "productGroup", "price", "supplier", "store", "tags")
+
+
+class CatalogSnapshots:
+    """
+    Keeps a CatalogIndex on the newest snapshot. A background thread checks
+    CURRENT every `poll_interval` seconds and swaps to new versions; after
+    this worker changes the catalog (admin edits, indexer adds) it rebuilds
+    from Mongo and publishes, at most once per `publish_interval` seconds.
+    """
+
+    def __init__(self, directory, poll_interval=5, publish_interval=60, keep=3):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.publish_interval = publish_interval
+        self.keep = keep
+        self._built_at = 0
+        self._thread = None
+        self._stop = threading.Event()
+        self._stats = {"loads": 0, "publishes": 0, "lastLoadMs": None, "lastPublishMs": None, "lastError": None}
+        os.makedirs(directory, exist_ok=True)
+
+    # ---------------- READ ---------------- #
+
+    def current(self):
+        """Version name CURRENT points at, or None."""
+        try:
+            with open(os.path.join(self.directory, "CURRENT")) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _path(self, version, name=""):
+        return os.path.join(self.directory, f"catalog-{version}", name)
+
+    def load_into(self, index, version):
+        """Memory-map `version` and swap it into the index."""
+        started = time.perf_counter()
+        with open(self._path(version, "meta.json"), "rb") as f:
+            meta = (orjson.loads if orjson else json.loads)(f.read())
+        if meta["dtype"] != index.dtype.name:
+            raise ValueError(f"snapshot {version} holds {meta['dtype']} rows, index is {index.dtype.name}")
+
+        mode = "r" if meta["ids"] else None  # an empty file cannot be mapped
+        matrix = np.load(self._path(version, "vectors.npy"), mmap_mode=mode)
+        scales = np.load(self._path(version, "scales.npy"), mmap_mode=mode)
+        index.install(meta["ids"], meta["docs"], matrix, scales, snapshot_version=version)
+        self._built_at = meta["builtAt"]
+
+        # local changes older than the snapshot's Mongo read are in it
+        if index.dirty_since is not None and meta["builtAt"] >= index.dirty_since:
+            index.dirty_since = None
+
+        self._stats["loads"] += 1
+        self._stats["lastLoadMs"] = round((time.perf_counter() - started) * 1000, 1)
+
+    # ---------------- WRITE ---------------- #
+
+    def write(self, entries, dtype, built_at):
+        """Write entries [(product_doc, embedding)] as a new version and make it CURRENT."""
+        docs, vectors = [], []
+        # grouped by category, so each category is one contiguous block of rows
+        for prod, emb in sorted(entries, key=lambda e: sorted(product_categories(e[0]))):
+            docs.append({k: prod[k] for k in SNAPSHOT_FIELDS if k in prod})
+            vectors.append(emb)
+        matrix, scales = quantize.stack(vectors, dtype)
+
+        version = f"{time.time_ns():021d}"
+        tmp = os.path.join(self.directory, f".tmp-{uuid.uuid4().hex}")
+        os.makedirs(tmp)
+        np.save(os.path.join(tmp, "vectors.npy"), np.ascontiguousarray(matrix))
+        np.save(os.path.join(tmp, "scales.npy"), scales)
+        with open(os.path.join(tmp, "meta.json"), "wb") as f:
+            f.write(dumps_bytes({
+                "version": version,
+                "dtype": np.dtype(dtype).name,
+                "builtAt": built_at,
+                "ids": [product_key(d) for d in docs],
+                "docs": docs,
+            }))
+        os.rename(tmp, self._path(version).rstrip(os.sep))
+
+        pointer = os.path.join(self.directory, f".CURRENT-{uuid.uuid4().hex}")
+        with open(pointer, "w") as f:
+            f.write(version)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(pointer, os.path.join(self.directory, "CURRENT"))
+
+        self._cleanup(version)
+        return version
+
+    def _cleanup(self, current):
+        # open memory maps of removed versions stay valid until released
+        versions = sorted(
+            name[len("catalog-"):] for name in os.listdir(self.directory) if name.startswith("catalog-")
+        )
+        for version in versions[:-self.keep]:
+            if version != current:
+                shutil.rmtree(self._path(version), ignore_errors=True)
+
+    def publish(self, index, loader):
+        """
+        Rebuild from loader() (Mongo), write a new version and load it.
+        Returns False if another worker holds the lock; it will publish.
+        """
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+
+            # someone may have published while we waited for the lock
+            version = self.current()
+            if version and version != index.snapshot_version:
+                self.load_into(index, version)
+                if index.dirty_since is None:
+                    return True
+
+            started = time.perf_counter()
+            built_at = time.time()
+            version = self.write(loader(), index.dtype, built_at)
+            self.load_into(index, version)
+
+            self._stats["publishes"] += 1
+            self._stats["lastPublishMs"] = round((time.perf_counter() - started) * 1000, 1)
+            return True
+
+    # ---------------- SYNC ---------------- #
+
+    def refresh(self, index, loader):
+        """Swap to a newer snapshot if there is one; publish if this worker changed the catalog."""
+        version = self.current()
+        if version and version != index.snapshot_version:
+            try:
+                self.load_into(index, version)
+            except ValueError:
+                version = None  # written for another MATCH_DTYPE: replace it
+
+        due = index.dirty_since is not None and time.time() - self._built_at >= self.publish_interval
+        if version is None or index.stale or due:
+            self.publish(index, loader)
+
+    def start(self, index, loader):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, args=(index, loader), name="catalog-snapshot", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, index, loader):
+        while not self._stop.is_set():
+            try:
+                self.refresh(index, loader)
+            except Exception as e:
+                self._stats["lastError"] = str(e)
+                print("SNAPSHOT ERROR:", e)
+            self._stop.wait(self.poll_interval)
+
+    def status(self, index):
+        return dict(
+            self._stats,
+            directory=self.directory,
+            current=self.current(),
+            serving=index.snapshot_version,
+            dirty=index.dirty_since is not None,
+        )
+
+
+def create_snapshots():
+    directory = os.getenv("CATALOG_SNAPSHOT_DIR")
+    if not directory:
+        return None
+    return CatalogSnapshots(
+        directory,
+        poll_interval=float(os.getenv("CATALOG_SNAPSHOT_POLL_SECONDS", "5")),
+        publish_interval=float(os.getenv("CATALOG_SNAPSHOT_PUBLISH_SECONDS", "60")),
+    )
+
+
+# None unless CATALOG_SNAPSHOT_DIR is set
+catalog_snapshots = create_snapshots()
@@ -0,0 +1,75 @@
+# backend/utils/ttl_cache.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Small thread-safe map whose entries expire after `ttl` seconds; oldest evicted beyond `max_items`."""
+
+    def __init__(self, max_items=10000, ttl=30):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            item = self._items.get(key)
+            if item is None or item[1] <= now:
+                if item is not None:
+                    del self._items[key]
+                self.misses += 1
+                return default
+            self.hits += 1
+            return item[0]
+
+    def get_many(self, keys):
+        """{key: value} for the keys present and fresh, under a single lock."""
+        now = time.monotonic()
+        found = {}
+        with self._lock:
+            items = self._items
+            for key in keys:
+                item = items.get(key)
+                if item is not None and item[1] > now:
+                    found[key] = item[0]
+        self.hits += len(found)
+        self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._items[key] = (value, expires)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def set_many(self, mapping, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            for key, value in mapping.items():
+                self._items[key] = (value, expires)
+                self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def pop(self, key):
+        with self._lock:
+            item = self._items.pop(key, None)
+        return None if item is None else item[0]
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def __len__(self):
+        return len(self._items)
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses, "size": len(self), "maxSize": self.max_items}